@@ -1,14 +1,41 @@
+import contextlib
 import os
 import time
 
+from libs.logcat_parser import build_filterspec, parse_line, priority_at_least
+from libs.logcat_store import LogcatStore
+from libs.pattern_matcher import MultiPatternMatcher
+
 
 def run(context, action="find", keyword=None, filename=None, device_name=None, **kwargs):
     """
     安卓 Logcat 日志操作积木
-    :param action: 操作类型 ["clear", "dump", "find"]
-    :param keyword: 搜索关键字 (find 模式用)
-    :param filename: 保存文件名 (dump 模式用)
+    :param action: 操作类型 ["clear", "dump", "find", "archive", "query"]
+    :param keyword: 搜索关键字 (find 模式用)，也可以传列表
+    :param filename: 保存文件名 (dump 模式用)，以 .gz/.zst 结尾时自动压缩
     :param device_name: 指定操作哪台手机 (如果不传，默认用 context.adb)
+
+    dump 模式的可选参数:
+    :param compress: "gzip" / "zstd"，默认取 config.yaml 里的 logcat.compress
+    :param max_bytes: 单个文件最多写入多少字节 (压缩前)
+
+    find 模式的可选参数:
+    :param regex: 正则 (字符串或列表)，和 keyword 任一命中即算找到
+    :param first_only: 找到第一条就停止读取，默认 False
+    :param tag: 只看某个 (或某几个) TAG
+    :param priority: 最低日志级别，例如 "W" 表示只看 W/E/F
+    :param since: 起始时间，logcat 的时间格式 "MM-DD HH:MM:SS.mmm"
+    :param until: 截止时间，格式同上
+    :param max_matches: 最多返回多少条匹配，默认 1000
+
+    archive / query 模式 (结构化归档，见 libs/logcat_store.py):
+    :param store: 归档名，存到 outputs/logcat_store/<store>，默认 "default"
+    :param path: archive 模式要归档的日志文件；不传则先 dump 一份再归档
+    :param start: query 起始时间 "MM-DD HH:MM:SS[.mmm]"
+    :param end: query 截止时间
+    :param around: query 某个时间点前后 seconds 秒 (默认 5 秒)，和 start/end 二选一
+    :param tag / priority / pid / keyword: query 过滤条件
+    :param limit: query 最多返回多少条，默认 1000
     """
     logger = context.logger
 
@@ -43,42 +70,154 @@ def run(context, action="find", keyword=None, filename=None, device_name=None, *
 
         file_path = os.path.join(log_dir, filename)
 
-        # 调用 adb_manager 里的现成方法
-        result = adb.get_logcat(file_path)
+        # 调用 adb_manager 里的现成方法 (压缩时文件名会自动补后缀)
+        logcat_conf = context.config.get("logcat", {})
+        result = adb.get_logcat(
+            file_path,
+            compress=kwargs.get("compress", logcat_conf.get("compress")),
+            max_bytes=kwargs.get("max_bytes", logcat_conf.get("max_bytes")),
+        )
         if result:
-            logger.info(f"日志已保存: {file_path}")
-            return file_path  # 返回路径供后续使用
+            logger.info(f"日志已保存: {result}")
+            return result  # 返回路径供后续使用
         return False
 
     # --- 场景 C: 查找关键字 (Find/Assert) ---
     elif action == "find":
-        if not keyword:
-            logger.error("find 模式必须传入 keyword 参数")
+        matcher = MultiPatternMatcher(keywords=keyword, regexes=kwargs.get("regex"))
+        if not matcher:
+            logger.error("find 模式必须传入 keyword 或 regex 参数")
             return False
 
-        # 抓取当前所有日志内容（不存文件，直接读内存）
-        # logcat -d 表示 dump 当前缓冲区后退出
-        content = adb.run_cmd("logcat -d")
+        try:
+            matches = _find(
+                adb, matcher,
+                first_only=kwargs.get("first_only", False),
+                tag=kwargs.get("tag"),
+                priority=kwargs.get("priority"),
+                since=kwargs.get("since"),
+                until=kwargs.get("until"),
+                max_matches=kwargs.get("max_matches", 1000),
+            )
+        except Exception as e:
+            logger.error(f"读取 Logcat 失败: {e}")
+            return {
+                "status": False,
+                "data": [],
+                "msg": f"读取 Logcat 失败: {e}"
+            }
+        targets = matcher.patterns
 
-        if content and keyword in content:
-            logger.info(f"✅ 在日志中找到了: '{keyword}'")
+        if matches:
+            logger.info(f"✅ 在日志中找到了: {targets} (共 {len(matches)} 条)")
             return {
                 "status": True,
-                "data": None,
-                "msg": ""
+                "data": matches,
+                "msg": f"找到 {len(matches)} 条匹配"
             }
         else:
-            logger.warning(f"日志中未发现: '{keyword}'")
+            logger.warning(f"日志中未发现: {targets}")
             return {
                 "status": False,
-                "data": None,
+                "data": [],
                 "msg": ""
             }
 
+    # --- 场景 D: 归档到结构化存储 (Archive) ---
+    elif action == "archive":
+        path = kwargs.get("path")
+        if not path:
+            path = run(context, action="dump", filename=filename, device_name=device_name, **kwargs)
+            if not path:
+                return False
+        store = _open_store(context, kwargs.get("store"))
+        added = store.ingest_file(path)
+        return {
+            "status": True,
+            "data": store.stats(),
+            "msg": f"归档 {added} 条"
+        }
+
+    # --- 场景 E: 按时间/TAG/级别查询归档 (Query) ---
+    elif action == "query":
+        store = _open_store(context, kwargs.get("store"))
+        filters = {
+            "tag": kwargs.get("tag"),
+            "priority": kwargs.get("priority"),
+            "pid": kwargs.get("pid"),
+            "keyword": keyword,
+            "limit": kwargs.get("limit", 1000),
+        }
+        if kwargs.get("around"):
+            records = list(store.around(kwargs["around"], kwargs.get("seconds", 5), **filters))
+        else:
+            records = list(store.query(kwargs.get("start"), kwargs.get("end"), **filters))
+        logger.info(f"🔎 归档查询命中 {len(records)} 条")
+        return {
+            "status": bool(records),
+            "data": records,
+            "msg": f"命中 {len(records)} 条"
+        }
+
     else:
         logger.error(f"不支持的操作: {action}")
         return {
             "status": False,
             "data": None,
             "msg": ""
-        }
\ No newline at end of file
+        }
+
+
+def _open_store(context, name=None):
+    """打开 (或新建) outputs/logcat_store 下的归档"""
+    return LogcatStore(os.path.join(context.root_dir, "outputs", "logcat_store", name or "default"))
+
+
+def _find(adb, matcher, first_only=False, tag=None, priority=None,
+          since=None, until=None, max_matches=1000):
+    """
+    逐行扫描 logcat 缓冲区 (流式读取，内存占用和日志大小无关)
+    :return: [{"time": "MM-DD HH:MM:SS.mmm", "line": 原始行, "pattern": 命中的模式}, ...]
+    """
+    # 能让手机端做的过滤尽量交给手机端：-T 起始时间，TAG:级别 过滤
+    cmd = "logcat -d -v threadtime"
+    if since:
+        cmd += f" -T '{since}'"
+    filterspec = build_filterspec(tag, priority)
+    if filterspec:
+        cmd += f" {filterspec}"
+
+    need_parse = bool(tag or priority or since or until)
+    tags = {tag} if isinstance(tag, str) else set(tag or [])
+    matches = []
+
+    with contextlib.closing(adb.stream_lines(cmd)) as lines:
+        for line in lines:
+            # 日志按时间排列，超过截止时间后面的只会更晚 (只比较行首的时间前缀，不用整行解析)
+            if until and line[:1].isdigit() and line[:len(until)] > until:
+                break
+            hit = matcher.search(line)
+            if hit is None:
+                continue
+
+            record = parse_line(line)
+            if need_parse:
+                # 本地再校验一遍 (有些 ROM 的 logcat 不支持 -T)
+                if record is None:
+                    continue
+                if tags and record["tag"] not in tags:
+                    continue
+                if not priority_at_least(record["priority"], priority):
+                    continue
+                if since and record["time"] < since:
+                    continue
+
+            matches.append({
+                "time": record["time"] if record else None,
+                "line": line.rstrip("\r\n"),
+                "pattern": hit,
+            })
+            if first_only or len(matches) >= max_matches:
+                break
+
+    return matches
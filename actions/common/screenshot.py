@@ -1,6 +1,5 @@
 import os
 import time
-import subprocess
 import allure
 
 
@@ -34,19 +33,14 @@ def run(context, filename=None, device_name=None, **kwargs):
 
     # 3. 【核心优化】直接流式截图
     # exec-out screencap -p 可以直接把图片二进制数据输出到 stdout
-    device_id = adb.device_id
-    cmd_prefix = f"adb -s {device_id}" if device_id else "adb"
     # 注意：这里我们使用 exec-out (比 shell 更适合传输二进制)
-    full_cmd = f"{cmd_prefix} exec-out screencap -p"
-
     logger.info(f"📸 正在截图(流式): {filename}")
 
     try:
-        with open(local_path, "wb") as f:
-            # 直接把命令的标准输出(stdout)写入文件
-            process = subprocess.run(full_cmd, shell=True, stdout=f)
+        # 直接把命令的标准输出(stdout)写入文件 (native 模式下不起进程)
+        ok = adb.exec_out("screencap -p", local_path)
 
-        if process.returncode == 0 and os.path.getsize(local_path) > 0:
+        if ok and os.path.getsize(local_path) > 0:
             logger.info(f"✅ 截图成功: {local_path}")
 
             # 挂载到报告
@@ -1,123 +1,262 @@
+import contextlib
 import os
+import threading
 import time
 import csv
 import re
-from libs.baseDog import BaseDog
+from libs.baseDog import ScheduledDog
+from libs.cpu_sampler import CpuSampler
+from libs.event_bus import PERF
 from libs.logger import logger
+from libs.perf_series import PerfSeries
+from libs.perf_stream import PerfStream
+from libs.trend import TrendDetector
 
 
-class Dog(BaseDog):
-    def working(self):
+class _Target:
+    """一个监控对象 (某台设备上的某个包) 的全部状态：CSV、序列、趋势检测、CPU 采样器"""
+
+    def __init__(self, device, adb, package, path, capacity):
+        self.device = device
+        self.adb = adb
+        self.package = package
+        self.path = path
+        self.label = f"{device}/{package}" if device else package
+        self.sampler = CpuSampler(adb, package)
+        self.series = PerfSeries(
+            ["cpu", "mem", "threads", "fds"],
+            capacity=capacity,
+            spill_path=os.path.splitext(path)[0] + ".bin",
+        )
+        self.detectors = {}
+        self.warned_rss = False
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["Timestamp", "Time", "CPU(%)", "Memory_PSS(MB)", "Top_Threads", "Threads", "FDs"])  # 表头
+
+    def close(self):
+        self.series.close()
+        self.file.close()
+
+
+class Dog(ScheduledDog):
+    interval = 3  # 默认 3秒采一次
+
+    def __init__(self, context, *args, **kwargs):
+        super().__init__(context, *args, **kwargs)
+        self.targets = []  # [_Target]，setup 里创建
+        self.series = {}  # { (设备名, 包名): PerfSeries }，跑完可以直接拿来分析
+        self.mem_limit = kwargs.get("mem_limit", 500)  # 内存报警阈值 (MB)，默认 500MB
+
+    @property
+    def scheduled(self):
+        # 采集方式: poll (默认，交给共享调度器每 interval 秒 tick 一次) / stream (手机端常驻脚本持续输出，自己占一个线程)
+        return self.kwargs.get("mode", "poll") != "stream"
+
+    def setup(self):
         """
         性能监控狗：持续采集 CPU 和 内存数据，存入 CSV。
+        mode="stream" 时改用手机端常驻采集脚本 (见 libs/perf_stream.py)，适合高频采样
+
+        多包 / 多设备:
+            packages=["com.a", "com.b"]      同时监控多个包
+            devices=["phone1", "phone2"]     adb_pool 里的设备名，默认只用 context.adb
+        每台设备每个周期只有一次 adb 往返 (所有包的采集命令拼在一起)，多台设备并发采集；
+        每个 设备/包 各自一份 CSV + 序列 + 趋势检测
         """
         # 1. 获取配置参数
-        package_name = self.kwargs.get("package_name")
-        if not package_name:
-            logger.error("❌ [PerfDog] 必须指定 package_name 参数！")
-            return
-
-        interval = self.kwargs.get("interval", 3)  # 默认 3秒采一次
-        filename = self.kwargs.get("filename", f"perf_{package_name}_{time.strftime('%H%M%S')}.csv")
-
-        # 内存报警阈值 (MB)，默认 500MB
-        mem_limit = self.kwargs.get("mem_limit", 500)
-        on_alert = self.kwargs.get("on_alert")  # 报警回调
+        packages = self.kwargs.get("packages") or [self.kwargs.get("package_name")]
+        packages = [pkg for pkg in packages if pkg]
+        if not packages:
+            raise ValueError("❌ [PerfDog] 必须指定 package_name 或 packages 参数！")
+        devices = self.kwargs.get("devices") or [None]
 
         # 准备文件路径
         log_dir = os.path.join(self.context.root_dir, "outputs", "perf_data")
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
-        self.output_file = os.path.join(log_dir, filename)
 
-        logger.info(f"🐕 [PerfDog] 开始监控: {package_name} (间隔 {interval}s)")
-        logger.info(f"💾 数据保存至: {self.output_file}")
+        self.targets = self._create_targets(devices, packages, log_dir)
+        paths = [t.path for t in self.targets]
+        self.output_file = paths[0] if len(paths) == 1 else paths
+
+        logger.info(f"🐕 [PerfDog] 开始监控: {[t.label for t in self.targets]} (间隔 {self.interval}s)")
+        logger.info(f"💾 数据保存至: {paths}")
 
-        # 2. 长任务循环：打开 CSV 文件准备写入
+    def teardown(self):
+        for target in self.targets:
+            target.close()
+            summary = target.series.summary()
+            if summary["mem"]:
+                logger.info(
+                    f"📊 [PerfDog] {target.label} CPU 均值 {summary['cpu']['mean']}% / p95 {summary['cpu']['p95']}%，"
+                    f"内存 峰值 {summary['mem']['max']}MB / p95 {summary['mem']['p95']}MB"
+                )
+
+    def working(self):
+        """stream 模式才会走到这里 (自己的线程)"""
         try:
-            with open(self.output_file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Timestamp", "Time", "CPU(%)", "Memory_PSS(MB)"])  # 表头
+            if not self._ready:
+                self.setup()
+                self._ready = True
+            self._run_stream(self.interval, self.mem_limit)
+        finally:
+            if self.is_stopped():
+                self._finish()
+
+    def _create_targets(self, devices, packages, log_dir):
+        single = len(devices) * len(packages) == 1
+        stamp = time.strftime('%H%M%S')
+        targets = []
+        for device in devices:
+            adb = self.context.adb if device is None else self.context.adb_pool.get(device)
+            if adb is None:
+                raise ValueError(f"找不到设备 [{device}]")
+            for package in packages:
+                if single:
+                    filename = self.kwargs.get("filename", f"perf_{package}_{stamp}.csv")
+                else:
+                    filename = f"perf_{device + '_' if device else ''}{package}_{stamp}.csv"
+                target = _Target(device, adb, package, os.path.join(log_dir, filename),
+                                 self.kwargs.get("series_capacity", 3600))
+                target.detectors = self._create_detectors()
+                targets.append(target)
+                self.series[(device, package)] = target.series
+        return targets
+
+    def _create_detectors(self):
+        """
+        在线趋势检测 (每个样本 O(1))：内存谷底持续抬升 -> 泄漏预警 (带斜率和到达上限的剩余时间)；
+        均值突然抬升 -> 突变预警。mem_limit 仍然作为硬上限。trend=False 可以关掉
+        """
+        if not self.kwargs.get("trend", True):
+            return {}
+        return {
+            "mem": TrendDetector("内存(MB)", limit=self.mem_limit,
+                                 min_slope=self.kwargs.get("leak_slope", 0.2) / 60,
+                                 shift_delta=10, shift_threshold=300),
+            "cpu": TrendDetector("CPU(%)", limit=self.kwargs.get("cpu_limit"),
+                                 min_slope=self.kwargs.get("cpu_slope", 0.5) / 60,
+                                 shift_delta=5, shift_threshold=100),
+        }
+
+    def tick(self):
+        """轮询模式的一次采集：每台设备一次 adb 往返 (CPU 读 /proc，内存读 dumpsys meminfo)，多台设备并发"""
+        by_device = {}
+        for target in self.targets:
+            by_device.setdefault(target.device, []).append(target)
 
-                while True:
-                    # 检查停止信号
+        if len(by_device) == 1:
+            self._probe(next(iter(by_device.values())), self.mem_limit)
+            return
+        results = self.context.adb_pool.gather(
+            {device: (lambda adb, targets=targets: self._probe(targets, self.mem_limit))
+             for device, targets in by_device.items()},
+            timeout=max(self.interval * 2, 10),
+        )
+        for device in results.failed:
+            logger.warning(f"⚠️ [PerfDog] 设备 [{device}] 采集失败: {results[device]['msg']}")
+
+    def _probe(self, targets, mem_limit):
+        """
+        一台设备的一次采集：这台设备上所有包的 CPU + 内存命令 (包括解析 PID 的 pidof) 拼进同一个 adb.batch
+        CPU 由 CpuSampler 读 /proc 的 jiffies 差值计算 (不再跑 dumpsys cpuinfo)
+        """
+        cmds = []
+        for target in targets:
+            cmds.append(f"dumpsys meminfo {target.package} | grep TOTAL")
+            # 需要解析 PID 时 pidof 也在这条里 (包没在运行也不会多一次 adb 往返)
+            cmds.append(target.sampler.command(inline_resolve=True))
+        results = targets[0].adb.batch(cmds, timing=False)
+
+        now = time.time()
+        timestamp = time.strftime("%H:%M:%S")
+        for i, target in enumerate(targets):
+            mem = self._parse_mem(results[2 * i]["output"])
+            cpu = target.sampler.feed(results[2 * i + 1]["output"])
+
+            # --- 写入文件 ---
+            # 第一次采样只建立 CPU 基线 (cpu 为 None)，从第二次开始出数据
+            # dumpsys meminfo 失败时 mem 为 None，这次整条跳过
+            if cpu is not None and mem is not None:
+                top = " ".join(f"{t['name']}:{t['cpu']}" for t in cpu["threads"][:3])
+                self._record(target, now, timestamp, cpu["cpu"], mem, mem_limit, top=top)
+        return True
+
+    def _run_stream(self, interval, mem_limit):
+        """
+        流式模式：每个 设备/包 一个手机端常驻脚本，按 interval 输出样本，时间戳取手机端时间
+        多个监控对象时各自一个读取线程
+        """
+        if len(self.targets) == 1:
+            self._stream_target(self.targets[0], interval, mem_limit)
+            return
+        threads = [
+            threading.Thread(target=self._stream_target, args=(target, interval, mem_limit), daemon=True)
+            for target in self.targets
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def _stream_target(self, target, interval, mem_limit):
+        """内存优先用 PSS (smaps_rollup)，没有权限读时退回 RSS"""
+        stream = PerfStream(target.adb, target.package, interval=interval)
+        try:
+            with contextlib.closing(stream.samples()) as samples:
+                for sample in samples:
                     if self.is_stopped():
-                        logger.info("🐕 [PerfDog] 停止监控")
+                        logger.info(f"🐕 [PerfDog] {target.label} 停止监控")
                         break
+                    if sample["cpu"] is None:
+                        continue
 
-                    start_time = time.time()
-                    timestamp = time.strftime("%H:%M:%S")
-
-                    # --- 采集数据 (核心逻辑) ---
-                    cpu = self._get_cpu(package_name)
-                    mem = self._get_mem(package_name)
-
-                    # --- 写入文件 ---
-                    if cpu is not None and mem is not None:
-                        writer.writerow([int(time.time()), timestamp, cpu, mem])
-                        f.flush()  # 立即存盘，防止丢数据
-
-                        # --- 报警检查 ---
-                        if mem > mem_limit:
-                            logger.warning(f"⚠️ [PerfDog] 内存超标: {mem}MB > {mem_limit}MB")
-                            if on_alert:
-                                try:
-                                    on_alert(f"Memory Leak: {mem}MB")
-                                except:
-                                    pass
-
-                    # --- 智能等待 ---
-                    # 扣除采集消耗的时间，保证间隔准确
-                    cost = time.time() - start_time
-                    wait_time = max(0, interval - cost)
-
-                    # 使用 wait 代替 sleep，响应更灵敏
-                    if self._stop_event.wait(wait_time):
-                        break
+                    mem = sample["pss_mb"]
+                    if mem is None:
+                        mem = sample["rss_mb"]
+                        if not target.warned_rss:
+                            logger.warning(f"⚠️ [PerfDog] {target.label} 无权限读取 smaps_rollup，内存列改用 RSS")
+                            target.warned_rss = True
 
+                    timestamp = time.strftime("%H:%M:%S", time.localtime(sample["ts"]))
+                    self._record(target, sample["ts"], timestamp, sample["cpu"], mem, mem_limit,
+                                 threads=sample["threads"], fds=sample["fds"])
         except Exception as e:
-            logger.error(f"🐕 [PerfDog] 监控崩溃: {e}")
+            logger.error(f"🐕 [PerfDog] {target.label} 采集中断: {e}")
 
-    def _get_cpu(self, pkg):
+    def _record(self, target, ts, timestamp, cpu, mem, mem_limit, top="", threads=None, fds=None):
         """
-        获取 CPU 使用率
-        【优化】改用 dumpsys cpuinfo，兼容性更好
+        记录一个样本：写 CSV (不再逐行 flush) + 写入内存序列 (增量统计)
+        序列每批量落盘一次时顺带把 CSV 也刷一下，崩溃时最多丢一批
         """
-        try:
-            # dumpsys cpuinfo 输出格式通常包含：
-            # 0.5% 12345/com.package.name: 0.3% user + 0.1% kernel
-            cmd = f"dumpsys cpuinfo | grep {pkg}"
-            output = self.context.adb.shell(cmd)
-
-            if output:
-                output = output.strip()
-                # 策略：找到包含包名的那一行，提取最前面的百分比
-                for line in output.split('\n'):
-                    if pkg in line:
-                        # 移除空格，方便正则提取
-                        # 例子: "0.5%12345/com.pkg..."
-                        line = line.strip()
-                        match = re.search(r'^(\d+(\.\d+)?)%', line)
-                        if match:
-                            return float(match.group(1))
-            return 0.0
-        except Exception as e:
-            # 调试的时候打开，平时可以静默
-            # logger.warning(f"CPU获取失败: {e}")
-            return 0.0
+        target.writer.writerow([int(ts), timestamp, cpu, mem, top,
+                                "" if threads is None else threads, "" if fds is None else fds])
+        self.stats.count("samples")
+        if target.series.append(ts, cpu=cpu, mem=mem, threads=threads, fds=fds):
+            target.file.flush()
+        self._check_mem(target, mem, mem_limit)
+        for name, value in (("mem", mem), ("cpu", cpu)):
+            detector = target.detectors.get(name)
+            for event in detector.update(ts, value) if detector else []:
+                logger.warning(f"📈 [PerfDog] {target.label} {event['msg']}")
+                self.alert(f"Trend [{target.label}]: {event['msg']}", topic=PERF, target=target.label, metric=name)
 
-    def _get_mem(self, pkg):
-        """获取 Total PSS 内存 (MB)"""
-        try:
-            cmd = f"dumpsys meminfo {pkg} | grep 'TOTAL'"
-            output = self.context.adb.run_cmd(cmd)
-            # 输出通常是:     TOTAL    123456    ...
-            if output:
-                # 提取第一串数字
-                match = re.search(r'(\d+)', output)
-                if match:
-                    kb = int(match.group(1))
-                    return round(kb / 1024, 2)  # 转为 MB
-            return 0
-        except:
-            return 0
\ No newline at end of file
+    def _check_mem(self, target, mem, mem_limit):
+        # --- 报警检查 ---
+        if mem > mem_limit:
+            logger.warning(f"⚠️ [PerfDog] {target.label} 内存超标: {mem}MB > {mem_limit}MB")
+            # 走统一报警 (去重 + 限流，回调在后台执行)
+            self.alert(f"Memory Leak [{target.label}]: {mem}MB", topic=PERF, target=target.label, metric="mem", value=mem)
+
+    def _parse_mem(self, output):
+        """
+        解析 Total PSS 内存 (MB)
+        :return: 没有输出或解析不出来返回 None (这次不记样本)，不能当成 0MB 写进 CSV 和趋势检测
+        """
+        # 输出通常是:     TOTAL    123456    ...
+        match = re.search(r'(\d+)', output or "")
+        if not match:
+            return None
+        kb = int(match.group(1))
+        return round(kb / 1024, 2)  # 转为 MB
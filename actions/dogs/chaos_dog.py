@@ -1,18 +1,10 @@
-import threading
-import time
-import random
-from time import sleep
-
-from libs.baseDog import BaseDog
+from libs.baseDog import ScheduledDog
 from libs.logger import logger
 
-class Dog(BaseDog):
-
+class Dog(ScheduledDog):
+    interval = 1.0
 
-    def working(self):
+    def tick(self):
         logger.info("狗狗跑过来🐩🐩🐩")
         logger.info("🐕️🐕️🐕️狗狗跑过去")
         print("🐕️🐕️🐕️")
-        interval = self.kwargs.get("interval", 1.0)
-        sleep(interval)
-
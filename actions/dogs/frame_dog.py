@@ -0,0 +1,119 @@
+import os
+import time
+import csv
+from libs.baseDog import ScheduledDog
+from libs.event_bus import PERF
+from libs.framestats import FrameStatsParser, frame_window, parse_refresh_rate
+from libs.logger import logger
+from libs.perf_series import PerfSeries
+
+
+class Dog(ScheduledDog):
+    # dump 间隔，默认 0.5s (gfxinfo 只保留最近 120 帧，120Hz 下 1s 就满了)
+    interval = 0.5
+
+    def __init__(self, context, *args, **kwargs):
+        super().__init__(context, *args, **kwargs)
+        self.series = None  # PerfSeries，setup 里创建
+        self.parser = FrameStatsParser()
+        self._file = None
+        self._writer = None
+
+    def setup(self):
+        """
+        🎞️ 流畅度监控狗：轮询 dumpsys gfxinfo <包名> framestats，每次只解析上次之后的新帧，
+        按 window 秒一个窗口统计 FPS / 卡顿率 / p50 p90 p99 帧耗时，写 CSV 并按阈值报警
+
+        参数:
+            package_name   包名 (必填)
+            interval       dump 间隔，默认 0.5s
+            window         统计窗口，默认 1s
+            refresh_rate   屏幕刷新率，默认自动读取；单帧超过一个刷新周期算卡顿
+            jank_limit     卡顿率报警阈值 (%)，默认 20
+            fps_min        FPS 低于多少报警 (只在有帧绘制的窗口检查)，默认不检查
+        """
+        # 1. 获取配置参数
+        package_name = self.kwargs.get("package_name")
+        if not package_name:
+            raise ValueError("❌ [FrameDog] 必须指定 package_name 参数！")
+
+        self.window = self.kwargs.get("window", 1)
+        self.jank_limit = self.kwargs.get("jank_limit", 20)
+        self.fps_min = self.kwargs.get("fps_min")
+        self.refresh_rate = self.kwargs.get("refresh_rate") or parse_refresh_rate(
+            self.context.adb.shell("dumpsys SurfaceFlinger | grep -m 1 refresh-rate")
+        )
+        filename = self.kwargs.get("filename", f"frame_{package_name}_{time.strftime('%H%M%S')}.csv")
+
+        # 准备文件路径 (和 PerfDog 放在一起)
+        log_dir = os.path.join(self.context.root_dir, "outputs", "perf_data")
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        self.output_file = os.path.join(log_dir, filename)
+
+        logger.info(f"🎞️ [FrameDog] 开始监控: {package_name} (刷新率 {self.refresh_rate}Hz，窗口 {self.window}s)")
+        logger.info(f"💾 数据保存至: {self.output_file}")
+
+        self.series = PerfSeries(
+            ["fps", "jank_pct", "p50", "p90", "p99"],
+            capacity=self.kwargs.get("series_capacity", 3600),
+            spill_path=os.path.splitext(self.output_file)[0] + ".bin",
+        )
+        self._file = open(self.output_file, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(["Timestamp", "Time", "FPS", "Frames", "Jank", "Jank(%)",
+                               "P50(ms)", "P90(ms)", "P99(ms)"])  # 表头
+
+        self.cmd = f"dumpsys gfxinfo {package_name} framestats"
+        # 第一次 dump 只记下最新一帧的位置，之前积压的帧不算进第一个窗口
+        self.parser.feed(self.context.adb.shell(self.cmd))
+        self._pending = []
+        self._window_start = time.time()
+        self._overflows = 0
+
+    def tick(self):
+        """一次 dump：攒下新帧，窗口到了就出一行统计"""
+        self._pending.extend(self.parser.feed(self.context.adb.shell(self.cmd)))
+
+        if self.parser.overflows > self._overflows:
+            self.stats.count("overflows", self.parser.overflows - self._overflows)
+            self._overflows = self.parser.overflows
+            logger.warning("⚠️ [FrameDog] 两次采样之间帧数超过 gfxinfo 缓冲区，有帧漏统计，建议调小 interval")
+
+        now = time.time()
+        if now - self._window_start >= self.window:
+            stats = frame_window(self._pending, now - self._window_start, self.refresh_rate)
+            self._record(now, stats)
+            self._pending = []
+            self._window_start = now
+
+    def teardown(self):
+        self._file.close()
+        self.series.close()
+        summary = self.series.summary()
+        if summary["fps"]:
+            logger.info(
+                f"📊 [FrameDog] FPS 均值 {summary['fps']['mean']}，卡顿率 均值 {summary['jank_pct']['mean']}% / "
+                f"峰值 {summary['jank_pct']['max']}%，P90 帧耗时 p95 {summary['p90']['p95'] if summary['p90'] else '-'}ms"
+            )
+
+    def _record(self, ts, stats):
+        """写 CSV + 写入序列 (批量落盘时顺带刷 CSV)，再做阈值检查"""
+        self._writer.writerow([int(ts), time.strftime("%H:%M:%S", time.localtime(ts)), stats["fps"], stats["frames"],
+                               stats["jank"], stats["jank_pct"], stats["p50"], stats["p90"], stats["p99"]])
+        if self.series.append(ts, fps=stats["fps"], jank_pct=stats["jank_pct"],
+                              p50=stats["p50"], p90=stats["p90"], p99=stats["p99"]):
+            self._file.flush()
+        self.stats.count("windows")
+        self.stats.count("frames", stats["frames"])
+
+        # --- 报警检查 (没有绘制的窗口不算) ---
+        if not stats["frames"]:
+            return
+        if stats["jank_pct"] > self.jank_limit:
+            logger.warning(f"⚠️ [FrameDog] 卡顿率超标: {stats['jank_pct']}% > {self.jank_limit}% (P99 {stats['p99']}ms)")
+            self.alert(f"Jank: {stats['jank_pct']}% (P99 {stats['p99']}ms)", topic=PERF, metric="jank_pct",
+                       value=stats["jank_pct"])
+        if self.fps_min is not None and stats["fps"] < self.fps_min:
+            logger.warning(f"⚠️ [FrameDog] 帧率过低: {stats['fps']} < {self.fps_min}")
+            self.alert(f"Low FPS: {stats['fps']}", topic=PERF, metric="fps", value=stats["fps"])
@@ -1,44 +1,48 @@
-import time
-from libs.baseDog import BaseDog
+from libs.baseDog import ScheduledDog
+from libs.event_bus import DEVICE_OFFLINE
 from libs.logger import logger
 
 
-class Dog(BaseDog):
-    def working(self):
+class Dog(ScheduledDog):
+    # 默认每 5 分钟 (300s) 检查一次，太频繁会抢占 ADB 资源 (interval 参数可覆盖)
+    interval = 300
+
+    def tick(self):
         """
         💓 心跳守护狗
-        每隔一段时间巡检一次所有设备状态。
+        每隔一段时间巡检一次所有设备状态 (由共享调度器按 interval 调用)。
         """
         # 1. 获取配置
-        # 默认每 5 分钟 (300s) 检查一次，太频繁会抢占 ADB 资源
-        interval = self.kwargs.get("interval", 300)
         check_network = self.kwargs.get("check_network", True)
 
-        logger.info(f"💓 [HeartbeatDog] 开始巡检 (间隔 {interval}s)...")
+        logger.info(f"💓 [HeartbeatDog] 开始巡检 (间隔 {self.interval}s)...")
 
         error_msgs = []
+        offline = []
 
-        # --- 2. 巡检 ADB 设备 ---
-        if self.context.adb_pool:
-            for name, adb in self.context.adb_pool.items():
+        # --- 2. 巡检 ADB 设备 (所有设备并发) ---
+        pool = self.context.adb_pool
+        if pool:
+            results = pool.map(lambda adb: self._check_device(adb, check_network))
+            for name, res in results.items():
                 # A. 检查连接状态
-                state = adb.run_cmd("get-state")
+                state, network_ok = res["data"] or (res["msg"], None)
                 if state != "device":
                     msg = f"❌ 设备 [{name}] 掉线 (状态: {state})"
                     logger.error(msg)
                     error_msgs.append(msg)
-
-                    # 尝试自愈
-                    logger.warning(f"🚑 [HeartbeatDog] 正在尝试抢救设备: {name}...")
-                    adb.reconnect()
+                    offline.append(name)
 
                 # B. 检查网络 (如果还连着)
-                elif check_network:
-                    # ping 百度，只 ping 1 次以节省时间
-                    if not adb.ping_gateway("8.8.8.8", count=1):
-                        msg = f"⚠️ 设备 [{name}] 网络不通"
-                        logger.warning(msg)
-                        error_msgs.append(msg)
+                elif network_ok is False:
+                    msg = f"⚠️ 设备 [{name}] 网络不通"
+                    logger.warning(msg)
+                    error_msgs.append(msg)
+
+            # 尝试自愈 (同样并发，每台设备各自走重连阶梯)
+            if offline:
+                logger.warning(f"🚑 [HeartbeatDog] 正在尝试抢救设备: {offline}...")
+                pool.map(lambda adb: adb.reconnect(), names=offline)
 
         # --- 3. 巡检串口设备 ---
         if hasattr(self.context, "serials"):
@@ -53,14 +57,20 @@ class Dog(BaseDog):
             # 汇总错误信息
             alert_text = "🚨 **环境异常报警** 🚨\n" + "\n".join(error_msgs)
 
-            # 调用父类的 alert (触发截图/标记失败等策略)
-            self.alert(alert_text)
+            # 调用父类的 alert (触发截图/标记失败等策略)，
+            # 同时发到事件总线的 device_offline 主题，配置了飞书的话由飞书订阅者推送
+            self.alert(alert_text, topic=DEVICE_OFFLINE, offline=offline)
 
-            # 如果配置了飞书，直接发飞书 (双重保险)
-            if hasattr(self.context, "feishu"):
-                self.context.feishu.send_text(alert_text)
+        logger.info("💤 巡检结束，等待下次调度...")
 
-        # --- 5. 休息 ---
-        # 使用可中断睡眠，保证能随时被 stop 叫停
-        logger.info("💤 巡检结束，进入休眠...")
-        self.interruptible_sleep(interval)
\ No newline at end of file
+    @staticmethod
+    def _check_device(adb, check_network):
+        """
+        单台设备巡检 (在设备池的线程里执行)
+        :return: (状态, 网络是否通畅)；没检查网络时为 None
+        """
+        state = adb.run_cmd("get-state")
+        if state != "device" or not check_network:
+            return state, None
+        # ping 百度，只 ping 1 次以节省时间
+        return state, adb.ping_gateway("8.8.8.8", count=1)
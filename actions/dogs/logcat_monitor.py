@@ -2,117 +2,111 @@ import subprocess
 import os
 import time
 from libs.baseDog import BaseDog
+from libs.dog_stats import COUNT_BOUNDS
+from libs.event_bus import classify
 from libs.logger import logger
+from libs.logcat_store import LogcatStore
+from libs.rotating_sink import RotatingSink
+from libs.stream_reader import StreamReader
+from libs.pattern_matcher import MultiPatternMatcher
 
 
 class Dog(BaseDog):
     def __init__(self, context, *args, **kwargs):
         super().__init__(context, *args, **kwargs)
         self.process = None
-        self.file_handle = None  # 手动管理文件句柄
-        self.current_date = None  # 记录当前日志文件的日期
+        self.sink = None  # 缓冲 + 切分 + 压缩，见 libs/rotating_sink.py
+        self.reader = None  # 非阻塞读取，见 libs/stream_reader.py
+        self.store = None  # 可选的结构化归档，见 libs/logcat_store.py
 
-    def _get_new_filepath(self):
+    def _open_sink(self):
         """
-        辅助方法：生成带当前时间戳的新文件名
+        按参数创建落盘组件:
+        filename_prefix  文件名前缀 (默认 monitor)
+        max_bytes        单个分段上限，默认 100MB
+        rotate_interval  按时间切分 (秒)，默认不按时间切 (仍然会跨天切分)
+        compress         旧分段后台压缩: gzip / zstd，默认不压缩
+        flush_interval   最多隔多少秒落一次盘 (默认 1 秒)
+        (另外 archive: true 会额外写一份结构化归档，见 working)
         """
-        # 获取用户定义的前缀，默认是 monitor
-        prefix = self.kwargs.get("filename_prefix", "monitor")
-
-        # 生成文件名：monitor_20231127_120000.log
-        timestamp = time.strftime('%Y%m%d_%H%M%S')
-        filename = f"{prefix}_{timestamp}.log"
-
         log_dir = os.path.join(self.context.root_dir, "outputs", "logs")
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-
-        return os.path.join(log_dir, filename)
-
-    def _rotate_log(self):
-        """
-        执行日志切分动作：关旧的 -> 开新的
-        """
-        # 1. 关闭旧文件
-        if self.file_handle:
-            try:
-                self.file_handle.flush()
-                self.file_handle.close()
-            except Exception as e:
-                logger.error(f"关闭旧日志失败: {e}")
-
-        # 2. 生成新路径
-        new_path = self._get_new_filepath()
-
-        # 3. 更新父类属性 (这样 stop() 的时候只会上传这最后一个文件，避免上传几十个)
-        self.output_file = new_path
-        self.current_date = time.strftime("%Y%m%d")  # 更新当前日期标记
-
-        # 4. 打开新文件
-        self.file_handle = open(new_path, "w", encoding="utf-8")
-        logger.info(f"🔄 [LogMonitor] 日志已切分 -> {os.path.basename(new_path)}")
+        return RotatingSink(
+            log_dir,
+            prefix=self.kwargs.get("filename_prefix", "monitor"),
+            max_bytes=self.kwargs.get("max_bytes", 100 * 1024 * 1024),
+            rotate_interval=self.kwargs.get("rotate_interval"),
+            compress=self.kwargs.get("compress"),
+            flush_interval=self.kwargs.get("flush_interval", 1.0),
+        )
 
     def working(self):
         """
-        长任务模式：启动 logcat 进程，持续读取流，并按天切分
+        长任务模式：启动 logcat 进程，持续读取流，按大小/时间/跨天切分
         """
-        keywords = self.kwargs.get("keywords", [])
-        if isinstance(keywords, str): keywords = [keywords]
+        # 关键字 + 正则编译成一个匹配器，每行只扫一遍
+        matcher = MultiPatternMatcher(
+            keywords=self.kwargs.get("keywords", []),
+            regexes=self.kwargs.get("regexes", []),
+            ignore_case=self.kwargs.get("ignore_case", False),
+        )
 
-        device_id = self.context.adb.device_id
-        cmd_prefix = f"adb -s {device_id}" if device_id else "adb"
+        cmd_prefix = self.context.adb.cmd_prefix
 
         # 1. 先清空缓冲区
         subprocess.run(f"{cmd_prefix} logcat -c", shell=True)
 
         # 2. 启动进程
         cmd = f"{cmd_prefix} logcat -v time"
+        # 按字节读，由 StreamReader 整块 decode
         self.process = subprocess.Popen(
-            cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            text=True, encoding='utf-8', errors='ignore'
+            cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
         )
+        self.reader = StreamReader(self.process.stdout, stop_event=self._stop_event)
 
         logger.info("🐕 [LogMonitor] 开始监听 (支持自动切分)")
 
-        # 3. 初始化第一个日志文件
-        self._rotate_log()
+        # 3. 打开落盘组件 (写入带缓冲，切分检查只在落盘时做，不再每行 strftime + flush)
+        self.sink = self._open_sink()
+        self.output_file = self.sink.manifest_path
 
-        # 性能优化：不需要每毫秒都检查时间，每写 100 行或者每隔几秒检查一次即可
-        # 这里简单处理：每次循环检查一次，因为 Python 的 time.strftime 开销还可以接受
+        # archive: true 时同时写一份结构化归档，之后可以用 logcat_ops 的 query 按时间/TAG 查
+        if self.kwargs.get("archive"):
+            store_name = f"{self.kwargs.get('filename_prefix', 'monitor')}_{time.strftime('%Y%m%d_%H%M%S')}"
+            self.store = LogcatStore(os.path.join(self.context.root_dir, "outputs", "logcat_store", store_name))
 
         try:
-            while True:
-                if self.is_stopped(): break
-
-                # --- 切分检查逻辑 ---
-                # 只有日期变了（跨天）才切分
-                now_date = time.strftime("%Y%m%d")
-                if now_date != self.current_date:
-                    self._rotate_log()
-                # ---------------------
-
-                line = self.process.stdout.readline()
-                if not line and self.process.poll() is not None:
-                    break
-
-                if line:
-                    self.file_handle.write(line)
-                    self.file_handle.flush()  # 实时写入
-
-                    for kw in keywords:
-                        if kw in line:
-                            # 把异常写入一个单独的 error.log
-                            logger.error(f"[LogMonitor] 捕获异常: {kw}")
-                            self.alert(line)
+            # 手机没输出时也不会卡住，request_stop 里 wakeup() 立刻叫醒读取循环
+            for lines in self.reader.batches():
+                # 整块写入，不再逐行 write
+                self.sink.write("".join(lines), lines=len(lines))
+                # 每批行数越大说明处理越跟不上手机的输出速度
+                self.stats.count("lines", len(lines))
+                self.stats.observe("batch_lines", len(lines), COUNT_BOUNDS)
+                if self.store:
+                    for line in lines:
+                        self.store.append_line(line)
+
+                if not matcher:
+                    continue
+                for line in lines:
+                    hit = matcher.search(line)
+                    if hit:
+                        logger.error(f"[LogMonitor] 捕获异常: {hit}")
+                        # 报警前先落盘，保证现场日志已经在文件里
+                        self.sink.flush()
+                        self.stats.count("hits")
+                        self.alert(line, topic=classify(line), keyword=hit)
 
         except Exception as e:
             logger.error(f"🐕 [LogMonitor] 监听崩溃: {e}")
         finally:
-            # 4. 清理工作：关文件、杀进程
-            if self.file_handle:
-                self.file_handle.close()
+            # 4. 清理工作：落盘关文件、杀进程 (不在这里等后台压缩，否则 stop 的 join 会超时，压缩在 collect 里等)
+            self.sink.close(wait=False)
+            if self.store:
+                self.store.close()
+                logger.info(f"📚 [LogMonitor] 归档: {self.store.stats()}")
             self._kill_process()
-            logger.info("🐕 [LogMonitor] 停止工作")
+            logger.info(f"🐕 [LogMonitor] 停止工作 {self.reader.stats()}")
 
     def _kill_process(self):
         if self.process and self.process.poll() is None:
@@ -127,6 +121,21 @@ class Dog(BaseDog):
                 logger.error(f"杀死进程出错---{e.msg}")
                 pass
 
-    def stop(self):
-        self._kill_process()
-        return super().stop()
\ No newline at end of file
+    def request_stop(self):
+        # 先置停止标志再叫醒读取循环，线程能立刻退出，不用等 join 超时
+        super().request_stop()
+        if self.reader:
+            self.reader.wakeup()
+        # 只发 terminate 不等待，确认退出 (必要时 kill) 由线程自己在 finally 里做
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.terminate()
+            except OSError:
+                pass
+
+    def collect(self, timeout=None):
+        super().collect(timeout)
+        # 返回整套分段 (manifest + 所有分段)，而不只是最后一个文件；这里才等最后一个分段压缩完
+        if self.sink:
+            return self.sink.close(timeout=30 if timeout is None else timeout)
+        return None
\ No newline at end of file
@@ -2,10 +2,16 @@ import subprocess
 import os
 import time
 from libs.baseDog import BaseDog
+from libs.event_bus import classify
 from libs.logger import logger
+from libs.stream_reader import StreamReader
 
 
 class Dog(BaseDog):
+    def __init__(self, context, *args, **kwargs):
+        super().__init__(context, *args, **kwargs)
+        self.reader = None
+
     def working(self):
         """
         Monkey 压测狗：执行 Monkey 命令，并为每一行日志添加时间戳
@@ -36,8 +42,7 @@ class Dog(BaseDog):
         # --- 3. 组装 Monkey 命令 ---
         # --ignore-crashes --ignore-timeouts: 即使崩溃也不停止 Monkey 进程 (由我们自己监控)
         # -v -v -v: 最详细日志
-        device_id = self.context.adb.device_id
-        prefix = f"adb -s {device_id}" if device_id else "adb"
+        prefix = self.context.adb.cmd_prefix
 
         cmd = (
             f"{prefix} shell monkey "
@@ -58,10 +63,9 @@ class Dog(BaseDog):
             shell=True,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,  # 把错误流也合并进来
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
         )
+        # 非阻塞按块读取，Monkey 长时间没输出时也能及时响应停止
+        self.reader = StreamReader(process.stdout, stop_event=self._stop_event)
 
         try:
             with open(self.output_file, "w", encoding="utf-8") as f:
@@ -70,33 +74,23 @@ class Dog(BaseDog):
                 f.write(f"Command: {cmd}\n")
                 f.write("-" * 50 + "\n")
 
-                while True:
-                    # 1. 检查是否被叫停
-                    if self.is_stopped():
-                        logger.info("🐒 [MonkeyDog] 收到停止信号，正在终止 Monkey...")
-                        break
-
-                    # 2. 读取一行输出
-                    line = process.stdout.readline()
-
-                    # 3. 判断进程是否结束
-                    if not line and process.poll() is not None:
-                        logger.info("🐒 [MonkeyDog] Monkey 任务自然结束")
-                        break
-
-                    if line:
-                        # 【核心黑魔法】 添加时间戳
-                        current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                        timestamped_line = f"[{current_time}] {line}"
+                for lines in self.reader.batches():
+                    # 【核心黑魔法】 添加时间戳 (精度到秒，一块只取一次时间)
+                    current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+                    f.write("".join(f"[{current_time}] {line}" for line in lines))
+                    self.stats.count("lines", len(lines))
 
-                        # 写入文件
-                        f.write(timestamped_line)
-
-                        # 实时报警检测 (可选)
-                        # 如果 Monkey 输出里包含 Crash 信息，直接调用父类的 alert
+                    # 实时报警检测 (可选)
+                    # 如果 Monkey 输出里包含 Crash 信息，直接调用父类的 alert
+                    for line in lines:
                         if "// CRASH:" in line or "// NOT RESPONDING:" in line:
                             logger.error(f"🐒 [MonkeyDog] 发现异常: {line.strip()}")
-                            self.alert(line)
+                            self.alert(line, topic=classify(line))
+
+                if self.is_stopped():
+                    logger.info("🐒 [MonkeyDog] 收到停止信号，正在终止 Monkey...")
+                else:
+                    logger.info("🐒 [MonkeyDog] Monkey 任务自然结束")
 
         except Exception as e:
             logger.error(f"🐒 [MonkeyDog] 执行出错: {e}")
@@ -108,7 +102,7 @@ class Dog(BaseDog):
 
             if process.poll() is None:
                 process.terminate()
-            logger.info("🐒 [MonkeyDog] 停止工作")
+            logger.info(f"🐒 [MonkeyDog] 停止工作 {self.reader.stats()}")
 
     def _kill_remote_monkey(self):
         """辅助方法：杀掉手机里的 monkey 进程"""
@@ -128,4 +122,10 @@ class Dog(BaseDog):
                     self.context.adb.shell(f"kill {pid}")
                     logger.info(f"已 Kill 远程 Monkey PID: {pid}")
         except Exception as e:
-            logger.warning(f"清理远程 Monkey 失败 (可能已自动退出): {e}")
\ No newline at end of file
+            logger.warning(f"清理远程 Monkey 失败 (可能已自动退出): {e}")
+
+    def request_stop(self):
+        # 叫醒正在等输出的读取循环，线程能立刻退出 (手机端 monkey 由线程自己在 finally 里清理)
+        super().request_stop()
+        if self.reader:
+            self.reader.wakeup()
@@ -54,10 +54,12 @@ class AirRunner:
         try:
             # 环境初始化 (连接设备)
             # 触发懒加载，进行adb连接
-            _ = self.context.adb_pool
-            self.context.adb_pool['main_phone'].connect()
+            main_phone = self.context.adb_pool.get('main_phone')
             # 从 config 读取主设备，如果没有就默认本地
-            dev_id = self.context.config.get("adb_devices", {}).get("main_phone", "")
+            dev_id = ""
+            if main_phone:
+                main_phone.connect()
+                dev_id = main_phone.device_id or ""
             connect_str = f"Android:///{dev_id}" if dev_id else "Android:///"
 
             # basedir 设置为脚本所在目录，方便脚本里引用图片
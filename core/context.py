@@ -2,9 +2,11 @@
 import os
 
 from core.air_runner import AirRunner
+from libs.event_bus import COALESCE, DEVICE_OFFLINE, EventBus
 from libs.feishu_manager import FeishuManager
 from libs.logger import logger
 from libs.adb_manager import ADBManager
+from libs.adb_pool import AdbPool
 from core.runner import RunnerDog
 from core.dogPool_manager import DogPoolManager
 from functools import cached_property  #Python 3.8+ 支持
@@ -80,21 +82,10 @@ class TestContext:
         """
         【升级版】返回一个字典，包含所有手机的控制对象
         用法: env.adb_pool['main_phone'].run_cmd(...)
+              env.adb_pool.broadcast("getprop ro.build.version.release")  # 所有设备并发执行
         """
-        pool = {}
-        adb_conf = self.config.get("adb_devices", {})
-
         self.logger.info(f"⚡ 正在初始化ADB设备池...")
-
-        for name, ip_or_serial in adb_conf.items():
-            # 创建绑定了具体IP的管理器
-            manager = ADBManager(device_id=ip_or_serial)
-            # 尝试连接 (如果是网络设备)
-            manager.connect()
-
-            pool[name] = manager
-
-        return pool
+        return AdbPool.from_config(self.config)
 
     @property
     def serial(self):
@@ -122,6 +113,21 @@ class TestContext:
         )
 
 
+    @cached_property
+    def bus(self):
+        """
+        事件总线：狗把报警按主题 (crash / anr / perf / device_offline) 发到这里，
+        配置了飞书 webhook 时飞书订阅 feishu.topics 里的主题；device_offline 总是订阅
+        (以前心跳狗直接发飞书，老配置里没有 topics 也要照常收到掉线通知)
+        用法: env.bus.subscribe(handler, topics=["crash"])
+        """
+        bus = EventBus.default()
+        conf = self.config.get("feishu", {})
+        if conf.get("webhook") and "feishu" not in bus.stats():
+            topics = [DEVICE_OFFLINE] + [t for t in conf.get("topics") or [] if t != DEVICE_OFFLINE]
+            bus.subscribe(self.feishu.send_event, topics=topics, name="feishu", policy=COALESCE)
+        return bus
+
     def run(self, keyword,**kwargs):
         if keyword in self.runner.action_map:
             # 如果有传参，临时存入 data
@@ -1,42 +1,72 @@
+import json
 import os
-import importlib.util
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 import allure
+from core.dog_process import ProcessDog
+from core.dog_registry import DogRegistry
+from libs.baseDog import DogScheduler, ScheduledDog
+from libs.compress import compression_of, strip_compress_ext
 from libs.logger import logger
 
+# 压缩产物小于这个大小时直接作为附件上传 (压缩后的日志通常很小)
+COMPRESSED_ATTACH_LIMIT = 5 * 1024 * 1024
+
+# stop_all 收所有狗的总时限 (秒)
+STOP_ALL_TIMEOUT = 5
+
 class DogPoolManager:
     def __init__(self, context):
         self.context = context
         self.root_dir = context.root_dir
         self.active_dog={}
 
-    def start(self,dog_name,**kwargs):
-        if dog_name  in self.active_dog:
-            logger.warning(f"dog {dog_name} 已出动，勿重复调用")
-            return
+        # 周期性狗 (ScheduledDog) 共用一个调度器 + 有界线程池，配置见 config.yaml 的 dog_scheduler
+        conf = (getattr(context, "config", None) or {}).get("dog_scheduler", {})
+        self.scheduler = DogScheduler(
+            max_workers=conf.get("max_workers", 4),
+            jitter=conf.get("jitter", 0.1),
+            max_jitter=conf.get("max_jitter", 1.0),
+        )
+        # 狗窝只扫一次，Dog 类按文件 mtime 缓存
+        self.registry = DogRegistry(os.path.join(self.root_dir, "actions", "dogs"))
 
-        # 动态加载文件
-        file_path = os.path.join(self.root_dir,"actions" ,"dogs",f"{dog_name}.py")
-        if not os.path.exists(file_path):
-            logger.warning(f"找不到狗{file_path}")
+    def start(self, dog_name, key=None, **kwargs):
+        """
+        放狗
+        :param dog_name: actions/dogs 下的文件名
+        :param key: 实例名，默认和狗名一样；同一种狗要放多只时各起一个名字，
+                    例如 env.start("Perf_dog", key="perf_phone1", devices=["phone1"])，之后 env.stop("perf_phone1")
+        :param kwargs: 传给狗的参数；isolated=True 时狗在子进程里跑 (参数需要能 pickle，on_alert 除外)
+        """
+        key = key or dog_name
+        if key in self.active_dog:
+            logger.warning(f"dog {key} 已出动，勿重复调用")
             return
 
         try:
-            spec = importlib.util.spec_from_file_location(dog_name, file_path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            # 类已经缓存过、文件也没改过的话，这里只有一次 stat
+            dog_cls = self.registry.get(dog_name)
+            if dog_cls is None:
+                return
 
-            if hasattr(module, "Dog"):
-                dog_instance = module.Dog(self.context, **kwargs)
-                dog_instance.start()
-
-                self.active_dog[dog_name] = dog_instance
+            if kwargs.get("isolated", dog_cls.isolated):
+                # 进程隔离：父进程这边只留一个搬运事件的代理
+                dog_instance = ProcessDog(self.context, dog_name, self.registry.dog_map[dog_name], **kwargs)
             else:
-                logger.warning(f"<没找到>{dog_name} <中的dog类>")
+                dog_instance = dog_cls(self.context, **kwargs)
+            dog_instance.key = key
+            if isinstance(dog_instance, ScheduledDog):
+                dog_instance.scheduler = self.scheduler
+            dog_instance.start()
+
+            self.active_dog[key] = dog_instance
 
         except Exception as e:
-            logger.error(f"<<启动狗失败>>{dog_name}---{e}")
+            logger.error(f"<<启动狗失败>>{key}---{e}")
 
     def stop(self, dog_name):
+        """:param dog_name: 放狗时的 key (没指定 key 时就是狗名)"""
         dog = self.active_dog.get(dog_name)
         if not dog:
             logger.warning(f"<<dog不存在>>{dog_name} <无法停止运行>")
@@ -45,55 +75,192 @@ class DogPoolManager:
         #停止狗 (触发 kill process)
         try:
             file_path=dog.stop()
+        except Exception as e:
+            # 收尾出错也要在报告里留下痕迹，运行统计照挂
+            logger.error(f"<<收狗失败>>{dog_name}---{e}")
+            self._apply_attachments([self._failure_attachment(dog_name, e), self._stats_attachment(dog_name, dog)])
+            return
         finally:
             if dog_name in self.active_dog:
                 del self.active_dog[dog_name]
 
-        # 2. 处理产物
-        if file_path and os.path.exists(file_path):
-            logger.info(f"{dog_name}<狗叼回来一些东西...>{file_path}")
+        # 2. 处理产物 (可能是单个文件，也可能是一组分段日志)
+        paths = file_path if isinstance(file_path, (list, tuple)) else [file_path]
+        for path in paths:
+            self._attach_artifact(dog_name, path)
+        self._apply_attachments([self._stats_attachment(dog_name, dog)])
 
-            # 智能推断类型
-            att_type = self._infer_attachment_type(file_path)
+    def stats(self):
+        """
+        所有在跑的狗的运行统计快照
+        :return: { key: {"dog", "uptime", "counters", "rates", "histograms", "alerts", ["ticks"]} }
+        """
+        return {key: dog.snapshot() for key, dog in list(self.active_dog.items())}
 
-            # 🔥【核心修复】策略分流
-            # 只有图片才读内存，Log文件只贴路径！
+    @staticmethod
+    def _stats_attachment(key, dog):
+        """收狗时把这只狗的运行统计挂到报告上"""
+        snapshot = dog.snapshot()
+        logger.info(f"📊 [{key}] 运行统计: {snapshot['counters']}")
+        return ("运行统计", allure.attach, (json.dumps(snapshot, ensure_ascii=False, indent=2),), {
+            "name": f"📊 {key}_运行统计",
+            "attachment_type": allure.attachment_type.JSON,
+        })
 
-            # 📷 场景 A: 图片 -> 读取并上传原图
-            if att_type in [allure.attachment_type.PNG, allure.attachment_type.JPG]:
-                try:
-                    with open(file_path, "rb") as f:
-                        content = f.read()
-                    allure.attach(content, name=f"{dog_name}_截图", attachment_type=att_type)
-                except Exception as e:
-                    logger.error(f"图片上传失败: {e}")
+    @staticmethod
+    def _failure_attachment(key, error):
+        """收尾 (collect) 出错时挂到报告上的说明"""
+        return ("收狗失败说明", allure.attach, (f"{key} 收尾出错，产物可能不完整: {type(error).__name__}: {error}",), {
+            "name": f"❌ {key}_收狗失败",
+            "attachment_type": allure.attachment_type.TEXT,
+        })
 
-            # 📝 场景 B: 日志/其他 -> 只上传路径字符串 (彻底解决 OOM 问题)
-            else:
-                # 获取绝对路径，方便复制
-                abs_path = os.path.abspath(file_path)
-                # 构造一段提示文本
-                note = f"📂 文件过大，为防止报告崩溃，未直接展示。\n\n请在本地查看:\n{abs_path}"
+    def _attach_artifact(self, dog_name, file_path):
+        """把狗叼回来的一个文件挂到 Allure 报告上"""
+        self._apply_attachments(self._prepare_artifact(dog_name, file_path))
+
+    @staticmethod
+    def _apply_attachments(attachments):
+        for label, attach, args, kwargs in attachments:
+            try:
+                attach(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"{label}上传失败: {e}")
+
+    def _prepare_artifact(self, dog_name, file_path):
+        """
+        判断类型、读小文件 (可以放在线程池里做)，返回要挂到报告上的附件
+        真正的 allure.attach 留给调用方线程：Allure 按线程记录当前用例，在别的线程里挂会挂丢
+        :return: [(说明, allure 函数, args, kwargs)]
+        """
+        if not file_path or not os.path.exists(file_path):
+            return []
+
+        logger.info(f"{dog_name}<狗叼回来一些东西...>{file_path}")
 
-                # ⚠️ 注意：这里上传的是 note 变量，不是文件内容！
-                allure.attach(
-                    note,
-                    name=f"🔗 路径_{dog_name}",
-                    attachment_type=allure.attachment_type.TEXT
-                )
+        # 智能推断类型
+        att_type = self._infer_attachment_type(file_path)
 
+        # 🔥【核心修复】策略分流
+        # 只有图片才读内存，Log文件只贴路径！
+
+        # 📷 场景 A: 图片 -> 读取并上传原图
+        if att_type in [allure.attachment_type.PNG, allure.attachment_type.JPG]:
+            try:
+                with open(file_path, "rb") as f:
+                    content = f.read()
+            except Exception as e:
+                logger.error(f"图片读取失败: {e}")
+                return []
+            return [("图片", allure.attach, (content,), {"name": f"{dog_name}_截图", "attachment_type": att_type})]
+
+        # 📋 场景 A2: 分段日志的 manifest -> 很小，直接挂内容，报告里能看到整套分段
+        if file_path.endswith(".manifest.json"):
+            return [("manifest ", allure.attach.file, (file_path,), {
+                "name": f"📋 {dog_name}_分段清单",
+                "attachment_type": allure.attachment_type.JSON,
+            })]
+
+        # 🗜️ 场景 B: 压缩过的日志 -> 够小就直接挂原文件 (报告里可下载)，否则只贴路径
+        if compression_of(file_path) and os.path.getsize(file_path) <= COMPRESSED_ATTACH_LIMIT:
+            # 保留双后缀，例如 "log.gz"
+            return [("压缩日志", allure.attach.file, (file_path,), {
+                "name": f"🗜️ {dog_name}_{os.path.basename(file_path)}",
+                "extension": os.path.basename(file_path).split(".", 1)[-1],
+            })]
+
+        # 📝 场景 C: 日志/其他 -> 只上传路径字符串 (彻底解决 OOM 问题)
+        # 获取绝对路径，方便复制
+        abs_path = os.path.abspath(file_path)
+        # 构造一段提示文本
+        note = f"📂 文件过大，为防止报告崩溃，未直接展示。\n\n请在本地查看:\n{abs_path}"
+        if compression_of(file_path):
+            note += f"\n\n(已 {compression_of(file_path)} 压缩，可用 zcat / zstdcat 查看)"
+
+        # ⚠️ 注意：这里上传的是 note 变量，不是文件内容！
+        return [("路径说明", allure.attach, (note,), {
+            "name": f"🔗 路径_{dog_name}",
+            "attachment_type": allure.attachment_type.TEXT,
+        })]
+
+    def stop_all(self, timeout=STOP_ALL_TIMEOUT):
+        """
+        收狗：先给所有狗同时发停止信号，再在线程池里并发等待 + 收尾 + 准备附件，
+        总耗时不超过 timeout 秒 (不再是每只狗各等 2 秒串行累加)
+        到时还没停下的狗不会被悄悄丢掉：记错误日志、在报告里挂一条说明，并留在 active_dog 里 (下次 stop_all 再试)
+        停下了但收尾 (collect) 出错的狗记在 failed 里，报告里挂上错误和运行统计
+        :return: {"stopped": [狗名], "stuck": [狗名], "failed": [狗名], "elapsed": 秒}
+        """
+        started = time.monotonic()
+        dogs = dict(self.active_dog)
+        if not dogs:
+            return {"stopped": [], "stuck": [], "failed": [], "elapsed": 0}
+        deadline = started + timeout
+
+        # 1. 同时发信号 (不阻塞)
+        for name, dog in dogs.items():
+            try:
+                dog.request_stop()
+            except Exception as e:
+                logger.error(f"<<发停止信号失败>>{name}---{e}")
+
+        # 2. 并发等待 + 收尾 + 准备附件，共用一个截止时间
+        executor = ThreadPoolExecutor(max_workers=min(len(dogs), 8), thread_name_prefix="dog_stop")
+        futures = {executor.submit(self._stop_one, name, dog, deadline): name for name, dog in dogs.items()}
+        done, _ = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        executor.shutdown(wait=False)
+
+        # 3. 挂附件 (在调用方线程里，按启动顺序)
+        results = {"stopped": [], "stuck": [], "failed": []}
+        for fut, name in futures.items():
+            state, attachments = fut.result() if fut in done else ("stuck", [])
+            self._apply_attachments(attachments)
+            results[state].append(name)
+            if state != "stuck":
+                # 收尾失败的狗也已经停下了，再收一次也没用
+                self.active_dog.pop(name, None)
+        stopped, stuck, failed = results["stopped"], results["stuck"], results["failed"]
+
+        elapsed = round(time.monotonic() - started, 3)
+        if stuck:
+            msg = f"以下狗在 {timeout}s 内没有停下，仍在运行: {stuck}"
+            logger.error(f"🚨 [收狗] {msg}")
+            self._apply_attachments([("未停止的狗", allure.attach, (msg,), {
+                "name": "🚨 未停止的狗",
+                "attachment_type": allure.attachment_type.TEXT,
+            })])
+        if failed:
+            logger.error(f"🚨 [收狗] 以下狗收尾出错，产物可能不完整: {failed}")
+        logger.info(f"🐕‍🦺 [收狗] 已收回 {len(stopped)} 只，耗时 {elapsed}s")
+        return {"stopped": stopped, "stuck": stuck, "failed": failed, "elapsed": elapsed}
+
+    def _stop_one(self, name, dog, deadline):
+        """
+        (线程池里执行) 等一只狗停下并收尾
+        :return: ("stopped" / "stuck" / "failed", 附件列表)
+        """
+        try:
+            if not dog.wait_stopped(timeout=max(0, deadline - time.monotonic())):
+                return "stuck", []
+            # 收尾 (例如等日志压缩) 也算在同一个截止时间里
+            file_path = dog.collect(timeout=max(0, deadline - time.monotonic()))
+        except Exception as e:
+            logger.error(f"<<收狗失败>>{name}---{e}")
+            return "failed", [self._failure_attachment(name, e), self._stats_attachment(name, dog)]
 
-    def stop_all(self):
-        # 收狗
-        for name in list(self.active_dog.keys()):
-            self.stop(name)
+        paths = file_path if isinstance(file_path, (list, tuple)) else [file_path]
+        attachments = []
+        for path in paths:
+            attachments.extend(self._prepare_artifact(name, path))
+        attachments.append(self._stats_attachment(name, dog))
+        return "stopped", attachments
 
     def _infer_attachment_type(self, file_path):
         """
         内部方法：根据文件后缀名，决定 Allure 的附件类型
         """
-        # 获取后缀名 (如 .log, .png)
-        _, ext = os.path.splitext(file_path)
+        # 获取后缀名 (如 .log, .png)；压缩文件看去掉 .gz/.zst 之后的后缀
+        _, ext = os.path.splitext(strip_compress_ext(file_path))
         ext = ext.lower()
 
         # 🗺️ 映射表：把后缀名映射到 Allure 类型
@@ -0,0 +1,256 @@
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from functools import cached_property
+
+from core.dog_registry import DogRegistry
+from libs.adb_manager import ADBManager
+from libs.adb_pool import AdbPool
+from libs.baseDog import BaseDog
+from libs.event_bus import COALESCE
+from libs.logger import logger
+
+# 只在父进程用的参数 (回调函数过不了进程边界；报警策略由父进程执行)
+_PARENT_ONLY_KWARGS = ("on_alert", "hook_strategy", "bus", "isolated", "start_method", "stop_timeout")
+
+
+class ForwardedData(dict):
+    """子进程里的 context.data：写进来的标记 (has_crash / has_failure ...) 同时发一份给父进程"""
+
+    def __init__(self, events, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._events = events
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._events.put(("data", key, value))
+
+
+class DogProcessContext:
+    """
+    子进程里的精简上下文：只有狗常用的 root_dir / config / data / adb / adb_pool，
+    不导入 airtest，子进程起得快；截图这类积木转回父进程执行
+    """
+
+    def __init__(self, root_dir, config, data, events):
+        self.root_dir = root_dir
+        self.config = config or {}
+        self.data = ForwardedData(events, data)
+
+    @cached_property
+    def adb_pool(self):
+        return AdbPool.from_config(self.config)
+
+    @cached_property
+    def adb(self):
+        if not self.adb_pool:
+            return ADBManager()
+        return next(iter(self.adb_pool.values()))
+
+
+def _picklable(data):
+    """只挑能过进程边界的值 (context.data 里可能放了对象)"""
+    result = {}
+    for key, value in data.items():
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        result[key] = value
+    return result
+
+
+def _forward_events(dog, events):
+    """子进程里的狗照常去重后发到 (子进程的) 总线上，这里订阅下来转给父进程，由父进程执行策略、通知订阅者"""
+    return dog.bus.subscribe(
+        lambda event: events.put(("event", event.topic, event.merged_msg(), _picklable(event.data))),
+        name=f"{dog.source}.forward", policy=COALESCE, maxsize=dog.kwargs.get("alert_queue", 64),
+        filter=lambda event: event.dog is dog,
+    )
+
+
+def _serve(dog, conn):
+    """听父进程的控制命令，收到 stop (或父进程没了) 就返回"""
+    while True:
+        try:
+            if not conn.poll(0.5):
+                continue
+            cmd = conn.recv()
+        except (EOFError, OSError):
+            logger.warning(f"⚠️ [进程狗] {dog.key} 和父进程断开，自己收摊")
+            return
+        if cmd == "stop":
+            return
+        if isinstance(cmd, tuple) and cmd[0] == "stats":
+            conn.send((cmd[1], dog.snapshot()))
+
+
+def _child_main(dog_file, dog_name, key, kwargs, root_dir, config, data, conn, events):
+    """子进程入口：加载狗 -> 放狗 -> 听命令 -> 收狗后把产物路径和运行统计发回去"""
+    try:
+        dog_cls = DogRegistry(os.path.dirname(dog_file)).get(dog_name)
+        if dog_cls is None:
+            raise RuntimeError(f"子进程里加载不到狗 {dog_name}")
+        dog = dog_cls(DogProcessContext(root_dir, config, data, events), **kwargs)
+        dog.key = key
+        forward = _forward_events(dog, events)
+        dog.start()
+
+        _serve(dog, conn)
+
+        dog.request_stop()
+        while not dog.wait_stopped(timeout=1):
+            logger.warning(f"⏳ [进程狗] {key} 还没停下，继续等...")
+        path = dog.collect()
+        dog.bus.unsubscribe(forward)  # 还没转完的事件先发完
+        events.put(("exit", path, dog.snapshot()))
+    except Exception as e:
+        events.put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+class ProcessDog(BaseDog):
+    """
+    进程隔离的狗 (父进程这边的代理)：真正的狗在子进程里跑，日志解析不再和用例、图像识别抢 GIL
+
+        env.start("logcat_monitor", isolated=True, package_name="com.demo", hook_strategy=["screenshot", "stop"])
+
+    - 控制通道 (Pipe)  父 -> 子: stop / stats
+    - 事件队列 (Queue) 子 -> 父: 总线事件 (父进程这边执行 hook_strategy / on_alert，再发到父进程的总线)、
+      context.data 标记、退出时的产物路径和运行统计
+    - 代理本身是个线程，只负责搬运事件；对 DogPoolManager 来说和普通狗一样 stop / stop_all / stats
+
+    限制: 参数要能 pickle (on_alert / hook_strategy 留在父进程)；子进程里的 context 只有 DogProcessContext 那几样
+    """
+
+    def __init__(self, context, dog_name, dog_file, **kwargs):
+        super().__init__(context, **kwargs)
+        self.daemon = True
+        self.key = dog_name
+        self.dog_name = dog_name
+        self.dog_file = dog_file
+        self.process = None
+        self._mp = multiprocessing.get_context(kwargs.get("start_method", "spawn"))
+        self._conn = None
+        self._events = None
+        self._conn_lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._final = None  # 子进程退出时发回来的运行统计
+
+    def start(self):
+        self._conn, child_conn = self._mp.Pipe()
+        self._events = self._mp.Queue()
+        child_kwargs = {k: v for k, v in self.kwargs.items() if k not in _PARENT_ONLY_KWARGS}
+        self.process = self._mp.Process(
+            target=_child_main,
+            args=(self.dog_file, self.dog_name, self.key, child_kwargs, self.context.root_dir,
+                  getattr(self.context, "config", None), _picklable(self.context.data), child_conn, self._events),
+            daemon=True,
+            name=f"dog-{self.key}",
+        )
+        self.process.start()
+        child_conn.close()  # 父进程不留子进程那一头，子进程没了 recv 才能收到 EOF
+        super().start()
+
+    def run(self):
+        """搬运子进程发来的事件，直到子进程退出"""
+        logger.info(f"🧩 [进程狗] {self.key} 已在子进程 (pid {self.process.pid}) 出动")
+        while True:
+            try:
+                event = self._events.get(timeout=0.5)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                logger.error(f"❌ [进程狗] {self.key} 子进程意外退出 (exitcode {self.process.exitcode})")
+                return
+            self.stats.count("events")
+            if self._handle(event):
+                return
+
+    def _handle(self, event):
+        """处理一个事件，子进程结束时返回 True"""
+        kind = event[0]
+        if kind == "data":
+            _, key, value = event
+            self.context.data[key] = value
+        elif kind == "event":
+            # 子进程发来的报警已经在子进程里去重过，父进程这边不再 admit，只执行策略、发到父进程的总线上
+            _, topic, msg, data = event
+            self._dispatch_alert(msg, topic=topic, **data)
+        elif kind == "exit":
+            _, self.output_file, self._final = event
+            return True
+        elif kind == "error":
+            logger.error(f"❌ [进程狗] {self.key} 子进程出错: {event[1]}")
+            return True
+        return False
+
+    def stop(self):
+        """子进程里还要等狗停下、收尾再发回来，默认比线程狗多等一会 (stop_timeout 参数可调)"""
+        self.request_stop()
+        self.wait_stopped(timeout=self.kwargs.get("stop_timeout", 5))
+        return self.collect()
+
+    def request_stop(self):
+        super().request_stop()
+        self._send("stop")
+
+    def wait_stopped(self, timeout=2):
+        deadline = time.monotonic() + timeout
+        if not super().wait_stopped(timeout):
+            return False
+        if self.process is not None:
+            self.process.join(max(0, deadline - time.monotonic()))
+        return True
+
+    def collect(self, timeout=None):
+        if self.process is not None and self.process.is_alive():
+            logger.warning(f"⚠️ [进程狗] {self.key} 子进程没有按时退出，强制结束")
+            self.process.terminate()
+            self.process.join(1)
+        if self._conn is not None:
+            self._conn.close()
+        return super().collect(timeout)
+
+    def snapshot(self):
+        """子进程里那只狗的运行统计 (还在跑就现问)，外加进程信息和搬运计数"""
+        data = self._final or self._ask_stats()
+        proxy = super().snapshot()
+        info = {
+            "pid": self.process.pid if self.process else None,
+            "exitcode": self.process.exitcode if self.process else None,
+            "forwarded": proxy["counters"],
+        }
+        if data is None:
+            return {**proxy, "process": info}
+        return {**data, "process": info}
+
+    def _ask_stats(self, timeout=1):
+        if self.process is None or not self.process.is_alive():
+            return None
+        seq = next(self._seq)
+        with self._conn_lock:
+            try:
+                self._conn.send(("stats", seq))
+                deadline = time.monotonic() + timeout
+                while self._conn.poll(max(0, deadline - time.monotonic())):
+                    reply_seq, data = self._conn.recv()
+                    if reply_seq == seq:  # 之前超时没取走的旧回复直接丢掉
+                        return data
+            except (EOFError, OSError, ValueError):
+                pass
+        return None
+
+    def _send(self, cmd):
+        with self._conn_lock:
+            try:
+                self._conn.send(cmd)
+                return True
+            except (AttributeError, OSError, ValueError):
+                # 还没启动 / 子进程已经退出
+                return False
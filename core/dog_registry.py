@@ -0,0 +1,86 @@
+import os
+import importlib.util
+import threading
+from libs.logger import logger
+
+
+class DogRegistry:
+    def __init__(self, dogs_dir):
+        """
+        狗的注册表：启动时扫描一次 actions/dogs，加载过的 Dog 类缓存起来，
+        之后每次 start 只需要 stat 一下文件，文件改过 (mtime 变了) 才重新编译
+        :param dogs_dir: 狗窝目录
+        """
+        self.dogs_dir = dogs_dir
+        self.dog_map = {}  # { 狗名: 文件路径 }
+        self._classes = {}  # { 狗名: (mtime, Dog 类) }
+        self._dir_mtime = None
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        """扫描狗窝 (目录本身的 mtime 没变就不重复扫)"""
+        try:
+            mtime = os.stat(self.dogs_dir).st_mtime_ns
+        except OSError:
+            logger.warning(f"找不到狗窝{self.dogs_dir}")
+            return
+        if mtime == self._dir_mtime:
+            return
+        self._dir_mtime = mtime
+        self.dog_map = {
+            file[:-3]: os.path.join(self.dogs_dir, file)
+            for file in sorted(os.listdir(self.dogs_dir))
+            if file.endswith(".py") and file != "__init__.py"
+        }
+        logger.info(f"🐾 scan完成，狗窝里有 {len(self.dog_map)} 只狗: {list(self.dog_map)}")
+
+    def names(self):
+        with self._lock:
+            self._scan()
+            return list(self.dog_map)
+
+    def get(self, dog_name):
+        """
+        取 Dog 类 (有缓存且文件没改过就直接返回)
+        :return: Dog 类；找不到文件或文件里没有 Dog 类返回 None (加载出错会抛异常)
+        """
+        with self._lock:
+            file_path = self.dog_map.get(dog_name)
+            if file_path is None:
+                # 可能是后来新加的文件
+                self._scan()
+                file_path = self.dog_map.get(dog_name)
+            if file_path is None:
+                logger.warning(f"找不到狗{os.path.join(self.dogs_dir, dog_name + '.py')}")
+                return None
+
+            try:
+                mtime = os.stat(file_path).st_mtime_ns
+            except OSError:
+                self._classes.pop(dog_name, None)
+                logger.warning(f"找不到狗{file_path}")
+                return None
+
+            cached = self._classes.get(dog_name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+
+            if cached:
+                logger.info(f"🔄 [{dog_name}] 文件有改动，重新加载")
+            spec = importlib.util.spec_from_file_location(dog_name, file_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+            dog_cls = getattr(module, "Dog", None)
+            if dog_cls is None:
+                logger.warning(f"<没找到>{dog_name} <中的dog类>")
+                return None
+            self._classes[dog_name] = (mtime, dog_cls)
+            return dog_cls
+
+    def clear_cache(self):
+        """清空类缓存，下次 start 重新编译 (一般用不到，mtime 变化会自动重载)"""
+        with self._lock:
+            self._classes.clear()
+            self._dir_mtime = None
@@ -0,0 +1,118 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# 默认缓存规则: (命令正则, TTL 秒)，只缓存"几乎不变"的查询
+# pidof 不缓存：CpuSampler 靠它发现应用重启，缓存的旧 PID 会让重启后的几秒采样全部错位
+DEFAULT_CACHE_RULES = [
+    (r"^get-state$", 2),
+    (r"^shell getprop\b", 300),
+    (r"^shell wm (size|density)\b", 600),
+    (r"^shell dumpsys package \S+", 600),
+]
+
+# 会改变设备状态的命令: (触发命令正则, 需要作废的缓存键正则)
+DEFAULT_INVALIDATE_RULES = [
+    (r"^(install|uninstall)\b|^shell pm (install|uninstall|clear)\b", r"^shell (dumpsys package|pidof)\b"),
+    (r"^shell am (start|force-stop|kill)\b|^shell kill\b", r"^shell pidof\b"),
+    (r"^shell (wm|settings put)\b", r"^shell wm\b"),
+    (r"^shell setprop\b", r"^shell getprop\b"),
+]
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存 (线程安全)
+    超过 max_entries 时淘汰最久没用过的条目
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # { key: (过期时间, value) }
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """命中返回 (True, value)，未命中/过期返回 (False, None)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expire_at, value = item
+                if expire_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, pattern=None):
+        """作废缓存；pattern 为空则全部清空，否则只清掉键匹配正则的条目"""
+        with self._lock:
+            if pattern is None:
+                self._data.clear()
+                return
+            regex = re.compile(pattern)
+            for key in [k for k in self._data if regex.search(k)]:
+                del self._data[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+            }
+
+
+class CommandCache:
+    """
+    ADB 命令结果缓存：按规则决定哪些命令可以缓存、缓存多久，
+    执行有副作用的命令时顺带作废相关缓存
+    """
+
+    def __init__(self, rules=None, invalidate_rules=None, max_entries=256):
+        self.rules = [(re.compile(p), ttl) for p, ttl in (rules or DEFAULT_CACHE_RULES)]
+        self.invalidate_rules = [
+            (re.compile(trigger), target)
+            for trigger, target in (invalidate_rules or DEFAULT_INVALIDATE_RULES)
+        ]
+        self.store = TTLCache(max_entries)
+
+    def ttl_for(self, cmd):
+        """命令可缓存时返回 TTL，否则返回 None"""
+        for regex, ttl in self.rules:
+            if regex.search(cmd):
+                return ttl
+        return None
+
+    def on_command(self, cmd):
+        """执行非缓存命令前调用：作废受影响的缓存"""
+        for regex, target in self.invalidate_rules:
+            if regex.search(cmd):
+                self.store.invalidate(target)
+
+    def get(self, cmd):
+        return self.store.get(cmd)
+
+    def set(self, cmd, value, ttl):
+        self.store.set(cmd, value, ttl)
+
+    def clear(self):
+        self.store.invalidate()
+
+    def stats(self):
+        return self.store.stats()
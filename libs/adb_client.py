@@ -0,0 +1,275 @@
+import os
+import socket
+import struct
+import threading
+import time
+from libs.logger import logger
+
+# shell: 服务 (v1) 没有退出码，在命令后追加一行带 $? 的标记来取
+RC_MARK = "__DN_RC__"
+
+
+class ADBProtocolError(Exception):
+    """adb server 返回 FAIL 或者连接异常"""
+
+
+class AdbClient:
+    """
+    直接跟 adb server (默认 127.0.0.1:5037) 说 smart-socket 协议的客户端，
+    不再为每条命令 fork 一个 adb 进程。
+
+    协议要点:
+      - 请求: 4 位十六进制长度 + 内容，例如 "000chost:version"
+      - 应答: "OKAY" 或 "FAIL" + 4 位十六进制长度 + 错误信息
+      - host:transport:<serial> 之后，同一个 socket 就变成了连到设备的通道，
+        再发 shell:/exec:/sync: 服务请求。服务结束 socket 也就作废了，
+        只有 sync: 会话可以反复用，所以连接池只缓存 sync 连接。
+    """
+
+    SYNC_CHUNK = 64 * 1024
+
+    def __init__(self, host="127.0.0.1", port=5037, timeout=30, max_idle=4):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_idle = max_idle
+
+        # { serial: [已进入 sync 模式的空闲 socket] }
+        self._sync_pool = {}
+        self._pool_lock = threading.Lock()
+
+    # ================= 底层收发 =================
+
+    def _connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise ADBProtocolError(f"无法连接 adb server {self.host}:{self.port}: {e}")
+        return sock
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise ADBProtocolError("连接被 adb server 关闭")
+            buf += chunk
+        return bytes(buf)
+
+    def _send_request(self, sock, request):
+        data = request.encode("utf-8")
+        sock.sendall(b"%04x" % len(data) + data)
+        self._check_status(sock)
+
+    def _check_status(self, sock):
+        status = self._recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise ADBProtocolError(self._read_hex_string(sock))
+        raise ADBProtocolError(f"未知应答: {status!r}")
+
+    def _read_hex_string(self, sock):
+        length = int(self._recv_exact(sock, 4), 16)
+        return self._recv_exact(sock, length).decode("utf-8", errors="ignore")
+
+    @staticmethod
+    def _read_all(sock, sink=None):
+        """读到对端关闭；传了 sink 就边读边写，否则返回 bytes"""
+        buf = bytearray()
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            if sink is not None:
+                sink.write(chunk)
+            else:
+                buf += chunk
+        return bytes(buf)
+
+    def _open_transport(self, serial):
+        sock = self._connect()
+        try:
+            self._send_request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _open_service(self, serial, service):
+        sock = self._open_transport(serial)
+        try:
+            self._send_request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    # ================= host 命令 =================
+
+    def host_query(self, request):
+        """执行一条 host:xxx 查询，返回应答字符串"""
+        sock = self._connect()
+        try:
+            self._send_request(sock, request)
+            return self._read_hex_string(sock)
+        finally:
+            sock.close()
+
+    def get_state(self, serial=None):
+        request = f"host-serial:{serial}:get-state" if serial else "host:get-state"
+        return self.host_query(request)
+
+    def connect(self, address):
+        return self.host_query(f"host:connect:{address}")
+
+    def disconnect(self, address):
+        return self.host_query(f"host:disconnect:{address}")
+
+    # ================= 设备服务 =================
+
+    def shell(self, serial, cmd):
+        """
+        执行 shell 命令
+        :return: (returncode, output)  注意 v1 协议下 stderr 会混在 output 里
+        """
+        # 子 shell 包一层，命令里的 exit 不会跳过后面的退出码标记
+        script = f"( {cmd}\n)\nprintf '\\n{RC_MARK}%d\\n' $?"
+        sock = self._open_service(serial, f"shell:{script}")
+        try:
+            raw = self._read_all(sock).decode("utf-8", errors="ignore")
+        finally:
+            sock.close()
+
+        idx = raw.rfind(RC_MARK)
+        if idx < 0:
+            return -1, raw
+        try:
+            returncode = int(raw[idx + len(RC_MARK):].strip())
+        except ValueError:
+            returncode = -1
+        return returncode, raw[:idx]
+
+    def open_shell(self, serial, cmd):
+        """打开一个 shell 流 (logcat 之类的长输出)，调用方负责关闭 socket"""
+        return self._open_service(serial, f"shell:{cmd}")
+
+    def exec_out(self, serial, cmd, sink=None):
+        """exec: 服务，原样返回二进制输出 (截图用)"""
+        return self.stream(serial, f"exec:{cmd}", sink)
+
+    def stream(self, serial, service, sink=None):
+        """打开任意设备服务并读到结束；传了 sink 就直接写进去"""
+        sock = self._open_service(serial, service)
+        try:
+            return self._read_all(sock, sink)
+        finally:
+            sock.close()
+
+    # ================= sync: 文件传输 =================
+
+    def _acquire_sync(self, serial):
+        with self._pool_lock:
+            idle = self._sync_pool.get(serial)
+            if idle:
+                return idle.pop()
+        return self._open_service(serial, "sync:")
+
+    def _release_sync(self, serial, sock, broken=False):
+        if broken:
+            sock.close()
+            return
+        with self._pool_lock:
+            idle = self._sync_pool.setdefault(serial, [])
+            if len(idle) < self.max_idle:
+                idle.append(sock)
+                return
+        self._sync_quit(sock)
+
+    def _sync_quit(self, sock):
+        try:
+            sock.sendall(b"QUIT" + struct.pack("<I", 0))
+        except OSError:
+            pass
+        sock.close()
+
+    @staticmethod
+    def _sync_packet(sock, cmd, data):
+        sock.sendall(cmd + struct.pack("<I", len(data)) + data)
+
+    def push(self, serial, local_path, remote_path, mode=0o100644):
+        sock = self._acquire_sync(serial)
+        broken = True
+        try:
+            self._sync_packet(sock, b"SEND", f"{remote_path},{mode}".encode("utf-8"))
+            with open(local_path, "rb") as f:
+                while True:
+                    chunk = f.read(self.SYNC_CHUNK)
+                    if not chunk:
+                        break
+                    self._sync_packet(sock, b"DATA", chunk)
+            # DONE 的长度字段放的是 mtime
+            sock.sendall(b"DONE" + struct.pack("<I", int(time.time())))
+            self._check_sync_status(sock)
+            broken = False
+        finally:
+            self._release_sync(serial, sock, broken)
+
+    def pull(self, serial, remote_path, local_path):
+        sock = self._acquire_sync(serial)
+        broken = True
+        try:
+            self._sync_packet(sock, b"RECV", remote_path.encode("utf-8"))
+            tmp_path = f"{local_path}.part"
+            with open(tmp_path, "wb") as f:
+                while True:
+                    header = self._recv_exact(sock, 8)
+                    cmd, length = header[:4], struct.unpack("<I", header[4:])[0]
+                    if cmd == b"DATA":
+                        f.write(self._recv_exact(sock, length))
+                    elif cmd == b"DONE":
+                        break
+                    elif cmd == b"FAIL":
+                        msg = self._recv_exact(sock, length).decode("utf-8", errors="ignore")
+                        # FAIL 之后 sync 会话仍可用
+                        broken = False
+                        raise ADBProtocolError(msg)
+                    else:
+                        raise ADBProtocolError(f"sync 未知应答: {cmd!r}")
+            os.replace(tmp_path, local_path)
+            broken = False
+        finally:
+            if os.path.exists(f"{local_path}.part"):
+                os.remove(f"{local_path}.part")
+            self._release_sync(serial, sock, broken)
+
+    def _check_sync_status(self, sock):
+        header = self._recv_exact(sock, 8)
+        cmd, length = header[:4], struct.unpack("<I", header[4:])[0]
+        if cmd == b"OKAY":
+            return
+        msg = self._recv_exact(sock, length).decode("utf-8", errors="ignore")
+        raise ADBProtocolError(msg)
+
+    def close(self, serial=None):
+        """关闭连接池 (serial 为空则全部关闭)"""
+        with self._pool_lock:
+            serials = [serial] if serial else list(self._sync_pool)
+            idle = [s for key in serials for s in self._sync_pool.pop(key, [])]
+        for sock in idle:
+            self._sync_quit(sock)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(host="127.0.0.1", port=5037):
+    """同一个 adb server 共用一个客户端 (连接池也共享)"""
+    key = (host, port)
+    with _clients_lock:
+        if key not in _clients:
+            logger.info(f"🔌 [ADB协议] 使用原生客户端: {host}:{port}")
+            _clients[key] = AdbClient(host, port)
+        return _clients[key]
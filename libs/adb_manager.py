@@ -1,27 +1,125 @@
+import collections
+import contextlib
+import re
+import shlex
 import subprocess
+import threading
 import time
 import os
+import uuid
+from libs.adb_cache import CommandCache
+from libs.adb_client import ADBProtocolError, get_client
+from libs.adb_session import ADBShellSession, ADBSessionError, ADBSessionTimeout
+from libs.compress import open_write, resolve_compression
 from libs.logger import logger
+from libs.reconnect_coordinator import coordinator
+
+# stream_lines 报错时附带的 stderr 尾巴：最多保留 4 块，每块最多 4KB
+_STDERR_CHUNK = 4096
+_STDERR_TAIL_CHUNKS = 4
 
 
 class ADBManager:
-    def __init__(self, device_id=None):
+    def __init__(self, device_id=None, session=False, adb_path="adb", backend="binary",
+                 server_host="127.0.0.1", server_port=5037, cache=False, session_timeout=None):
         """
         :param device_id: 设备序列号或IP (例如 "192.168.1.101" 或 "emulator-5554")
+        :param session: 是否启用常驻 shell 会话 (shell 命令复用同一个 adb 进程)
+        :param adb_path: adb 可执行文件路径，默认走 PATH
+        :param backend: "binary" 调用 adb 可执行文件；"native" 直接用 socket 跟 adb server 通信
+        :param server_host: native 模式下 adb server 的地址
+        :param server_port: native 模式下 adb server 的端口
+        :param cache: 是否缓存 get-state/getprop 之类的幂等查询 (True 或 enable_cache 的参数字典)
+        :param session_timeout: 会话模式下单条命令最多等多少秒，默认不限时 (和单次调用一致)
         """
         self.device_id = device_id
+        self.adb_path = adb_path
         # 如果是IP设备，记录下来以便断线重连 非无线的无法重连
         self.is_network_device = "." in device_id if device_id else False
 
+        self.use_session = session
+        self.session_timeout = session_timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        self.backend = backend
+        self._client = get_client(server_host, server_port) if backend == "native" else None
+
+        self._cache = None
+        self._last_state = None
+        if cache:
+            self.enable_cache(**(cache if isinstance(cache, dict) else {}))
+
+        coordinator.register(self)
+
+    @classmethod
+    def from_config(cls, conf):
+        """
+        根据 config.yaml 中 adb_devices 的单项配置创建管理器
+        支持两种写法:
+            main_phone: "emulator-5554"
+            main_phone: {serial: "emulator-5554", session: true}
+            main_phone: {serial: "emulator-5554", backend: "native"}
+        """
+        if isinstance(conf, dict):
+            return cls(
+                device_id=conf.get("serial"),
+                session=conf.get("session", False),
+                adb_path=conf.get("adb_path", "adb"),
+                backend=conf.get("backend", "binary"),
+                server_host=conf.get("server_host", "127.0.0.1"),
+                server_port=conf.get("server_port", 5037),
+                cache=conf.get("cache", False),
+                session_timeout=conf.get("session_timeout"),
+            )
+        return cls(device_id=conf)
+
+    @property
+    def cmd_prefix(self):
+        """拼好 -s 的 adb 命令前缀"""
+        return f"{self.adb_path} -s {self.device_id}" if self.device_id else self.adb_path
+
     def run_cmd(self, cmd, retry=1):
         """
         执行 ADB 命令（带重试机制）
         :param cmd: 要执行的命令 (不含 'adb', 例如 'shell ls')
         :param retry: 失败重试次数，默认 1 次
         """
+        if self._cache is None:
+            return self._execute(cmd, retry)
+
+        ttl = self._cache.ttl_for(cmd)
+        if ttl is None:
+            # 不可缓存的命令：如果会改变设备状态，先作废相关缓存
+            self._cache.on_command(cmd)
+            return self._execute(cmd, retry)
+
+        hit, value = self._cache.get(cmd)
+        if hit:
+            return value
+
+        value = self._execute(cmd, retry)
+        if cmd == "get-state":
+            self._on_state(value)
+        # 失败结果不缓存
+        if value is not None:
+            self._cache.set(cmd, value, ttl)
+        return value
+
+    def _execute(self, cmd, retry=1):
+        """按 backend 分发执行 (不经过缓存)"""
+        if self.backend == "native":
+            return self._run_native(cmd, retry)
+
+        # shell 命令优先走常驻会话
+        if self.use_session and cmd.startswith("shell "):
+            return self._session_shell(cmd[len("shell "):], retry)
+        return self._run_subprocess(cmd, retry)
+
+    def _run_subprocess(self, cmd, retry=1):
+        """每条命令起一个 adb 进程 (原始模式)"""
         # -s 指定某个设备
-        prefix = f"adb -s {self.device_id}" if self.device_id else "adb"
-        full_cmd = f"{prefix} {cmd}"
+        full_cmd = f"{self.cmd_prefix} {cmd}"
 
         for i in range(retry + 1):
             try:
@@ -54,22 +152,165 @@ class ADBManager:
 
     def reconnect(self):
         """
-        尝试恢复连接：重启 Server -> 重连网络设备
+        尝试恢复连接：只针对本设备逐级升级 (reconnect -> disconnect/connect -> usb 复位)，
+        重启 adb server 是最后手段。多线程同时调用会合并成一次。
+        :return: 是否恢复成功
+        """
+        logger.info(f"执行 ADB 重连流程: {self.device_id}")
+        # 旧的会话/连接/缓存已经不可信了
+        self.close_session()
+        if self._cache:
+            self._cache.clear()
+        if self._client:
+            self._client.close(self.device_id)
+        return coordinator.recover(self)
+
+    def _adb_raw(self, args, timeout=15, with_serial=True):
+        """
+        直接调用 adb 可执行文件，不带重试/重连逻辑 (给重连流程自己用，避免死循环)
+        :return: (returncode, stdout+stderr)
+        """
+        full_args = [self.adb_path]
+        if with_serial and self.device_id:
+            full_args += ["-s", self.device_id]
+        full_args += args
+        try:
+            result = subprocess.run(full_args, capture_output=True, text=True, timeout=timeout)
+            return result.returncode, (result.stdout + result.stderr).strip()
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return -1, str(e)
+
+    # ================= 结果缓存 =================
+
+    def enable_cache(self, rules=None, max_entries=256):
+        """
+        开启幂等查询缓存
+        :param rules: { 命令正则: TTL秒 }，默认见 libs/adb_cache.py
+        :param max_entries: 最多缓存多少条，超出按 LRU 淘汰
+        """
+        self._cache = CommandCache(
+            rules=list(rules.items()) if isinstance(rules, dict) else rules,
+            max_entries=max_entries,
+        )
+
+    def disable_cache(self):
+        self._cache = None
+
+    def invalidate_cache(self):
+        if self._cache:
+            self._cache.clear()
+
+    def cache_stats(self):
+        """命中统计: {hits, misses, evictions, size}；没开缓存返回 None"""
+        return self._cache.stats() if self._cache else None
+
+    def _on_state(self, state):
+        """设备状态变化 (例如 device -> offline -> device) 时整体作废缓存"""
+        if self._last_state is not None and state != self._last_state:
+            logger.info(f"设备状态变化 {self._last_state} -> {state}，清空缓存")
+            self._cache.clear()
+        self._last_state = state
+
+    # ================= 原生协议 =================
+
+    def _run_native(self, cmd, retry=1):
+        """通过 socket 直连 adb server 执行命令，返回值语义和 run_cmd 一致"""
+        for i in range(retry + 1):
+            try:
+                logger.info(f"执行(协议): {cmd}")
+                result = self._dispatch_native(cmd)
+                if result is None:
+                    # 协议客户端不认识的命令，交给 adb 可执行文件
+                    return self._run_subprocess(cmd, retry)
+
+                ok, output = result
+                if ok:
+                    return output.strip()
+                logger.error(f"命令失败: {output.strip()}")
+                return None
+
+            except ADBProtocolError as e:
+                error_msg = str(e).lower()
+                if "not found" in error_msg or "offline" in error_msg:
+                    logger.warning(f"⚠️ 设备连接异常 ({error_msg})，尝试重连...")
+                    self.reconnect()
+                else:
+                    logger.error(f"命令失败: {e}")
+                    return None
+            except Exception as e:
+                logger.error(f" 执行异常: {e}")
+
+            if i < retry:
+                time.sleep(2)
+
+        return None
+
+    def _dispatch_native(self, cmd):
+        """
+        把 'shell ls' 这类命令翻译成协议请求
+        :return: (是否成功, 输出)；不支持的命令返回 None
+        """
+        head, _, rest = cmd.strip().partition(" ")
+        serial = self.device_id
+
+        if head in ("shell", "logcat"):
+            shell_cmd = rest if head == "shell" else f"logcat {rest}"
+            returncode, output = self._client.shell(serial, shell_cmd)
+            return returncode == 0, output
+        if head == "exec-out":
+            return True, self._client.exec_out(serial, rest).decode("utf-8", errors="ignore")
+        if head == "get-state":
+            return True, self._client.get_state(serial)
+        if head in ("connect", "disconnect"):
+            address = rest or serial
+            msg = getattr(self._client, head)(address)
+            failed = any(word in msg.lower() for word in ("unable", "failed", "cannot"))
+            return not failed, msg
+        if head in ("push", "pull"):
+            paths = shlex.split(rest)
+            if len(paths) != 2:
+                return None
+            getattr(self._client, head)(serial, *paths)
+            return True, ""
+        return None
+
+    # ================= 常驻会话 =================
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                self._session = ADBShellSession(self.device_id, adb_path=self.adb_path,
+                                                timeout=self.session_timeout)
+            return self._session
+
+    def _session_shell(self, cmd, retry=1):
+        """
+        通过常驻会话执行 shell 命令，返回值语义和 run_cmd 一致
+        会话彻底起不来时退回到普通的 subprocess 模式
         """
-        logger.info("执行 ADB 重连流程...")
+        try:
+            logger.info(f"执行(会话): {cmd}")
+            returncode, stdout, stderr = self._get_session().execute(cmd)
+        except ADBSessionTimeout as e:
+            # 命令可能已经执行过，不能再用别的方式重跑一遍
+            logger.error(f"❌ 命令超时，不再重试: {cmd} ({e})")
+            return None
+        except (ADBSessionError, OSError) as e:
+            logger.warning(f"⚠️ ADB 会话不可用 ({e})，退回单次调用模式")
+            self.close_session()
+            return self._run_subprocess(f"shell {cmd}", retry)
 
-        # 暴力重启 ADB Server ⚠️⚠️  此处会影响所有设备，需要优化
-        subprocess.run("adb kill-server", shell=True)
-        time.sleep(1)
-        subprocess.run("adb start-server", shell=True)
-        time.sleep(2)
+        if returncode == 0:
+            return stdout.strip()
+        logger.error(f"命令失败({returncode}): {stderr.strip()}")
+        return None
 
-        # 如果是网络设备，重新 connect
-        if self.is_network_device and self.device_id:
-            logger.info(f"正在重新连接网络设备: {self.device_id}")
-            # 这里调用原生 adb connect，不走 self.run_cmd 避免死循环
-            subprocess.run(f"adb connect {self.device_id}", shell=True)
-            time.sleep(2)  # 等待连接建立
+    def close_session(self):
+        """关闭常驻会话 (下次调用会自动重建)"""
+        with self._session_lock:
+            if self._session:
+                self._session.close()
+                self._session = None
 
     # ================= 常用快捷指令 =================
 
@@ -80,38 +321,256 @@ class ADBManager:
         """
         return self.run_cmd(f"shell {cmd}")
 
-    def get_logcat(self, output_path, grep=None):
+    def batch(self, cmds, timing=True):
+        """
+        一次 adb 往返执行多条 shell 命令，每条命令的输出用标记行分隔
+        用法: cpu, mem = env.adb.batch(["dumpsys cpuinfo", "dumpsys meminfo com.xx"])
+        :param cmds: shell 命令列表
+        :param timing: 是否记录每条命令在手机端的耗时
+        :return: [{"cmd", "returncode", "output", "elapsed"}, ...] 顺序与 cmds 一致；
+                 某条命令没有执行到 (连接断开等) 时 returncode 为 -1、output 为 None
+        """
+        if not cmds:
+            return []
+
+        mark = f"__DN_B_{uuid.uuid4().hex[:8]}__"
+        # mksh/bash 自带 EPOCHREALTIME，取不到再退回 date (多一次 fork)
+        now = '${EPOCHREALTIME:-$(date +%s.%N)}' if timing else "0"
+        lines = []
+        for i, cmd in enumerate(cmds):
+            lines.append(f"printf '\\n{mark}:{i}:S:%s\\n' \"{now}\"")
+            # 子 shell 隔离：一条命令 exit/出错不影响后面的命令
+            lines.append(f"( {cmd}\n) </dev/null 2>/dev/null")
+            lines.append(f"printf '\\n{mark}:{i}:E:%d:%s\\n' $? \"{now}\"")
+        script = "\n".join(lines)
+
+        logger.info(f"执行(批量 {len(cmds)} 条): {'; '.join(cmds)}")
+        output = self._shell_raw(script)
+        return self._parse_batch(cmds, mark, output or "")
+
+    @staticmethod
+    def _parse_batch(cmds, mark, output):
+        results = [
+            {"cmd": cmd, "returncode": -1, "output": None, "elapsed": None} for cmd in cmds
+        ]
+        pattern = re.compile(rf"\n?{mark}:(\d+):(S|E):(?:(-?\d+):)?(\S*)\n")
+        begin = {}
+        for match in pattern.finditer(output):
+            i = int(match.group(1))
+            if match.group(2) == "S":
+                begin[i] = (match.end(), match.group(4))
+                continue
+            if i not in begin:
+                continue
+            body_start, t0 = begin.pop(i)
+            results[i]["output"] = output[body_start:match.start()].strip()
+            results[i]["returncode"] = int(match.group(3))
+            try:
+                results[i]["elapsed"] = round(float(match.group(4)) - float(t0), 6)
+            except ValueError:
+                results[i]["elapsed"] = None
+        return results
+
+    def _shell_raw(self, script):
+        """
+        执行一段 shell 脚本，只返回 stdout (不管脚本整体的退出码)
+        连接断开时走重连流程后再试一次
+        """
+        for attempt in range(2):
+            try:
+                if self.backend == "native":
+                    return self._client.shell(self.device_id, script)[1]
+                if self.use_session:
+                    return self._get_session().execute(script)[1]
+
+                # 参数列表直接传给 adb，不经过本机 shell，省去转义问题
+                args = [self.adb_path] + (["-s", self.device_id] if self.device_id else [])
+                result = subprocess.run(args + ["shell", script], capture_output=True, text=True)
+                error_msg = result.stderr.lower()
+                if "device not found" in error_msg or "offline" in error_msg:
+                    raise ADBProtocolError(error_msg)
+                return result.stdout
+            except ADBSessionTimeout as e:
+                # 脚本可能已经跑了一部分，重跑会重复执行 (am start / rm / input ...)
+                logger.error(f"❌ 批量执行超时，不再重试: {e}")
+                return None
+            except (ADBProtocolError, ADBSessionError) as e:
+                logger.warning(f"⚠️ 批量执行失败 ({e})")
+                if attempt == 0:
+                    self.reconnect()
+            except Exception as e:
+                logger.error(f" 执行异常: {e}")
+                return None
+        return None
+
+    def get_prop(self, name):
+        """读取系统属性 (开启缓存后走缓存)"""
+        return self.shell(f"getprop {name}")
+
+    def get_pid(self, package):
+        """获取包名对应的进程 PID 列表"""
+        output = self.shell(f"pidof {package}")
+        return [int(pid) for pid in output.split()] if output else []
+
+    def get_resolution(self):
+        """屏幕分辨率 (宽, 高)，取不到返回 None"""
+        output = self.shell("wm size")
+        match = re.findall(r"(\d+)x(\d+)", output or "")
+        # 有 Override size 时以最后一个为准
+        return tuple(int(v) for v in match[-1]) if match else None
+
+    def get_package_version(self, package):
+        """应用版本信息: {"versionName", "versionCode"}"""
+        output = self.shell(f"dumpsys package {package}")
+        if not output:
+            return None
+        name = re.search(r"versionName=(\S+)", output)
+        code = re.search(r"versionCode=(\d+)", output)
+        return {
+            "versionName": name.group(1) if name else None,
+            "versionCode": int(code.group(1)) if code else None,
+        }
+
+    def stream_lines(self, cmd, raw=False):
         """
-        输出logcat 直接将流重定向到文件，不占用内存
+        以流的方式逐行读取 shell 命令的输出，不把全部内容读进内存
+        用法:
+            with contextlib.closing(adb.stream_lines("logcat -d")) as lines:
+                for line in lines: ...
+        提前 break / close() 时会结束底层的 adb 进程 (或 socket)
+        :param raw: True 时直接产出 bytes，不做解码 (落盘用)
+        :raises RuntimeError: adb 进程异常退出 (例如设备掉线)
         """
-        # -d “Dump the log and exit”（倒出当前缓冲区的内容然后退出）
-        cmd = "logcat -d"
-        if grep:
-            cmd += f" | grep '{grep}'"
+        if self.backend == "native":
+            sock = self._client.open_shell(self.device_id, cmd)
+            reader = sock.makefile("rb")
+            try:
+                for line in reader:
+                    yield line if raw else line.decode("utf-8", errors="ignore")
+            finally:
+                reader.close()
+                sock.close()
+            return
 
-        # 手动组装带前缀的完整命令
-        prefix = f"adb -s {self.device_id}" if self.device_id else "adb"
-        full_cmd = f"{prefix} {cmd}"
+        args = [self.adb_path] + (["-s", self.device_id] if self.device_id else [])
+        logger.info(f"执行(流): {' '.join(args)} shell {cmd}")
+        process = subprocess.Popen(
+            args + ["shell", cmd], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        # stderr 在后台线程里一直读走，否则设备端往 stderr 写多了会把管道写满、卡住进程；
+        # 只保留最后一段用于报错
+        stderr_tail = collections.deque(maxlen=_STDERR_TAIL_CHUNKS)
+        drainer = threading.Thread(
+            target=self._drain, args=(process.stderr, stderr_tail),
+            name="adb-stream-stderr", daemon=True
+        )
+        drainer.start()
+        try:
+            for line in process.stdout:
+                yield line if raw else line.decode("utf-8", errors="ignore")
+            if process.wait() != 0:
+                drainer.join(timeout=1)
+                error_msg = b"".join(stderr_tail).decode("utf-8", errors="ignore").strip()
+                raise RuntimeError(f"命令异常退出({process.returncode}): {error_msg}")
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            drainer.join(timeout=1)
+
+    @staticmethod
+    def _drain(pipe, tail):
+        """
+        把管道读到 EOF，只留最后几块 (stream_lines 的 stderr 用)
+        :param pipe: 子进程的输出管道，读完后关闭
+        :param tail: 定长 deque，存最后读到的数据块
+        """
+        try:
+            for chunk in iter(lambda: pipe.read1(_STDERR_CHUNK), b""):
+                tail.append(chunk)
+        except (OSError, ValueError):
+            pass
+        finally:
+            pipe.close()
+
+    def get_logcat(self, output_path, grep=None, compress=None, max_bytes=None):
+        """
+        输出logcat 边读边写 (可边写边压缩)，不占用内存
+        :param output_path: 保存路径；以 .gz / .zst 结尾时自动压缩
+        :param grep: 只保留包含该字符串的行 (本地流式过滤，不再依赖 shell 的 grep)
+        :param compress: "gzip" / "zstd"，会自动补上对应后缀
+        :param max_bytes: 最多写入多少字节 (压缩前)，超出后截断
+        :return: 成功返回实际保存路径 (可能补了后缀)，失败返回 False
+        """
+        output_path, compress = resolve_compression(output_path, compress)
+        needle = grep.encode("utf-8") if grep else None
 
         try:
             logger.info(f"正在抓取 Logcat 到文件: {output_path}")
+            written = 0
+            truncated = False
 
-            # 打开文件句柄，作为 stdout 的接收端
-            with open(output_path, "w", encoding="utf-8", errors="ignore") as f:
-                # 执行命令，stdout=f 表示直接写进文件
-                result = subprocess.run(full_cmd, shell=True, stdout=f, stderr=subprocess.PIPE)
-            # 检查结果
-            if result.returncode == 0:
-                logger.info(f"✅ Logcat 已保存: {output_path}")
-                return True
-            else:
-                logger.error(f" Logcat 保存失败")
-                return False
+            # -d “Dump the log and exit”（倒出当前缓冲区的内容然后退出）
+            with contextlib.closing(self.stream_lines("logcat -d", raw=True)) as lines, \
+                    open_write(output_path, compress) as f:
+                for line in lines:
+                    if needle is not None and needle not in line:
+                        continue
+                    if max_bytes and written + len(line) > max_bytes:
+                        truncated = True
+                        break
+                    f.write(line)
+                    written += len(line)
+
+            if truncated:
+                logger.warning(f"⚠️ Logcat 超过 {max_bytes} 字节，已截断")
+            logger.info(f"✅ Logcat 已保存: {output_path} (原始 {written} 字节)")
+            return output_path
 
         except Exception as e:
             logger.error(f"Logcat 执行异常: {e}")
             return False
 
+    def exec_out(self, cmd, output_path):
+        """
+        执行 exec-out 命令，把二进制输出直接写入文件 (例如 screencap -p)
+        """
+        if self.backend == "native":
+            return self._stream_native_to_file(f"exec:{cmd}", output_path, "exec-out")
+
+        full_cmd = f"{self.cmd_prefix} exec-out {cmd}"
+        try:
+            with open(output_path, "wb") as f:
+                result = subprocess.run(full_cmd, shell=True, stdout=f, stderr=subprocess.PIPE)
+            return result.returncode == 0
+        except Exception as e:
+            logger.error(f"exec-out 执行异常: {e}")
+            return False
+
+    def _stream_native_to_file(self, service, output_path, label):
+        """协议模式下把服务的输出流直接写进文件"""
+        try:
+            logger.info(f"正在抓取 {label} 到文件: {output_path}")
+            with open(output_path, "wb") as f:
+                self._client.stream(self.device_id, service, f)
+            logger.info(f"✅ {label} 已保存: {output_path}")
+            return True
+        except Exception as e:
+            logger.error(f"{label} 执行异常: {e}")
+            return False
+
+    def push(self, local_path, remote_path):
+        """上传文件到手机"""
+        return self.run_cmd(f'push "{local_path}" "{remote_path}"') is not None
+
+    def pull(self, remote_path, local_path):
+        """从手机拉取文件"""
+        return self.run_cmd(f'pull "{remote_path}" "{local_path}"') is not None
+
     def ping_gateway(self, target="8.8.8.8", count=4):
         """
         让手机 ping 外部地址
@@ -0,0 +1,188 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from libs.logger import logger
+
+
+class PoolResult(dict):
+    """
+    并发执行的汇总结果: { 设备名: {"status", "data", "msg", "elapsed"} }
+    和积木的 {status, data, msg} 结构保持一致，另外多一个耗时
+    """
+
+    @property
+    def ok(self):
+        """执行成功的设备名列表"""
+        return [name for name, res in self.items() if res["status"]]
+
+    @property
+    def failed(self):
+        """执行失败 (异常/超时/返回 None) 的设备名列表"""
+        return [name for name, res in self.items() if not res["status"]]
+
+    def data(self):
+        """{ 设备名: 返回值 }"""
+        return {name: res["data"] for name, res in self.items()}
+
+
+class AdbPool(dict):
+    """
+    设备池：本身就是 { 设备名: ADBManager } 字典 (老代码 env.adb_pool['xx'] 照用)，
+    额外提供 map / broadcast / gather，在有界线程池里对所有设备并发执行。
+
+    注意：超时只是不再等待结果，卡住的线程会一直占着一个 worker 直到 adb 返回。
+    所以还在线程池里排队的任务也有期限 (queue_timeout，从提交时算起)，
+    worker 全被卡死的任务占满时，后面的调用按排队超时返回，不会一直等下去。
+    """
+
+    def __init__(self, *args, max_workers=8, timeout=30, queue_timeout=None, **kwargs):
+        """
+        :param timeout: 单台设备的执行超时 (秒)，从真正开始执行时算起
+        :param queue_timeout: 在线程池里排队最多等多久 (秒)，默认和 timeout 一样
+        """
+        super().__init__(*args, **kwargs)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.queue_timeout = timeout if queue_timeout is None else queue_timeout
+        self._executor = None
+        self._abandoned = 0  # 已经超时、但还占着 worker 的任务数
+        self._abandoned_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        按 config.yaml 建设备池并并发连接 (TestContext.adb_pool 和子进程里的狗都用这个)
+        :param config: 整个配置字典，读 adb_devices / adb_pool 两节
+        """
+        from libs.adb_manager import ADBManager
+
+        pool_conf = config.get("adb_pool", {})
+        pool = cls(
+            max_workers=pool_conf.get("max_workers", 8),
+            timeout=pool_conf.get("timeout", 30),
+            queue_timeout=pool_conf.get("queue_timeout"),
+        )
+        for name, dev_conf in config.get("adb_devices", {}).items():
+            # 创建绑定了具体IP的管理器 (支持字符串或字典两种配置写法)
+            pool[name] = ADBManager.from_config(dev_conf)
+
+        # 并发连接 (如果是网络设备)，不再一台一台排队
+        result = pool.connect_all()
+        if result.failed:
+            logger.warning(f"⚠️ 以下设备连接失败: {result.failed}")
+        return pool
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="adb_pool"
+            )
+        return self._executor
+
+    def map(self, fn, timeout=None, names=None):
+        """
+        对每台设备执行 fn(adb)
+        :param fn: 接收 ADBManager 的函数
+        :param timeout: 单台设备的超时 (秒)，从该设备真正开始执行时算起
+        :param names: 只对这些设备执行，默认全部
+        """
+        names = list(self.keys()) if names is None else names
+        return self.gather({name: fn for name in names}, timeout=timeout)
+
+    def broadcast(self, cmd, timeout=None, names=None):
+        """对每台设备执行同一条 shell 命令，返回 None 视为失败"""
+        return self.map(lambda adb: adb.shell(cmd), timeout=timeout, names=names)
+
+    def gather(self, calls, timeout=None):
+        """
+        每台设备执行各自的函数
+        :param calls: { 设备名: fn(adb) }
+        :param timeout: 单台设备的执行超时；排队超过 queue_timeout 还没开始的也算超时，
+                        所以整体最多等 queue_timeout + timeout 秒
+        """
+        timeout = self.timeout if timeout is None else timeout
+        results = PoolResult()
+        started = {}
+        futures = {}
+        submitted = time.monotonic()
+        queue_deadline = submitted + self.queue_timeout
+
+        for name, fn in calls.items():
+            adb = self.get(name)
+            if adb is None:
+                results[name] = self._result(False, None, f"设备不存在: {name}", 0)
+                continue
+            futures[self._get_executor().submit(self._call, name, fn, adb, started)] = name
+
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for fut in list(pending):
+                name = futures[fut]
+                if name in started:
+                    # 已经开始执行、且超过了自己的超时时间
+                    if now - started[name] < timeout:
+                        continue
+                    msg = f"超时 ({timeout}s)"
+                    if not fut.cancel():
+                        self._abandon(fut)
+                elif now >= queue_deadline:
+                    # 一直没排上 worker (多半是 worker 被卡死的任务占满了)
+                    if not fut.cancel():
+                        continue  # 刚好开始执行了，按执行超时算
+                    msg = f"排队超时 ({self.queue_timeout}s 内没有空闲 worker)"
+                else:
+                    continue
+                pending.discard(fut)
+                results[name] = self._result(False, None, msg, now - submitted)
+                logger.warning(f"⏰ [设备池] {name} {msg}")
+            if not pending:
+                break
+
+            # 下一次检查的时间点：最早可能超时的那台设备 (或排队期限)
+            deadlines = [started[futures[f]] + timeout - now if futures[f] in started else queue_deadline - now
+                         for f in pending]
+            step = max(0.01, min(deadlines))
+            done, pending = wait(pending, timeout=step, return_when=FIRST_COMPLETED)
+            for fut in done:
+                results[futures[fut]] = fut.result()
+
+        return results
+
+    def _abandon(self, fut):
+        """超时但还在跑的任务：记一笔，跑完再减回来；worker 全被占满时提醒一下"""
+        with self._abandoned_lock:
+            self._abandoned += 1
+            stuck = self._abandoned
+        fut.add_done_callback(self._release)
+        if stuck >= self.max_workers:
+            logger.error(f"🚨 [设备池] {stuck} 个超时任务还占着 worker (共 {self.max_workers} 个)，"
+                         f"后续任务会排队超时，请检查卡住的设备")
+
+    def _release(self, fut):
+        with self._abandoned_lock:
+            self._abandoned -= 1
+
+    def _call(self, name, fn, adb, started):
+        started[name] = time.monotonic()
+        try:
+            data = fn(adb)
+            # 和 run_cmd 的语义保持一致：None 代表执行失败
+            status = data is not None and data is not False
+            return self._result(status, data, "" if status else "返回空结果", time.monotonic() - started[name])
+        except Exception as e:
+            logger.error(f"[设备池] {name} 执行异常: {e}")
+            return self._result(False, None, str(e), time.monotonic() - started[name])
+
+    @staticmethod
+    def _result(status, data, msg, elapsed):
+        return {"status": status, "data": data, "msg": msg, "elapsed": round(elapsed, 3)}
+
+    def connect_all(self, timeout=None):
+        """并发连接所有设备 (网络设备才会真正执行 adb connect)"""
+        return self.map(lambda adb: adb.connect() or True, timeout=timeout)
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,202 @@
+import os
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from libs.logger import logger
+
+
+class ADBSessionError(Exception):
+    """长连接 shell 会话异常 (进程挂了 / 超时)"""
+
+
+class ADBSessionTimeout(ADBSessionError):
+    """命令执行超时：命令可能已经在手机上跑了，不能重试 (会话已关闭，下次自动重建)"""
+
+
+class _PipeCollector:
+    """
+    后台线程持续读取管道，把数据攒到 buffer 里
+    （跨平台：Windows 的管道不支持 select，所以用线程读）
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = bytearray()
+        self.closed = False
+        self.cond = threading.Condition()
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        fd = self.stream.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                with self.cond:
+                    self.buffer += chunk
+                    self.cond.notify_all()
+        except OSError:
+            pass
+        finally:
+            with self.cond:
+                self.closed = True
+                self.cond.notify_all()
+
+    def wait_for(self, marker, timeout):
+        """
+        等待 buffer 中出现 marker，返回 marker 之前的数据并把它们从 buffer 中移除
+        :return: (数据, marker 之后到行尾的内容)；超时/管道关闭返回 None
+        """
+        with self.cond:
+            ok = self.cond.wait_for(
+                lambda: self._find(marker) >= 0 or self.closed, timeout=timeout
+            )
+            idx = self._find(marker)
+            if not ok or idx < 0:
+                return None
+            line_end = self.buffer.find(b"\n", idx + len(marker))
+            data = bytes(self.buffer[:idx])
+            tail = bytes(self.buffer[idx + len(marker):line_end])
+            del self.buffer[:line_end + 1]
+            return data, tail
+
+    def _find(self, marker):
+        idx = self.buffer.find(marker)
+        # 要等到 marker 所在的整行都到齐了才算数
+        if idx >= 0 and self.buffer.find(b"\n", idx + len(marker)) < 0:
+            return -1
+        return idx
+
+
+class ADBShellSession:
+    """
+    常驻的 `adb shell` 进程：多条命令复用同一个连接，省掉每次 fork + ADB 握手。
+
+    每条命令后面追加一个哨兵行 (带退出码)，读到哨兵就说明这条命令的输出结束了。
+    会话进程挂了 / 写不进去时自动重启重试一次；超时不重试 (命令可能已经执行过)，
+    关掉会话后抛 ADBSessionTimeout。
+    默认不限时 (和单次 subprocess 调用一样)，需要时传 timeout (会话级默认值或 execute 单条指定)。
+    """
+
+    def __init__(self, device_id=None, adb_path="adb", timeout=None):
+        self.device_id = device_id
+        self.adb_path = adb_path
+        self.timeout = timeout
+
+        self.process = None
+        self._stdout = None
+        self._stderr = None
+        self._seq = 0
+        self._token = uuid.uuid4().hex[:12]
+        # 同一会话里命令只能串行执行
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动 adb shell 进程"""
+        self.close()
+        args = [self.adb_path]
+        if self.device_id:
+            args += ["-s", self.device_id]
+        args.append("shell")
+
+        logger.info(f"🔗 [ADB会话] 启动常驻 shell: {' '.join(args)}")
+        self.process = subprocess.Popen(
+            args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self._stdout = _PipeCollector(self.process.stdout)
+        self._stderr = _PipeCollector(self.process.stderr)
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def execute(self, cmd, timeout=None):
+        """
+        在会话里执行一条 shell 命令
+        :param timeout: 最多等多少秒，None 表示用会话的默认值 (默认不限时)
+        :return: (returncode, stdout, stderr)，输出和命令本身的输出完全一致 (不额外加减换行)
+        """
+        with self._lock:
+            try:
+                return self._execute_once(cmd, timeout)
+            except ADBSessionTimeout:
+                raise
+            except ADBSessionError as e:
+                # 会话挂了：重启后再试一次
+                logger.warning(f"⚠️ [ADB会话] {e}，正在重启会话...")
+                return self._execute_once(cmd, timeout, restart=True)
+
+    def _execute_once(self, cmd, timeout, restart=False):
+        if restart or not self.is_alive():
+            self.start()
+
+        timeout = self.timeout if timeout is None else timeout
+        self._seq += 1
+        marker = f"__DN_{self._token}_{self._seq}__"
+
+        # 用 sh -c 包一层：命令里的语法错误 / exit 不会把整个会话带走
+        # </dev/null 防止命令把后面排队的输入当 stdin 吃掉
+        script = (
+            f"sh -c {shlex.quote(cmd)} </dev/null\n"
+            f"printf '\\n{marker} %d\\n' $?\n"
+            f"printf '\\n{marker}\\n' >&2\n"
+        )
+        try:
+            self.process.stdin.write(script.encode("utf-8"))
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise ADBSessionError(f"写入会话失败: {e}")
+
+        # stdout / stderr 共用一个截止时间，最多等 timeout 秒 (None 不限时)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        out = self._stdout.wait_for(marker.encode(), timeout)
+        if out is None:
+            self._handle_broken(timeout)
+        err = self._stderr.wait_for(marker.encode(), None if deadline is None else max(0, deadline - time.monotonic()))
+        if err is None:
+            self._handle_broken(timeout)
+
+        stdout, tail = out
+        try:
+            returncode = int(tail.strip() or -1)
+        except ValueError:
+            returncode = -1
+
+        return (
+            returncode,
+            self._unframe(stdout).decode("utf-8", errors="ignore"),
+            self._unframe(err[0]).decode("utf-8", errors="ignore"),
+        )
+
+    @staticmethod
+    def _unframe(data):
+        """去掉哨兵前面 printf 补的那个换行 (只去这一个，命令自己输出的换行原样保留)"""
+        return data[:-1] if data.endswith(b"\n") else data
+
+    def _handle_broken(self, timeout):
+        if self.is_alive():
+            # 进程还活着但等不到哨兵：状态未知，直接杀掉，下次重启
+            self.close()
+            raise ADBSessionTimeout(f"命令执行超时 ({timeout}s)")
+        raise ADBSessionError("会话进程已退出")
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+                self.process.terminate()
+                self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        except Exception as e:
+            logger.warning(f"关闭 ADB 会话出错: {e}")
+        finally:
+            self.process = None
@@ -1,9 +1,137 @@
+import heapq
+import itertools
+import random
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from libs.dog_stats import DogStats
+from libs.event_bus import ALERT, COALESCE, EventBus, fingerprint
 from libs.logger import logger
 
+# 各策略默认限流: (每秒补充几个令牌, 桶容量)
+DEFAULT_ALERT_RATES = {
+    "screenshot": (0.1, 1),  # 截图最贵，默认 10 秒最多一张
+    "on_alert": (1, 5),      # 自定义回调 (飞书等)，允许小突发
+}
+
+
+class TokenBucket:
+    """令牌桶限流 (线程安全)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class AlertPipeline:
+    """
+    报警流水线：去重合并 -> 发布到事件总线 -> 狗自己的订阅者按策略限流执行慢动作
+
+    - 同一指纹在 window 秒内只放行第一条，后面的只计数；
+      下一个窗口再出现时，消息后面带上上个窗口被合并的次数
+    - 截图 / 回调这种慢动作由这只狗在总线上的订阅者 (自己的有界队列 + 线程) 执行，按策略各自令牌桶限流，
+      还在排队的同类报警直接合并 (计数)，队列满了又合并不了才丢弃，报警风暴不会拖慢狗的主循环，更不会把手机压垮
+    - stop / mark 只是改个标记，直接同步执行
+    """
+
+    def __init__(self, window=10, rates=None, queue_size=64):
+        self.window = window
+        self.queue_size = queue_size
+        self.buckets = {
+            name: TokenBucket(rate, capacity)
+            for name, (rate, capacity) in {**DEFAULT_ALERT_RATES, **(rates or {})}.items()
+        }
+        self._seen = {}  # { 指纹: [窗口开始时间, 次数] }
+        # 狗线程 (admit) 和订阅者线程 (run) 都会改 _seen / stats，统一用这把锁
+        self._lock = threading.Lock()
+        self._bus = None
+        self.subscription = None
+
+        self.stats = {"received": 0, "coalesced": 0, "rate_limited": 0, "dropped": 0, "executed": 0}
+
+    def admit(self, msg):
+        """
+        去重检查
+        :return: 需要处理时返回 (可能追加了合并计数的) 消息，被合并返回 None
+        """
+        key = fingerprint(msg)
+        now = time.monotonic()
+        with self._lock:
+            self.stats["received"] += 1
+            entry = self._seen.get(key)
+            if entry and now - entry[0] < self.window:
+                entry[1] += 1
+                self.stats["coalesced"] += 1
+                return None
+
+            if entry and entry[1] > 1:
+                msg = f"{str(msg).rstrip()} (上一个 {self.window}s 窗口内重复 {entry[1]} 次)"
+            self._seen[key] = [now, 1]
+            if len(self._seen) > 1024:
+                # 清理过期指纹，防止无限增长
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+            return msg
+
+    def subscribe(self, bus, handler, name, filter):
+        """在总线上挂这只狗的慢动作订阅者 (只挂一次，排队中的同类报警合并)"""
+        with self._lock:
+            if self.subscription is None:
+                self._bus = bus
+                self.subscription = bus.subscribe(handler, name=name, policy=COALESCE,
+                                                  maxsize=self.queue_size, filter=filter)
+            return self.subscription
+
+    def run(self, name, fn, msg):
+        """限流后执行 fn(msg) (在订阅者线程里调用)；被限流或执行失败返回 False"""
+        bucket = self.buckets.get(name)
+        if bucket and not bucket.allow():
+            self._count("rate_limited")
+            return False
+        try:
+            fn(msg)
+            self._count("executed")
+            return True
+        except Exception as e:
+            logger.error(f"⚠️ [Alert] {name} 执行失败: {e}")
+            return False
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.stats)
+        if self.subscription is not None:
+            data["dropped"] = self.subscription.snapshot()["dropped"]
+        return data
+
+    def close(self, timeout=1):
+        """退订，让订阅者线程把队列里剩下的做完 (最多等 timeout 秒)"""
+        if self.subscription is not None:
+            self._bus.unsubscribe(self.subscription, timeout)
+            dropped = self.subscription.snapshot()["dropped"]
+            with self._lock:
+                self.stats["dropped"] = dropped
+
 # 继承threading.Thread
 class BaseDog(threading.Thread):
+    # 默认在测试进程里起线程；设成 True (或 env.start(..., isolated=True)) 则放到子进程里跑，见 core/dog_process.py
+    isolated = False
+
     def __init__(self, context, *args, **kwargs):
         super().__init__()
         self.context = context
@@ -16,6 +144,23 @@ class BaseDog(threading.Thread):
         # 结果文件路径 (让子类去赋值)
         self.output_file = None
 
+        # 实例名 (DogPoolManager 放狗时赋值，同一种狗可以放多只)
+        self.key = None
+
+        # 运行统计 (计数器 + 直方图)，DogPoolManager.stats() 汇总，收狗时挂到报告上
+        self.stats = DogStats()
+
+        # 事件总线：报警按主题发到总线上，飞书等订阅者也能收到 (bus 参数 > context.bus > 进程内默认总线)
+        self.bus = kwargs.get("bus") or getattr(context, "bus", None) or EventBus.default()
+
+        # 报警流水线 (去重 + 限流 + 异步)，可通过参数调整:
+        # alert_window=10 合并窗口秒数; alert_rates={"screenshot": (0.1, 1)}; alert_queue=64
+        self.alerts = AlertPipeline(
+            window=kwargs.get("alert_window", 10),
+            rates=kwargs.get("alert_rates"),
+            queue_size=kwargs.get("alert_queue", 64),
+        )
+
     def run(self):
         """
         线程启动后自动运行这里
@@ -23,14 +168,25 @@ class BaseDog(threading.Thread):
         logger.info(f"🐕‍🦺🐕‍🦺 [dog出动] {self.__class__.__name__} 已启动...")
         error_count = 0
         while not self._stop_event.is_set():
+            started = time.monotonic()
+            error = None
             try:
                 self.working()  # 调用子类的动作
-                error_count =0
             except Exception as e:
-                error_count += 1
-                wait_time=min(60,1*(2**(error_count-1)))
-                logger.error(f"🐕‍🦺🐕‍🦺 [Dog出错，第{error_count}次重试，等待 {wait_time}s: {e}")
-                self.interruptible_sleep(wait_time)  # 出错休息一下防止刷屏
+                error = e
+            self.stats.observe("working", time.monotonic() - started)
+            self.stats.count("iterations")
+            if error is None:
+                error_count = 0
+                continue
+
+            error_count += 1
+            self.stats.count("errors")
+            wait_time=min(60,1*(2**(error_count-1)))
+            logger.error(f"🐕‍🦺🐕‍🦺 [Dog出错，第{error_count}次重试，等待 {wait_time}s: {error}")
+            slept = time.monotonic()
+            self.interruptible_sleep(wait_time)  # 出错休息一下防止刷屏
+            self.stats.count("backoff_sec", time.monotonic() - slept)
         logger.info(f"🐕‍🦺🐕‍🦺 [收狗] {self.__class__.__name__} 循环结束。")
 
     def interruptible_sleep(self, seconds):
@@ -44,11 +200,43 @@ class BaseDog(threading.Thread):
     def stop(self):
         """
         外部调用这个方法来停止线程
+        拆成三步 (发信号 / 等结束 / 收尾)，DogPoolManager.stop_all 会先给所有狗发信号再并发等待
         """
+        self.request_stop()
+        self.wait_stopped(timeout=2)  # 等待线程安全结束 这2s等待事件 最多两秒
+        return self.collect()
+
+    def request_stop(self):
+        """只发停止信号，不阻塞 (子类在这里叫醒阻塞的读取、结束本地进程)"""
         self._stop_event.set()
-        self.join(timeout=2)  # 等待线程安全结束 这2s等待事件 最多两秒
+
+    def wait_stopped(self, timeout=2):
+        """等线程结束，返回是否已经停下"""
+        if self.is_alive():
+            self.join(timeout)
+        return not self.is_alive()
+
+    def collect(self, timeout=None):
+        """
+        停下之后的收尾：报警流水线收尾，返回产物路径
+        :param timeout: 收尾最多还能花多少秒 (stop_all 传入剩余时间；子类等后台任务时用，None 表示按子类默认)
+        """
+        self._close_alerts()
         return self.output_file
 
+    def snapshot(self):
+        """运行统计快照 (计数器 / 直方图 / 每秒吞吐 / 报警统计)"""
+        data = {"dog": self.__class__.__module__, **self.stats.snapshot(), "alerts": self.alerts.snapshot()}
+        tick_stats = getattr(self, "tick_stats", None)
+        if tick_stats is not None:
+            data["ticks"] = dict(tick_stats)
+        return data
+
+    def _close_alerts(self):
+        self.alerts.close()
+        if self.alerts.stats["received"]:
+            logger.info(f"🔔 [{self.__class__.__name__}] 报警统计: {self.alerts.snapshot()}")
+
     def is_stopped(self):
 
         return self._stop_event.is_set()
@@ -57,25 +245,56 @@ class BaseDog(threading.Thread):
 
         raise NotImplementedError("必须在子类实现 working 方法")
 
-    def alert(self, msg):
+    @property
+    def source(self):
+        """发到总线上的来源名 (实例名，没有就用模块名)"""
+        return self.key or self.__class__.__module__
+
+    def alert(self, msg, topic=ALERT, **data):
         """
          统一报警接口
         子类只需调用 self.alert("发现异常xxx")，父类负责根据配置决定怎么做。
+        topic 是事件主题 (CRASH / ANR / PERF / DEVICE_OFFLINE ...)，data 是附带的结构化信息，
+        飞书等订阅者按主题从事件总线上收。
+        同一种报警 (数字/地址归一化后相同) 在 alert_window 秒内只处理一次，
+        截图和回调由这只狗在总线上的订阅者限流执行，不会阻塞调用方
         """
-        # 优先执行：用户传入的自定义回调 (最高优先级)
-        # env.start("xxx", on_alert=lambda x: ...)
-        callback = self.kwargs.get("on_alert")
-        if callback and callable(callback):
-            try:
-                callback(msg)
-            except Exception as e:
-                logger.error(f"⚠️ [Dog] 回调执行失败: {e}")
+        msg = self.alerts.admit(msg)
+        if msg is None:
+            return
+        self._dispatch_alert(msg, topic, **data)
 
-        # 兜底执行：配置化策略
+    def _dispatch_alert(self, msg, topic=ALERT, **data):
+        """去重之后的部分：执行策略、挂慢动作订阅者、发到总线 (进程狗转发子进程里已去重的报警时直接调这里)"""
+        # 配置化策略 (可以是一个，也可以是列表)
         # env.start("xxx", hook_strategy="stop")
+        # 标记类策略只是改个标记，直接同步执行
+        strategies = self._strategies()
+        for name in strategies:
+            if name != "screenshot":
+                self._apply_strategy(name, msg)
+
+        # 慢动作 (回调 / 截图) 交给这只狗自己的订阅者
+        if callable(self.kwargs.get("on_alert")) or "screenshot" in strategies:
+            self.alerts.subscribe(self.bus, self._handle_alert, name=f"{self.source}.alert",
+                                  filter=lambda event: event.dog is self)
+        self.bus.publish(topic, msg, source=self.source, dog=self, **data)
+
+    def _strategies(self):
         strategy = self.kwargs.get("hook_strategy")
-        if strategy:
-            self._apply_strategy(strategy, msg)
+        return [strategy] if isinstance(strategy, str) else (strategy or [])
+
+    def _handle_alert(self, event):
+        """订阅者线程里执行：先跑用户回调 (最高优先级)，再截图"""
+        msg = event.merged_msg()
+
+        # env.start("xxx", on_alert=lambda x: ...)
+        callback = self.kwargs.get("on_alert")
+        if callable(callback):
+            self.alerts.run("on_alert", callback, msg)
+
+        if "screenshot" in self._strategies():
+            self.alerts.run("screenshot", lambda m: self._apply_strategy("screenshot", m), msg)
 
     def _apply_strategy(self, strategy, msg):
         """内置的常见策略，免去写回调的麻烦"""
@@ -91,7 +310,7 @@ class BaseDog(threading.Thread):
             # screenshot
             # 注意：积木文件名需确保存在，否则会报错
             try:
-                self.context.run("screenshot", filename=f"alert_{int(time.time())}.png")
+                self.context.run("screenshot", filename=f"alert_{int(time.time() * 1000)}.png")
             except Exception as e:
                 logger.error(f"截图积木调用失败: {e}")
 
@@ -101,4 +320,231 @@ class BaseDog(threading.Thread):
             logger.warning(f"🚩 [策略触发] 已标记 has_failure: {msg.strip()}")
 
     def working(self):
-        raise NotImplementedError("必须在子类实现 working 方法")
\ No newline at end of file
+        raise NotImplementedError("必须在子类实现 working 方法")
+
+class DogScheduler:
+    """
+    周期性狗的共享调度器：一个调度线程 (按下次触发时间排的小根堆) + 有界线程池执行 tick，
+    不再每只狗一个线程睡大觉，几百台设备也只占 max_workers 个线程
+
+    - 固定频率调度 (下次时间 = 本次计划时间 + interval)，tick 的耗时不会累积成漂移
+    - 首次触发在 [0, min(jitter * interval, max_jitter)) 内随机错开，避免一批狗同时打 adb；
+      interval 很长的狗 (例如 300s) 也最多晚 max_jitter 秒出第一个样本，
+      狗声明 run_immediately = True (或传 run_immediately 参数) 则加进来就马上 tick
+    - 上一次 tick 还没跑完又到点了：这次跳过 (skipped)，不会同一只狗并发执行
+    - tick 比 interval 还慢记一次 overrun；线程池排队造成的延迟记在 lag 里
+    每只狗的计数在 dog.tick_stats，汇总看 scheduler.stats()
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, max_workers=4, jitter=0.1, max_jitter=1.0):
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.max_jitter = max_jitter
+        self._heap = []  # [(下次触发时间, 序号, dog)]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._dogs = []
+        self._executor = None
+        self._thread = None
+
+    @classmethod
+    def default(cls):
+        """没有经过 DogPoolManager 直接 dog.start() 时用的全局调度器"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def add(self, dog):
+        with self._cond:
+            delay = 0 if dog.run_immediately else random.uniform(0, min(self.jitter * dog.interval, self.max_jitter))
+            due = time.monotonic() + delay
+            heapq.heappush(self._heap, (due, next(self._seq), dog))
+            self._dogs.append(dog)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="dog-scheduler")
+                self._thread.start()
+            self._cond.notify()
+
+    def remove(self, dog):
+        with self._cond:
+            self._heap = [entry for entry in self._heap if entry[2] is not dog]
+            heapq.heapify(self._heap)
+            if dog in self._dogs:
+                self._dogs.remove(dog)
+
+    def stats(self):
+        """{ 狗名: tick_stats }"""
+        with self._cond:
+            return {dog.key or dog.__class__.__module__: dict(dog.tick_stats) for dog in self._dogs}
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                due, _, dog = heapq.heappop(self._heap)
+            if not dog.is_stopped():
+                self._dispatch(dog, due)
+
+    def _dispatch(self, dog, due):
+        stats = dog.tick_stats
+        with dog._tick_lock:
+            busy = dog._ticking
+            dog._ticking = True
+        if busy:
+            stats["skipped"] += 1
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dog_tick")
+            self._executor.submit(self._run, dog, due)
+
+        # 调度线程本身被卡住 (比如机器休眠) 错过的触发点直接跳过，不补跑
+        now = time.monotonic()
+        next_due = due + dog.interval
+        if next_due <= now:
+            missed = int((now - next_due) // dog.interval) + 1
+            stats["skipped"] += missed
+            next_due += missed * dog.interval
+        with self._cond:
+            if dog in self._dogs:
+                heapq.heappush(self._heap, (next_due, next(self._seq), dog))
+                self._cond.notify()
+
+    @staticmethod
+    def _run(dog, due):
+        stats = dog.tick_stats
+        start = time.monotonic()
+        lag = start - due
+        try:
+            if not dog.is_stopped():
+                dog._tick_once()
+                stats["ticks"] += 1
+        except Exception as e:
+            stats["errors"] += 1
+            dog.stats.count("errors")
+            logger.error(f"🐕‍🦺 [{dog.__class__.__name__}] tick 出错 (第 {stats['errors']} 次): {e}")
+        finally:
+            cost = time.monotonic() - start
+            dog.stats.observe("tick", cost)
+            dog.stats.observe("lag", max(lag, 0))
+            if cost > dog.interval:
+                stats["overruns"] += 1
+            stats["max_lag"] = round(max(stats["max_lag"], lag), 3)
+            stats["max_cost"] = round(max(stats["max_cost"], cost), 3)
+            stats["total_cost"] = round(stats["total_cost"] + cost, 3)
+            with dog._tick_lock:
+                dog._ticking = False
+            # stop() 发生在 tick 执行期间：由最后一次 tick 负责收尾
+            if dog.is_stopped():
+                dog._finish()
+
+
+class ScheduledDog(BaseDog):
+    """
+    周期性狗 (opt-in)：子类实现 tick()，声明 interval (也可以用 interval 参数覆盖)，
+    由共享的 DogScheduler 按时调用，不占自己的线程
+
+        class Dog(ScheduledDog):
+            interval = 300
+            def tick(self): ...
+
+    - setup() 在第一次 tick 之前执行 (失败下次 tick 重试)，teardown() 在 stop 时执行一次
+    - scheduled 返回 False 时退回老模式：自己起线程，working() 里循环 tick
+      (流式采集这类需要常驻线程的狗用这个)
+    """
+
+    interval = 60
+    # True: 加进调度器就马上 tick，不参与首次触发的随机错开 (启动时就要一个基线样本的狗)
+    run_immediately = False
+
+    def __init__(self, context, *args, **kwargs):
+        super().__init__(context, *args, **kwargs)
+        self.interval = kwargs.get("interval", self.interval)
+        self.run_immediately = kwargs.get("run_immediately", self.run_immediately)
+        self.scheduler = None  # DogPoolManager 会塞进来共享的调度器
+        self.tick_stats = {
+            "ticks": 0, "skipped": 0, "overruns": 0, "errors": 0,
+            "max_lag": 0.0, "max_cost": 0.0, "total_cost": 0.0,
+        }
+        self._tick_lock = threading.Lock()
+        self._ticking = False
+        self._ready = False
+        self._finished = threading.Event()
+
+    @property
+    def scheduled(self):
+        return True
+
+    def setup(self):
+        pass
+
+    def tick(self):
+        raise NotImplementedError("必须在子类实现 tick 方法")
+
+    def teardown(self):
+        pass
+
+    def _tick_once(self):
+        if not self._ready:
+            self.setup()
+            self._ready = True
+        self.tick()
+
+    def _finish(self):
+        """执行一次 teardown (只执行一次，多个线程同时调用也安全)"""
+        with self._tick_lock:
+            if self._finished.is_set():
+                return
+            self._finished.set()
+            ready, self._ready = self._ready, False
+        if ready:
+            try:
+                self.teardown()
+            except Exception as e:
+                logger.error(f"🐕‍🦺 [{self.__class__.__name__}] 收尾出错: {e}")
+        logger.info(f"🐕‍🦺🐕‍🦺 [收狗] {self.__class__.__name__} 调度统计: {self.tick_stats}")
+
+    def working(self):
+        """线程模式：和调度器一样的固定频率循环"""
+        try:
+            planned = time.monotonic()
+            while not self.is_stopped():
+                start_time = time.monotonic()
+                self.stats.observe("lag", max(start_time - planned, 0))
+                self._tick_once()
+                self.tick_stats["ticks"] += 1
+                cost = time.monotonic() - start_time
+                self.stats.observe("tick", cost)
+                planned = start_time + self.interval
+                if self._stop_event.wait(max(0, self.interval - cost)):
+                    break
+        finally:
+            if self.is_stopped():
+                self._finish()
+
+    def start(self):
+        if not self.scheduled:
+            return super().start()
+        logger.info(f"🐕‍🦺🐕‍🦺 [dog出动] {self.__class__.__name__} 已加入调度 (间隔 {self.interval}s)")
+        self.scheduler = self.scheduler or DogScheduler.default()
+        self.scheduler.add(self)
+
+    def request_stop(self):
+        self._stop_event.set()
+        if self.scheduled and self.scheduler:
+            self.scheduler.remove(self)
+
+    def wait_stopped(self, timeout=2):
+        if not self.scheduled:
+            return super().wait_stopped(timeout)
+        with self._tick_lock:
+            busy = self._ticking
+        if busy:
+            # 正在跑的 tick 结束后会自己收尾
+            return self._finished.wait(timeout=timeout)
+        self._finish()
+        return True
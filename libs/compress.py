@@ -0,0 +1,83 @@
+import gzip
+import os
+from libs.logger import logger
+
+try:
+    import zstandard
+except ImportError:  # zstd 是可选依赖，没装就退回 gzip
+    zstandard = None
+
+# 压缩方式 -> 文件后缀
+COMPRESS_EXT = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def compression_of(path):
+    """根据后缀判断文件的压缩方式，未压缩返回 None"""
+    for compress, ext in COMPRESS_EXT.items():
+        if path.lower().endswith(ext):
+            return compress
+    return None
+
+
+def strip_compress_ext(path):
+    """去掉压缩后缀: a.log.gz -> a.log"""
+    compress = compression_of(path)
+    return path[:-len(COMPRESS_EXT[compress])] if compress else path
+
+
+def resolve_compression(path, compress=None):
+    """
+    统一压缩方式和文件名
+    :param compress: None / "gzip" / "zstd"；为 None 时按 path 的后缀推断
+    :return: (最终路径, 压缩方式)
+    """
+    compress = compress or compression_of(path)
+    if compress == "zstd" and zstandard is None:
+        logger.warning("⚠️ 未安装 zstandard，改用 gzip 压缩")
+        path = strip_compress_ext(path)
+        compress = "gzip"
+    if compress and compress not in COMPRESS_EXT:
+        raise ValueError(f"不支持的压缩方式: {compress}")
+    if compress and compression_of(path) != compress:
+        path = strip_compress_ext(path) + COMPRESS_EXT[compress]
+    return path, compress
+
+
+def open_write(path, compress=None, level=None):
+    """
+    打开一个二进制写入流，写进去的数据边写边压缩 (不会整块攒在内存里)
+    """
+    if compress == "gzip":
+        return gzip.open(path, "wb", compresslevel=level or 6)
+    if compress == "zstd":
+        cctx = zstandard.ZstdCompressor(level=level or 3)
+        return cctx.stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def open_read(path):
+    """
+    按后缀打开一个二进制读取流，压缩文件边读边解压
+    """
+    compress = compression_of(path)
+    if compress == "gzip":
+        return gzip.open(path, "rb")
+    if compress == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"读取 {path} 需要安装 zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def compress_file(src, compress="gzip", remove_src=True):
+    """把已有文件压缩成 src + 后缀，返回新路径"""
+    dst, compress = resolve_compression(src + COMPRESS_EXT[compress], compress)
+    with open(src, "rb") as fin, open_write(dst, compress) as fout:
+        while True:
+            chunk = fin.read(1024 * 1024)
+            if not chunk:
+                break
+            fout.write(chunk)
+    if remove_src:
+        os.remove(src)
+    return dst
@@ -0,0 +1,196 @@
+import time
+from libs.logger import logger
+
+# /proc/<pid>/stat 里 ")" 之后的字段下标 (从 state 开始数，state = 0)
+_UTIME, _STIME, _STARTTIME = 11, 12, 19
+
+
+def parse_stat(line):
+    """
+    解析一行 /proc/<pid>/stat 或 /proc/<pid>/task/<tid>/stat
+    进程名里可能有空格和括号，所以按最后一个 ")" 切
+    :return: (pid, 名字, utime + stime, starttime)；解析失败返回 None
+    """
+    head, sep, rest = line.rpartition(")")
+    if not sep:
+        return None
+    pid, _, name = head.partition(" (")
+    fields = rest.split()
+    try:
+        return int(pid), name, int(fields[_UTIME]) + int(fields[_STIME]), int(fields[_STARTTIME])
+    except (ValueError, IndexError):
+        return None
+
+
+class CpuSampler:
+    """
+    基于 /proc 的 CPU 采样器：一次 shell 调用读 /proc/stat + 进程和线程的 stat，
+    用两次采样之间的 jiffies 差值算出这段时间内准确的 CPU 占用
+
+    - 和 dumpsys cpuinfo 一样，cpu 是占整机 CPU 的百分比 (所有核加起来是 100%)；
+      cpu_core 是按单核算的 (和 top 一致，4 核满载是 400%)
+    - PID 只在第一次、进程消失或重启 (starttime 变了)、以及每 resolve_interval 秒解析一次；
+      command(inline_resolve=True) 时 pidof 也拼进采样脚本，不再单独一次 adb 往返
+      (多包同时监控、应用没在运行时，adb 调用次数也不会随包数增长)
+    - 不 fork dumpsys，手机端只有一次 sh + 一次 cat，可以做亚秒级采样
+
+    用法:
+        sampler = CpuSampler(env.adb, "com.demo")
+        sampler.sample()   # 第一次只建立基线，返回 None
+        time.sleep(0.5)
+        sampler.sample()   # {"cpu": 12.5, "cpu_core": 100.0, "pids": {...}, "threads": [...]}
+    """
+
+    def __init__(self, adb, package, threads=True, top_threads=10, resolve_interval=30):
+        self.adb = adb
+        self.package = package
+        self.threads = threads
+        self.top_threads = top_threads
+        self.resolve_interval = resolve_interval
+
+        self.pids = []
+        self._resolved_at = 0
+        self._prev = None  # 上一次采样的原始数据
+        self._inline = False  # 上一次 command 是不是 inline_resolve 模式
+
+    def resolve(self):
+        """重新解析包名对应的 PID"""
+        return self._apply_pids(self.adb.get_pid(self.package))
+
+    def _apply_pids(self, pids):
+        self._resolved_at = time.monotonic()
+        if pids != self.pids:
+            self.pids = pids
+            self._prev = None  # PID 变了，基线作废
+            if pids:
+                logger.info(f"🔍 [CpuSampler] {self.package} -> PID {pids}")
+        return self.pids
+
+    def command(self, inline_resolve=False):
+        """
+        本次采样要执行的 shell 脚本 (可以和别的命令拼进同一个 adb.batch)；
+        需要时先解析 PID，解析不到返回 None
+        :param inline_resolve: 需要解析 PID 时不单独调 adb，把 pidof 写进脚本里，由 feed 更新 PID
+        """
+        # grep 同时拿到总的 cpu 行和每个核的 cpuN 行 (用来算核数)
+        self._inline = inline_resolve
+        lines = ["grep '^cpu' /proc/stat"]
+        if not self.pids or time.monotonic() - self._resolved_at > self.resolve_interval:
+            if inline_resolve:
+                targets = "/proc/$pid/stat" + (" /proc/$pid/task/*/stat" if self.threads else "")
+                lines.append(f'pids=$(pidof {self.package}); echo "@R $pids"')
+                lines.append(f'for pid in $pids; do echo "@P $pid"; cat {targets}; done')
+                return "\n".join(lines)
+            if not self.resolve():
+                return None
+        for pid in self.pids:
+            targets = f"/proc/{pid}/stat"
+            if self.threads:
+                targets += f" /proc/{pid}/task/*/stat"
+            lines.append(f"echo '@P {pid}'; cat {targets}")
+        return "\n".join(lines)
+
+    def _parse(self, output):
+        """解析 command() 的输出，返回原始 jiffies 数据；没有输出返回 None"""
+        if not output:
+            return None
+
+        raw = {"total": None, "cores": 0, "procs": {}, "threads": {}, "resolved": None}
+        current = None
+        for line in output.splitlines():
+            if line.startswith("cpu"):
+                values = line.split()
+                if values[0] == "cpu":
+                    # user nice system idle iowait irq softirq steal (guest 已经算在 user 里了)
+                    raw["total"] = sum(int(v) for v in values[1:9])
+                else:
+                    raw["cores"] += 1
+            elif line.startswith("@R"):
+                raw["resolved"] = [int(pid) for pid in line[2:].split()]
+            elif line.startswith("@P "):
+                current = int(line[3:])
+            elif current is not None:
+                stat = parse_stat(line)
+                if stat is None:
+                    continue
+                if current not in raw["procs"]:
+                    # 每个 @P 后面第一行是进程本身 (包含已退出线程的累计时间)，后面是各线程
+                    raw["procs"][current] = stat
+                else:
+                    raw["threads"][(current, stat[0])] = stat
+        return raw if raw["total"] is not None else None
+
+    def sample(self):
+        """采一次样 (单独一次 adb 往返)，返回值见 feed"""
+        cmd = self.command()
+        if cmd is None:
+            return None
+        return self.feed(self.adb.batch([cmd], timing=False)[0]["output"])
+
+    def feed(self, output):
+        """
+        处理 command() 的输出
+        :return: 与上一次采样之间的 CPU 占用；第一次 (或 PID 刚变化) 返回 None
+            {
+                "ts": 采样时间,
+                "cpu": 整机百分比, "cpu_core": 单核百分比, "cores": 核数,
+                "pids": {pid: 整机百分比},
+                "threads": [{"pid", "tid", "name", "cpu"}, ...] (按占用从高到低，最多 top_threads 个)
+            }
+        """
+        raw = self._parse(output)
+        if raw is None:
+            return None
+        if raw["resolved"] is not None:
+            # 脚本里顺带解析了 PID (inline_resolve)
+            self._apply_pids(raw["resolved"])
+        if not self.pids:
+            return None
+
+        # 进程消失或重启 (starttime 变了)：重新解析 PID，下一次再出数据
+        prev = self._prev
+        restarted = len(raw["procs"]) < len(self.pids) or (
+            prev and any(prev["procs"].get(pid, stat)[3] != stat[3] for pid, stat in raw["procs"].items())
+        )
+        if restarted:
+            logger.warning(f"⚠️ [CpuSampler] {self.package} 进程变化，重新解析 PID")
+            self._prev = None
+            if self._inline:
+                self._resolved_at = float("-inf")  # 下一次的采样脚本里重新解析
+            else:
+                self.resolve()
+            return None
+
+        self._prev = raw
+        if prev is None:
+            return None
+
+        total_delta = raw["total"] - prev["total"]
+        if total_delta <= 0:
+            return None
+        cores = raw["cores"] or 1
+
+        def percent(delta):
+            return round(max(delta, 0) * 100 / total_delta, 2)
+
+        pids = {
+            pid: percent(stat[2] - prev["procs"][pid][2])
+            for pid, stat in raw["procs"].items() if pid in prev["procs"]
+        }
+        threads = []
+        for key, stat in raw["threads"].items():
+            old = prev["threads"].get(key)
+            if old is None or old[3] != stat[3]:
+                continue  # 新起的线程，下一次才有差值
+            threads.append({"pid": key[0], "tid": key[1], "name": stat[1], "cpu": percent(stat[2] - old[2])})
+        threads.sort(key=lambda t: t["cpu"], reverse=True)
+
+        cpu = round(sum(pids.values()), 2)
+        return {
+            "ts": time.time(),
+            "cpu": cpu,
+            "cpu_core": round(cpu * cores, 2),
+            "cores": cores,
+            "pids": pids,
+            "threads": threads[:self.top_threads],
+        }
@@ -0,0 +1,98 @@
+import bisect
+import threading
+import time
+
+# 默认桶边界: 耗时类 (秒) 和 数量类
+TIME_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    """
+    固定桶直方图：内存只和桶数有关，分位数按桶上界近似 (不会超过实际最大值)
+    """
+
+    def __init__(self, bounds=TIME_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)  # 最后一个桶放超过最大边界的
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4),
+            "p50": round(self.quantile(0.5), 4),
+            "p90": round(self.quantile(0.9), 4),
+            "p99": round(self.quantile(0.99), 4),
+        }
+
+
+class DogStats:
+    """
+    一只狗的运行统计 (线程安全)：计数器 + 直方图
+
+    BaseDog 自带的:
+        计数   iterations (working 调用次数) / errors / backoff_sec (出错退避睡了多久)
+        直方图 working (每次 working 耗时)；周期性狗还有 tick (耗时) / lag (比计划时间晚了多少)
+    狗自己加的 (例如):
+        self.stats.count("lines", len(lines))        # 吞吐量，snapshot 里会换算成每秒
+        self.stats.observe("batch_lines", len(lines), COUNT_BOUNDS)
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value, bounds=TIME_BOUNDS):
+        """记一个值；bounds 只在第一次创建这个直方图时生效"""
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram(bounds)
+            hist.observe(value)
+
+    def snapshot(self):
+        """
+        :return: {"uptime", "counters", "rates" (每秒), "histograms"}
+        """
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            counters = {k: round(v, 3) for k, v in self.counters.items()}
+            return {
+                "uptime": round(uptime, 3),
+                "counters": counters,
+                "rates": {k: round(v / uptime, 3) for k, v in counters.items()} if uptime > 0 else {},
+                "histograms": {k: h.summary() for k, h in self.histograms.items()},
+            }
@@ -0,0 +1,258 @@
+import collections
+import itertools
+import re
+import threading
+import time
+from libs.logger import logger
+
+# 事件主题
+ALERT = "alert"                    # 没细分的报警
+CRASH = "crash"                    # 应用崩溃 (FATAL EXCEPTION / Monkey CRASH)
+ANR = "anr"                        # 应用无响应
+PERF = "perf"                      # 性能阈值 (内存 / 卡顿 / 趋势)
+DEVICE_OFFLINE = "device_offline"  # 设备掉线、网络或串口异常
+TOPICS = (ALERT, CRASH, ANR, PERF, DEVICE_OFFLINE)
+
+# 订阅者的排队策略
+DROP = "drop"                # 队列满了丢掉新来的
+DROP_OLDEST = "drop_oldest"  # 队列满了丢掉最老的 (遥测类只关心最新的)
+# 不管队列满没满，队列里还有没处理的同类事件 (Event.key 相同) 就合并进去 (count +1)，
+# 订阅者看到的是一条 count > 1 的事件而不是 N 条；没有可合并的、队列又满了才丢新的
+COALESCE = "coalesce"
+POLICIES = (DROP, DROP_OLDEST, COALESCE)
+
+# 指纹归一化: 地址、十六进制串、数字都换成占位符，
+# "ANR in com.demo (pid 1234)" 和 "ANR in com.demo (pid 5678)" 算同一种报警
+_FINGERPRINT_RULES = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "0x#"),
+    (re.compile(r"\b[0-9a-fA-F]{8,}\b"), "#"),
+    (re.compile(r"\d+"), "#"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(msg):
+    """报警消息的指纹 (去掉会变化的数字/地址)"""
+    text = str(msg).strip()
+    for regex, repl in _FINGERPRINT_RULES:
+        text = regex.sub(repl, text)
+    return text
+
+
+def classify(line, default=ALERT):
+    """按日志内容粗分主题 (ANR / CRASH)，认不出来的返回 default"""
+    if "ANR" in line or "NOT RESPONDING" in line:
+        return ANR
+    if "FATAL" in line or "CRASH" in line:
+        return CRASH
+    return default
+
+
+class Event:
+    """
+    总线上的一条事件
+    :param topic: 主题 (CRASH / ANR / PERF / DEVICE_OFFLINE / ALERT)
+    :param msg: 文本
+    :param source: 谁发的 (一般是狗的 key)
+    :param dog: 发布事件的狗对象 (订阅时可以按它过滤)
+    :param data: 结构化附加信息，例如 {"device": "phone1", "mem": 812}
+    """
+
+    __slots__ = ("topic", "msg", "source", "dog", "data", "ts", "count")
+
+    def __init__(self, topic, msg, source=None, dog=None, data=None):
+        self.topic = topic
+        self.msg = msg
+        self.source = source
+        self.dog = dog
+        self.data = data or {}
+        self.ts = time.time()
+        self.count = 1  # 被合并的事件数 (coalesce 策略下可能大于 1)
+
+    @property
+    def key(self):
+        """合并用的键：同主题、同来源、同指纹"""
+        return self.topic, self.source, fingerprint(self.msg)
+
+    def copy(self):
+        event = Event(self.topic, self.msg, self.source, self.dog, dict(self.data))
+        event.ts = self.ts
+        event.count = self.count
+        return event
+
+    def merged_msg(self):
+        """消息文本，排队时合并过的带上条数"""
+        if self.count > 1:
+            return f"{str(self.msg).rstrip()} (排队时合并 {self.count} 条)"
+        return self.msg
+
+    def text(self):
+        """给人看的一行 (飞书推送等)"""
+        return f"[{self.topic}] {self.source or '-'}: {str(self.merged_msg()).strip()}"
+
+    def __repr__(self):
+        return f"Event({self.text()})"
+
+
+class Subscription:
+    """
+    一个订阅者：自己的有界队列 + 自己的工作线程，
+    慢的订阅者 (截图、飞书) 只会堵住自己，发布方永远不阻塞
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, handler, topics=None, name=None, policy=DROP, maxsize=64, filter=None):
+        if policy not in POLICIES:
+            raise ValueError(f"❌ 不支持的队列策略: {policy} (可选 {POLICIES})")
+        self.handler = handler
+        self.topics = None if topics is None else frozenset([topics] if isinstance(topics, str) else topics)
+        self.name = name or f"{getattr(handler, '__name__', 'handler')}#{next(self._ids)}"
+        self.policy = policy
+        self.maxsize = maxsize
+        self.filter = filter
+
+        self._queue = collections.deque()  # [(合并键, 事件)]
+        self._pending = {}  # coalesce 用: { 合并键: 队列里还没处理的事件 }
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"received": 0, "coalesced": 0, "dropped": 0, "handled": 0, "errors": 0}
+
+        self._worker = threading.Thread(target=self._work, daemon=True, name=f"bus-{self.name}")
+        self._worker.start()
+
+    def matches(self, event):
+        if self.topics is not None and event.topic not in self.topics:
+            return False
+        return self.filter is None or self.filter(event)
+
+    def offer(self, event):
+        """
+        非阻塞投递
+        :return: 进了队列 (或合并进已有事件) 返回 True，被丢弃返回 False
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            self.stats["received"] += 1
+
+            # COALESCE: 有还没处理的同类事件就合并，和队列满不满无关
+            key = event.key if self.policy == COALESCE else None
+            if key is not None:
+                pending = self._pending.get(key)
+                if pending is not None:
+                    pending.count += event.count
+                    self.stats["coalesced"] += 1
+                    return True
+                event = event.copy()  # 以后要改 count，不能和别的订阅者共用一个对象
+
+            if len(self._queue) >= self.maxsize:
+                self.stats["dropped"] += 1
+                if self.stats["dropped"] % 100 == 1:
+                    logger.warning(f"⚠️ [EventBus] 订阅者 {self.name} 处理不过来，已丢弃 {self.stats['dropped']} 条")
+                if self.policy != DROP_OLDEST:
+                    return False
+                self._queue.popleft()
+
+            self._queue.append((key, event))
+            if key is not None:
+                self._pending[key] = event
+            self._cond.notify()
+            return True
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return  # 已关闭且处理完
+                key, event = self._queue.popleft()
+                if key is not None:
+                    self._pending.pop(key, None)
+            try:
+                self.handler(event)
+                self.stats["handled"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"⚠️ [EventBus] 订阅者 {self.name} 处理 {event.topic} 失败: {e}")
+
+    def close(self, timeout=1):
+        """不再接收新事件，等队列里剩下的处理完 (最多 timeout 秒)，返回是否处理完"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._worker is not threading.current_thread():
+            self._worker.join(timeout)
+        return not self._worker.is_alive()
+
+    def snapshot(self):
+        with self._cond:
+            return {**self.stats, "queued": len(self._queue), "policy": self.policy}
+
+
+class EventBus:
+    """
+    进程内事件总线：狗往上发 (crash / anr / perf / device_offline ...)，
+    策略、飞书等订阅者各自有界排队、各自线程处理
+
+        bus = EventBus.default()
+        bus.subscribe(feishu.send_event, topics=[CRASH, ANR], name="feishu", policy=COALESCE)
+        bus.publish(CRASH, "FATAL EXCEPTION: main", source="logcat_monitor", device="phone1")
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self._subs = ()  # 写时复制，publish 不用加锁
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """进程内共享的总线 (第一次用时创建)"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def subscribe(self, handler, topics=None, name=None, policy=DROP, maxsize=64, filter=None):
+        """
+        订阅
+        :param handler: 处理函数 handler(event)，在这个订阅者自己的线程里执行
+        :param topics: 只收这些主题 (字符串或列表)，None 表示全收
+        :param policy: 排队策略 DROP / DROP_OLDEST (队列满时丢新的 / 丢老的)，
+                       COALESCE (排队中的同类事件总是合并，队列满且合并不了时丢新的)
+        :param maxsize: 队列长度
+        :param filter: 额外的过滤函数 filter(event) -> bool
+        :return: Subscription (退订时传回 unsubscribe)
+        """
+        sub = Subscription(handler, topics=topics, name=name, policy=policy, maxsize=maxsize, filter=filter)
+        with self._lock:
+            self._subs = self._subs + (sub,)
+        return sub
+
+    def unsubscribe(self, sub, timeout=1):
+        """退订，队列里剩下的事件处理完 (最多等 timeout 秒)"""
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+        return sub.close(timeout)
+
+    def publish(self, topic, msg, source=None, dog=None, **data):
+        """
+        发布事件，只做非阻塞投递，不会等任何订阅者
+        :return: Event
+        """
+        event = Event(topic, msg, source=source, dog=dog, data=data)
+        for sub in self._subs:
+            if sub.matches(event):
+                sub.offer(event)
+        return event
+
+    def stats(self):
+        """{ 订阅者名: {received, coalesced, dropped, handled, errors, queued, policy} }"""
+        return {sub.name: sub.snapshot() for sub in self._subs}
+
+    def close(self, timeout=1):
+        for sub in self._subs:
+            self.unsubscribe(sub, timeout)
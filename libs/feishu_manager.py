@@ -60,4 +60,11 @@ class FeishuManager:
 
         except Exception as e:
             logger.error(f"❌ 网络请求异常: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def send_event(self, event):
+        """
+        事件总线的订阅回调 (在订阅者自己的线程里执行，推送慢也不会拖住狗)
+        用法: bus.subscribe(feishu.send_event, topics=["crash", "anr"], name="feishu", policy="coalesce")
+        """
+        return self.send_text(f"🚨 {event.text()}")
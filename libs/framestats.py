@@ -0,0 +1,168 @@
+import math
+import re
+
+try:
+    import numpy
+except ImportError:  # numpy 是可选依赖，没有时退回纯 Python (慢一些，结果一样)
+    numpy = None
+
+_SECTION = "---PROFILEDATA---"
+# 各 Android 版本列数不一样 (新版本多了 FrameTimelineVsyncId / GpuCompleted 等)，按表头取列
+_START_COL, _END_COL, _FLAGS_COL = "IntendedVsync", "FrameCompleted", "Flags"
+_REFRESH_RE = re.compile(r"(?:refresh-rate\s*:\s*|fps=)([\d.]+)")
+# 每段 PROFILEDATA 前面的窗口名: "Window: xxx" (老版本) 或 "com.demo/com.demo.Main/android.view.ViewRootImpl@1a2b (visibility=0)"
+_WINDOW_RE = re.compile(r"^\s*(?:Window:\s*)?(\S+/\S+)(?:\s+\(visibility=\d+\))?\s*$", re.M)
+# 最多记住多少个窗口的进度 (Activity 来回切换会不断出现新窗口)
+_MAX_WINDOWS = 64
+
+
+def percentile(values, p):
+    """线性插值的分位数 (和 numpy.percentile 默认口径一致)，values 需已排序"""
+    if not len(values):
+        return None
+    k = (len(values) - 1) * p / 100
+    lo = int(math.floor(k))
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def parse_refresh_rate(output, default=60.0):
+    """从 dumpsys SurfaceFlinger / dumpsys display 的输出里取屏幕刷新率"""
+    match = _REFRESH_RE.search(output or "")
+    rate = float(match.group(1)) if match else 0
+    return rate if rate > 0 else default
+
+
+class FrameStatsParser:
+    """
+    dumpsys gfxinfo <包名> framestats 的增量解析器
+
+    gfxinfo 每个窗口只保留最近 120 帧，每次 dump 都是整段输出；这里按窗口记住上一次见过的
+    最新一帧 (IntendedVsync)，只返回比它新的帧。Flags 不为 0 的帧 (窗口刚创建、
+    被跳过的帧) 不算。有 numpy 时整段数据一次转成矩阵做掩码和相减，120Hz 下也很轻
+
+    溢出也按窗口判断：只有同一个窗口最老的一帧都比上次见过的新，才说明中间有帧没看到；
+    切 Activity 时新窗口的帧全是新的、旧窗口消失，都不算溢出
+
+    用法:
+        parser = FrameStatsParser()
+        durations = parser.feed(adb.shell("dumpsys gfxinfo com.demo framestats"))  # 新帧的耗时 (ms)
+    """
+
+    def __init__(self):
+        self.last_vsync = 0  # 所有窗口里见过的最新一帧
+        self.overflows = 0  # 两次 dump 之间新帧超过了缓冲区 (有帧没看到)，需要调小采样间隔
+        self._windows = {}  # { 窗口名: 这个窗口见过的最新一帧 }
+
+    def feed(self, output):
+        """
+        :return: 新帧的耗时列表 (ms，按时间先后)；有 numpy 时是 ndarray
+        """
+        sections = self._sections(output or "")
+        if numpy is not None:
+            return self._feed_numpy(sections)
+        return self._feed_python(sections)
+
+    @staticmethod
+    def _sections(output):
+        """
+        :return: [(窗口名, 表头列名, [数据行])]，每个窗口一段；认不出窗口名时按段的序号
+        """
+        sections = []
+        parts = output.split(_SECTION)
+        for i in range(1, len(parts), 2):
+            lines = [line.strip().rstrip(",") for line in parts[i].strip().splitlines()]
+            lines = [line for line in lines if line]
+            if len(lines) > 1 and lines[0].startswith(_FLAGS_COL):
+                names = _WINDOW_RE.findall(parts[i - 1])
+                sections.append((names[-1] if names else f"#{i // 2}", lines[0].split(","), lines[1:]))
+        return sections
+
+    def _feed_numpy(self, sections):
+        starts, ends = [], []
+        for window, header, rows in sections:
+            width = len(header)
+            # 整段一次转成矩阵 (行数 x 列数)，列数不齐的行 (被截断的最后一行) 丢掉
+            rows = [row for row in rows if row.count(",") == width - 1]
+            if not rows:
+                continue
+            data = numpy.fromstring(",".join(rows), dtype=numpy.int64, sep=",").reshape(-1, width)
+            flags = data[:, header.index(_FLAGS_COL)]
+            start = data[:, header.index(_START_COL)]
+            end = data[:, header.index(_END_COL)]
+            mask = (flags == 0) & (start > self._windows.get(window, 0)) & (end > start)
+            self._advance(window, int(start.min()), int(start[mask].max()) if mask.any() else None)
+            starts.append(start[mask])
+            ends.append(end[mask])
+
+        if not starts:
+            return numpy.empty(0)
+        start = numpy.concatenate(starts)
+        end = numpy.concatenate(ends)
+        order = numpy.argsort(start, kind="stable")
+        return (end[order] - start[order]) / 1e6
+
+    def _feed_python(self, sections):
+        frames = []
+        for window, header, rows in sections:
+            width = len(header)
+            i_flags, i_start, i_end = header.index(_FLAGS_COL), header.index(_START_COL), header.index(_END_COL)
+            last = self._windows.get(window, 0)
+            oldest = newest = None
+            for row in rows:
+                values = row.split(",")
+                if len(values) != width:
+                    continue
+                start, end = int(values[i_start]), int(values[i_end])
+                oldest = start if oldest is None else min(oldest, start)
+                if values[i_flags] == "0" and start > last and end > start:
+                    frames.append((start, end))
+                    newest = start if newest is None else max(newest, start)
+            if oldest is not None:
+                self._advance(window, oldest, newest)
+
+        frames.sort()
+        return [(end - start) / 1e6 for start, end in frames]
+
+    def _advance(self, window, oldest, newest):
+        """更新一个窗口的进度；这个窗口以前见过、最老的一帧却比上次见过的还新，记一次溢出"""
+        last = self._windows.get(window)
+        if last and oldest > last:
+            self.overflows += 1
+        if newest is None:
+            return
+        self._windows[window] = newest
+        self.last_vsync = max(self.last_vsync, newest)
+        if len(self._windows) > _MAX_WINDOWS:
+            # 忘掉最久没出新帧的窗口
+            del self._windows[min(self._windows, key=self._windows.get)]
+
+
+def frame_window(durations, seconds, refresh_rate=60.0):
+    """
+    一个时间窗口内的流畅度指标
+    :param durations: 这段时间内每帧的耗时 (ms)
+    :param seconds: 窗口时长 (秒)，用来算 FPS
+    :param refresh_rate: 屏幕刷新率，单帧超过一个刷新周期就算卡顿
+    :return: {"frames", "fps", "jank", "jank_pct", "p50", "p90", "p99"}；没有帧时分位数为 None
+    """
+    budget = 1000.0 / refresh_rate
+    if numpy is not None:
+        data = numpy.sort(numpy.asarray(durations, dtype=float))
+        jank = int((data > budget).sum())
+        p50, p90, p99 = (numpy.percentile(data, [50, 90, 99]).tolist() if data.size else (None, None, None))
+    else:
+        data = sorted(durations)
+        jank = sum(1 for d in data if d > budget)
+        p50, p90, p99 = (percentile(data, p) for p in (50, 90, 99))
+
+    frames = len(data)
+    return {
+        "frames": frames,
+        "fps": round(frames / seconds, 2) if seconds > 0 else 0.0,
+        "jank": jank,
+        "jank_pct": round(jank * 100 / frames, 2) if frames else 0.0,
+        "p50": round(p50, 2) if p50 is not None else None,
+        "p90": round(p90, 2) if p90 is not None else None,
+        "p99": round(p99, 2) if p99 is not None else None,
+    }
@@ -0,0 +1,123 @@
+import functools
+import re
+import struct
+import time
+
+# 日志级别从低到高
+PRIORITIES = "VDIWEF"
+
+# -v threadtime: "11-27 12:00:00.123  1234  5678 E ActivityManager: msg"
+THREADTIME_RE = re.compile(
+    r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEFS])\s+(.*?)\s*: (.*)$"
+)
+# -v time: "11-27 12:00:00.123 E/ActivityManager( 1234): msg"
+TIME_RE = re.compile(
+    r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+([VDIWEFS])/(.*?)\(\s*(\d+)\): (.*)$"
+)
+
+
+def parse_line(line):
+    """
+    解析一行 logcat (支持 -v threadtime / -v time)
+    :return: {"time", "pid", "tid", "priority", "tag", "msg"}；不认识的行返回 None
+    """
+    line = line.rstrip("\r\n")
+    match = THREADTIME_RE.match(line)
+    if match:
+        time_str, pid, tid, priority, tag, msg = match.groups()
+        return {
+            "time": time_str, "pid": int(pid), "tid": int(tid),
+            "priority": priority, "tag": tag, "msg": msg,
+        }
+    match = TIME_RE.match(line)
+    if match:
+        time_str, priority, tag, pid, msg = match.groups()
+        return {
+            "time": time_str, "pid": int(pid), "tid": None,
+            "priority": priority, "tag": tag.strip(), "msg": msg,
+        }
+    return None
+
+
+def to_epoch(time_str, year=None):
+    """
+    logcat 的 "11-27 12:00:00.123" 不带年份，补上年份后转成时间戳 (本地时区)
+    """
+    year = year or time.localtime().tm_year
+    head, _, frac = time_str.partition(".")
+    return _epoch_seconds(year, head) + (int(frac) / 10 ** len(frac) if frac else 0)
+
+
+@functools.lru_cache(maxsize=4096)
+def _epoch_seconds(year, head):
+    # strptime 很慢，同一秒内的日志很多，按秒缓存
+    return time.mktime(time.strptime(f"{year}-{head}", "%Y-%m-%d %H:%M:%S"))
+
+
+def format_time(ts):
+    """时间戳 -> logcat 格式 "11-27 12:00:00.123" """
+    return time.strftime("%m-%d %H:%M:%S", time.localtime(ts)) + f".{int(ts * 1000) % 1000:03d}"
+
+
+# -B 二进制格式: struct logger_entry (liblog/include/log/log_read.h)
+#   uint16 len; uint16 hdr_size; int32 pid; uint32 tid; uint32 sec; uint32 nsec; [uint32 lid]; [uint32 uid]
+# v1 没有 hdr_size (那里是填充 0)，头固定 20 字节；v2/v3 是 24，v4 是 28
+_ENTRY_HEAD = struct.Struct("<HHiIII")
+# 二进制里的日志级别: 2=V 3=D 4=I 5=W 6=E 7=F
+_BINARY_PRIORITY = {2: "V", 3: "D", 4: "I", 5: "W", 6: "E", 7: "F"}
+
+
+def parse_binary(data):
+    """
+    解析 logcat -B 的二进制输出
+    :param data: bytes；末尾不完整的条目会原样留给下一次
+    :return: (记录列表, 剩下的 bytes)
+             记录格式同 parse_line，另外多一个 "ts" (时间戳，秒)
+    """
+    records = []
+    pos, size = 0, len(data)
+    while size - pos >= _ENTRY_HEAD.size:
+        payload_len, hdr_size, pid, tid, sec, nsec = _ENTRY_HEAD.unpack_from(data, pos)
+        hdr_size = hdr_size or _ENTRY_HEAD.size
+        end = pos + hdr_size + payload_len
+        if end > size:
+            break
+        payload = data[pos + hdr_size:end]
+        pos = end
+
+        # payload: 1 字节级别 + tag\0 + msg\0
+        if not payload:
+            continue
+        tag, _, msg = payload[1:].partition(b"\0")
+        ts = sec + nsec / 1e9
+        records.append({
+            "ts": ts,
+            "time": format_time(ts),
+            "pid": pid, "tid": tid,
+            "priority": _BINARY_PRIORITY.get(payload[0], "V"),
+            "tag": tag.decode("utf-8", errors="ignore"),
+            "msg": msg.rstrip(b"\0\n").decode("utf-8", errors="ignore"),
+        })
+    return records, data[pos:]
+
+
+def priority_at_least(priority, minimum):
+    """priority 是否不低于 minimum (例如 E >= W)"""
+    if not minimum:
+        return True
+    return PRIORITIES.find(priority) >= PRIORITIES.find(minimum.upper())
+
+
+def build_filterspec(tag=None, priority=None):
+    """
+    拼 logcat 的过滤参数，让手机端先过滤一遍，少传数据
+    例: tag="ActivityManager", priority="E" -> "'ActivityManager:E' '*:S'"
+    (加引号防止手机端 shell 把 * 当通配符展开)
+    """
+    level = (priority or "V").upper()
+    if tag:
+        tags = [tag] if isinstance(tag, str) else list(tag)
+        return " ".join(f"'{t}:{level}'" for t in tags) + " '*:S'"
+    if priority:
+        return f"'*:{level}'"
+    return ""
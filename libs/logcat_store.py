@@ -0,0 +1,276 @@
+import bisect
+import io
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from libs.compress import open_read
+from libs.logcat_parser import PRIORITIES, format_time, parse_line, priority_at_least, to_epoch
+from libs.logger import logger
+
+
+class LogcatStore:
+    """
+    logcat 结构化归档：只追加、分段存储、按时间/TAG 建索引
+
+    目录结构:
+        seg_00001.dat   数据块依次追加，每块是 zlib 压缩的列式 JSON
+                        {"ts": [...], "pid": [...], "tid": [...], "pri": "EWI...", "tag": [...], "msg": [...]}
+        seg_00001.idx   每块一行 JSON 索引: 偏移、条数、时间范围、出现过的 TAG / 级别
+
+    索引常驻内存 (每块一条)，查询时:
+    - 时间范围: 按 "截至该块的最大时间" 二分，直接跳到第一个可能命中的块
+    - TAG: 倒排表 tag -> 块编号，只解压包含该 TAG 的块
+    - 级别: 块里最高级别都不够的直接跳过
+
+    用法:
+        store = LogcatStore(os.path.join(root_dir, "outputs", "logcat_store", "phone1"))
+        store.append_line(line)
+        store.close()
+        for rec in store.query(start="11-27 14:03:07", end="11-27 14:03:17", priority="W"):
+            ...
+    """
+
+    def __init__(self, directory, block_records=4096, segment_bytes=64 * 1024 * 1024,
+                 year=None, cache_blocks=8):
+        self.directory = directory
+        self.block_records = block_records
+        self.segment_bytes = segment_bytes
+        self.year = year
+        self.cache_blocks = cache_blocks
+
+        self.blocks = []        # 块索引 (按写入顺序)
+        self.tag_index = {}     # { tag: [块编号] }
+        self._ts_max_prefix = []  # 第 i 块及之前所有块的最大时间 (单调不减，用来二分)
+        self._pending = []      # 还没落盘的记录
+        self._cache = OrderedDict()  # 解压过的块 (LRU)
+        self._lock = threading.RLock()
+        self._segment = 0
+        self._segment_size = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    # ================= 索引 =================
+
+    def _path(self, segment, ext):
+        return os.path.join(self.directory, f"seg_{segment:05d}{ext}")
+
+    def _load_index(self):
+        segments = sorted(
+            int(name[4:9]) for name in os.listdir(self.directory)
+            if name.startswith("seg_") and name.endswith(".idx")
+        )
+        for segment in segments:
+            with open(self._path(segment, ".idx"), encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add_block(json.loads(line))
+        if segments:
+            self._segment = segments[-1]
+            self._segment_size = os.path.getsize(self._path(self._segment, ".dat"))
+            logger.info(f"📚 [LogcatStore] 载入已有归档: {len(self.blocks)} 块, {self.count} 条")
+
+    def _add_block(self, meta):
+        block_id = len(self.blocks)
+        self.blocks.append(meta)
+        for tag in meta["tags"]:
+            self.tag_index.setdefault(tag, []).append(block_id)
+        prev = self._ts_max_prefix[-1] if self._ts_max_prefix else meta["ts_max"]
+        self._ts_max_prefix.append(max(prev, meta["ts_max"]))
+
+    @property
+    def count(self):
+        return sum(meta["count"] for meta in self.blocks) + len(self._pending)
+
+    # ================= 写入 =================
+
+    def append(self, record):
+        """
+        追加一条记录 (parse_line / parse_binary 的结果)；没有 "ts" 时按 time 字段补上
+        """
+        if "ts" not in record:
+            record["ts"] = to_epoch(record["time"], self.year)
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self.block_records:
+                self._flush_block()
+
+    def append_line(self, line):
+        """解析一行文本日志并追加，不认识的行 (比如堆栈的续行) 返回 False"""
+        record = parse_line(line)
+        if record is None:
+            return False
+        self.append(record)
+        return True
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def ingest_file(self, path):
+        """
+        把导出的 logcat 文本 (支持 .gz/.zst) 整个归档进来
+        :return: 归档的条数
+        """
+        added = 0
+        with open_read(path) as raw:
+            for line in io.TextIOWrapper(raw, encoding="utf-8", errors="ignore"):
+                added += self.append_line(line)
+        self.flush()
+        logger.info(f"📚 [LogcatStore] 归档 {os.path.basename(path)}: {added} 条")
+        return added
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self._flush_block()
+
+    def close(self):
+        self.flush()
+
+    def _flush_block(self):
+        records, self._pending = self._pending, []
+        columns = {
+            "ts": [r["ts"] for r in records],
+            "pid": [r["pid"] for r in records],
+            "tid": [r["tid"] for r in records],
+            "pri": "".join(r["priority"] for r in records),
+            "tag": [r["tag"] for r in records],
+            "msg": [r["msg"] for r in records],
+        }
+        data = zlib.compress(json.dumps(columns, ensure_ascii=False).encode("utf-8"), 6)
+
+        if not self._segment or self._segment_size + len(data) > self.segment_bytes:
+            self._segment += 1
+            self._segment_size = 0
+
+        with open(self._path(self._segment, ".dat"), "ab") as f:
+            f.write(data)
+        meta = {
+            "seg": self._segment,
+            "offset": self._segment_size,
+            "length": len(data),
+            "count": len(records),
+            "ts_min": min(columns["ts"]),
+            "ts_max": max(columns["ts"]),
+            "pri": "".join(p for p in PRIORITIES if p in columns["pri"]),
+            "tags": sorted(set(columns["tag"])),
+        }
+        # 先写数据再写索引，中途崩溃最多丢最后一块的索引，不会出现指向空数据的索引
+        with open(self._path(self._segment, ".idx"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+        self._segment_size += len(data)
+        self._add_block(meta)
+
+    # ================= 查询 =================
+
+    def _to_ts(self, value):
+        if value is None or isinstance(value, (int, float)):
+            return value
+        return to_epoch(value, self.year)
+
+    def _read_block(self, block_id):
+        columns = self._cache.get(block_id)
+        if columns is not None:
+            self._cache.move_to_end(block_id)
+            return columns
+        meta = self.blocks[block_id]
+        with open(self._path(meta["seg"], ".dat"), "rb") as f:
+            f.seek(meta["offset"])
+            columns = json.loads(zlib.decompress(f.read(meta["length"])))
+        self._cache[block_id] = columns
+        while len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return columns
+
+    def candidate_blocks(self, start=None, end=None, tag=None, priority=None):
+        """
+        只用索引挑出可能命中的块编号 (不解压数据)
+        """
+        start, end = self._to_ts(start), self._to_ts(end)
+        if tag:
+            tags = [tag] if isinstance(tag, str) else list(tag)
+            ids = sorted({i for t in tags for i in self.tag_index.get(t, [])})
+        else:
+            ids = range(len(self.blocks))
+
+        first = bisect.bisect_left(self._ts_max_prefix, start) if start is not None else 0
+        result = []
+        for i in ids:
+            if i < first:
+                continue
+            meta = self.blocks[i]
+            if end is not None and meta["ts_min"] > end:
+                continue
+            if start is not None and meta["ts_max"] < start:
+                continue
+            if priority and not priority_at_least(meta["pri"][-1:] or "V", priority):
+                continue
+            result.append(i)
+        return result
+
+    def query(self, start=None, end=None, tag=None, priority=None, pid=None, keyword=None, limit=None):
+        """
+        按条件查询，按写入顺序返回记录
+        :param start/end: 时间戳，或 logcat 格式的时间 "MM-DD HH:MM:SS[.mmm]"
+        :param tag: TAG 或 TAG 列表
+        :param priority: 最低级别，例如 "W"
+        :param pid: 只看某个进程
+        :param keyword: 消息里包含的字符串
+        :param limit: 最多返回多少条
+        """
+        with self._lock:
+            start_ts, end_ts = self._to_ts(start), self._to_ts(end)
+            tags = {tag} if isinstance(tag, str) else set(tag or [])
+            min_level = PRIORITIES.find(priority.upper()) if priority else -1
+
+            sources = [self._read_block(i) for i in self.candidate_blocks(start_ts, end_ts, tag, priority)]
+            if self._pending:
+                sources.append({
+                    "ts": [r["ts"] for r in self._pending],
+                    "pid": [r["pid"] for r in self._pending],
+                    "tid": [r["tid"] for r in self._pending],
+                    "pri": "".join(r["priority"] for r in self._pending),
+                    "tag": [r["tag"] for r in self._pending],
+                    "msg": [r["msg"] for r in self._pending],
+                })
+
+        found = 0
+        for columns in sources:
+            ts, pri, tag_col, msg = columns["ts"], columns["pri"], columns["tag"], columns["msg"]
+            for i in range(len(ts)):
+                if start_ts is not None and ts[i] < start_ts:
+                    continue
+                if end_ts is not None and ts[i] > end_ts:
+                    continue
+                if tags and tag_col[i] not in tags:
+                    continue
+                if min_level >= 0 and PRIORITIES.find(pri[i]) < min_level:
+                    continue
+                if pid is not None and columns["pid"][i] != pid:
+                    continue
+                if keyword and keyword not in msg[i]:
+                    continue
+                yield {
+                    "ts": ts[i], "time": format_time(ts[i]), "pid": columns["pid"][i], "tid": columns["tid"][i],
+                    "priority": pri[i], "tag": tag_col[i], "msg": msg[i],
+                }
+                found += 1
+                if limit and found >= limit:
+                    return
+
+    def around(self, moment, seconds=5, **filters):
+        """查某个时间点前后 seconds 秒发生了什么"""
+        ts = self._to_ts(moment)
+        return self.query(start=ts - seconds, end=ts + seconds, **filters)
+
+    def stats(self):
+        return {
+            "records": self.count,
+            "blocks": len(self.blocks),
+            "segments": self._segment,
+            "tags": len(self.tag_index),
+            "bytes": sum(meta["length"] for meta in self.blocks),
+        }
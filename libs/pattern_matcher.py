@@ -0,0 +1,114 @@
+import re
+
+
+def _trie_regex(words):
+    """
+    把一组字面量按公共前缀折叠成一条正则 (字典树形状)，例如
+    ["ANR in", "ANR at", "FATAL"] -> "(?:ANR (?:at|in)|FATAL)"
+    re 模块是回溯实现，平铺的 a|b|c|... 在每个位置都要挨个尝试，
+    折叠之后每个字符只需要走一条分支，几百个关键字也不会变慢
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True  # 结束标记
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return ""
+        branches = []
+        optional = False
+        for ch in sorted(node):
+            if ch == "":
+                optional = True
+                continue
+            branches.append(re.escape(ch) + build(node[ch]))
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            # 某个词在这里就结束了，后面的部分可有可无 (贪婪，优先匹配更长的词)
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class MultiPatternMatcher:
+    """
+    多模式匹配器：一次扫描同时匹配所有关键字和正则，并告诉你是哪个模式命中的
+
+    - 字面量 (keywords) 折叠成一条字典树正则
+    - 正则 (regexes) 合并成一条不带捕获分组的正则做初筛；
+      带命名分组的合并正则会让 re 放弃前缀优化，慢两个数量级，
+      所以命中之后 (少数行) 再逐个确认是哪条正则
+    注意：正则里不要使用编号反向引用 (\\1)，合并之后分组编号会变
+    """
+
+    def __init__(self, keywords=None, regexes=None, ignore_case=False):
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        if isinstance(regexes, str):
+            regexes = [regexes]
+        self.keywords = [kw for kw in dict.fromkeys(keywords or []) if kw]
+        self.regexes = list(dict.fromkeys(regexes or []))
+        self.ignore_case = ignore_case
+        flags = re.IGNORECASE if ignore_case else 0
+
+        self._literal_re = None
+        self._literal_map = {}
+        if self.keywords:
+            self._literal_re = re.compile(_trie_regex(self.keywords), flags)
+            self._literal_map = {self._key(kw): kw for kw in self.keywords}
+
+        self._regex_re = None
+        self._regex_list = [re.compile(r, flags) for r in self.regexes]
+        if self.regexes:
+            self._regex_re = re.compile("|".join(f"(?:{r})" for r in self.regexes), flags)
+
+    def _key(self, text):
+        return text.lower() if self.ignore_case else text
+
+    def __bool__(self):
+        return bool(self.keywords or self.regexes)
+
+    @property
+    def patterns(self):
+        return self.keywords + self.regexes
+
+    def search(self, line):
+        """
+        返回最先出现在行里的那个模式 (关键字原文或正则原文)，没命中返回 None
+        """
+        best_pos, best = None, None
+        if self._literal_re is not None:
+            match = self._literal_re.search(line)
+            if match:
+                best_pos, best = match.start(), self._literal_map[self._key(match.group(0))]
+        if self._regex_re is not None:
+            match = self._regex_re.search(line)
+            if match and (best_pos is None or match.start() < best_pos):
+                best = self._which_regex(line, match.start())
+        return best
+
+    def _which_regex(self, line, pos):
+        """合并正则在 pos 处命中了，按顺序找出是哪一条 (和 | 的优先级一致)"""
+        for regex, compiled in zip(self.regexes, self._regex_list):
+            if compiled.match(line, pos):
+                return regex
+        return None
+
+    def findall(self, line):
+        """
+        返回行里命中的所有模式 (去重，按出现顺序)
+        注意：重叠的字面量只报告最先、最长的那个
+        """
+        found = []
+        if self._literal_re is not None:
+            for match in self._literal_re.finditer(line):
+                found.append((match.start(), self._literal_map[self._key(match.group(0))]))
+        if self._regex_re is not None:
+            for match in self._regex_re.finditer(line):
+                found.append((match.start(), self._which_regex(line, match.start())))
+        found.sort(key=lambda item: item[0])
+        return list(dict.fromkeys(pattern for _, pattern in found))
@@ -0,0 +1,325 @@
+import json
+import math
+import struct
+from array import array
+from collections import deque
+
+try:
+    import numpy
+except ImportError:  # numpy 是可选依赖，只有 to_numpy() 用得到
+    numpy = None
+
+# 落盘文件格式: 魔数 + 头长度 + JSON 头 (列名) + 连续的 float64 行 (ts, 列1, 列2, ...)
+_SPILL_MAGIC = b"DNPS1\n"
+
+
+def nearest_rank(values, p):
+    """最近秩分位数 (values 需已排序)，没有数据返回 None"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(math.ceil(p * len(values))) - 1)]
+
+
+class P2Quantile:
+    """
+    P² 算法：不保存样本，只用 5 个标记点增量估算分位数 (内存 O(1))
+    Jain & Chlamtac, "The P² algorithm for dynamic calculation of quantiles" (1985)
+    """
+
+    def __init__(self, p=0.95):
+        self.p = p
+        self._init = []
+        self.q = []  # 标记点高度
+        self.n = []  # 标记点位置
+        self.np = []  # 期望位置
+        self.dn = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        if len(self._init) < 5:
+            self._init.append(x)
+            if len(self._init) == 5:
+                self._init.sort()
+                self.q = list(self._init)
+                self.n = [0, 1, 2, 3, 4]
+                self.np = [0, 2 * self.p, 4 * self.p, 2 + 2 * self.p, 4]
+            return
+
+        q, n = self.q, self.n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+
+        for i in (1, 2, 3):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = self._parabolic(i, d)
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.q, self.n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self):
+        if len(self._init) < 5:
+            return nearest_rank(sorted(self._init), self.p)
+        return self.q[2]
+
+
+class _ColumnStats:
+    """
+    单列的全程统计 (min/max/mean/p95) + 最近 window 个样本的滚动 min/max/mean
+    (滚动 p95 没法增量维护，由 PerfSeries.summary 对环形缓冲排序求)
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.p95 = P2Quantile(0.95)
+        self.last = None
+        # 滚动窗口: 单调队列求 min/max，滑动求和求 mean
+        self._win_min = deque()  # (序号, 值)，值递增
+        self._win_max = deque()  # (序号, 值)，值递减
+        self._win_sum = 0.0
+        self._win_count = 0
+
+    def add(self, index, value):
+        """:param index: 样本序号 (用来判断单调队列里的值是否已经滑出窗口)"""
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.mean += (value - self.mean) / self.count
+        self.p95.add(value)
+        self.last = value
+
+        self._win_sum += value
+        self._win_count += 1
+        while self._win_min and self._win_min[-1][1] >= value:
+            self._win_min.pop()
+        self._win_min.append((index, value))
+        while self._win_max and self._win_max[-1][1] <= value:
+            self._win_max.pop()
+        self._win_max.append((index, value))
+        # 顺手清掉滑出窗口的值，单调队列长度不会超过 window
+        oldest = index - self.window
+        if self._win_min[0][0] <= oldest:
+            self._win_min.popleft()
+        if self._win_max[0][0] <= oldest:
+            self._win_max.popleft()
+
+    def evict(self, value):
+        """环形缓冲覆盖掉一个旧值"""
+        self._win_sum -= value
+        self._win_count -= 1
+
+    def summary(self, next_index):
+        if not self.count:
+            return None
+        oldest = next_index - self.window
+        for queue in (self._win_min, self._win_max):
+            while queue and queue[0][0] < oldest:
+                queue.popleft()
+        window = None
+        if self._win_count:
+            window = {
+                "size": self._win_count,
+                "min": self._win_min[0][1],
+                "max": self._win_max[0][1],
+                "mean": round(self._win_sum / self._win_count, 4),
+            }
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.mean, 4),
+            "p95": round(self.p95.value, 4),
+            "last": self.last,
+            "window": window,
+        }
+
+
+class PerfSeries:
+    """
+    性能时间序列：定长列式环形缓冲 + 增量统计 + 多分辨率降采样 + 批量落盘
+
+    - 每列一个 array('d')，最多保留最近 capacity 个样本，内存固定
+    - 每 spill_every 个样本把新增的行一次性追加到二进制文件 (float64)，不再逐行 flush
+    - summary() 直接返回全程 min/max/mean/p95 和最近窗口的 min/max/mean/p95，不用回读文件
+      (窗口 p95 对环形缓冲排序一次，O(capacity log capacity)，其余都是增量维护的)
+    - 按 resolutions (秒) 聚合成粗粒度的桶，每个分辨率最多保留 max_buckets 个，跑 24 小时也能画全程曲线
+
+    用法:
+        series = PerfSeries(["cpu", "mem"], spill_path="perf.bin")
+        series.append(time.time(), cpu=12.3, mem=456.0)
+        series.summary()["mem"]["p95"]
+        series.downsampled(60)   # 每分钟一个点
+        series.close()
+    """
+
+    def __init__(self, columns, capacity=3600, spill_path=None, spill_every=60,
+                 resolutions=(10, 60, 600), max_buckets=1440):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spill_every = spill_every
+
+        self._ts = array("d", [0.0]) * capacity
+        self._data = {name: array("d", [0.0]) * capacity for name in self.columns}
+        self._count = 0  # 一共写入过多少个样本
+        self._spilled = 0  # 已经落盘到第几个样本
+        self._stats = {name: _ColumnStats(capacity) for name in self.columns}
+
+        # 降采样: { 分辨率: deque([{"ts", 列: {"min","max","mean","count"}}]) }，当前桶单独放
+        self._tiers = {r: deque(maxlen=max_buckets) for r in resolutions}
+        self._open_buckets = {}
+
+        if spill_path:
+            header = json.dumps({"columns": ["ts"] + self.columns}).encode("utf-8")
+            with open(spill_path, "wb") as f:
+                f.write(_SPILL_MAGIC + struct.pack("<I", len(header)) + header)
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    # ================= 写入 =================
+
+    def append(self, ts, **values):
+        """
+        追加一个样本；缺少的列记为 nan (不参与统计)
+        :return: 本次是否触发了落盘 (调用方可以借机把自己的缓冲也刷一下)
+        """
+        slot = self._count % self.capacity
+        full = self._count >= self.capacity
+        self._ts[slot] = ts
+        for name in self.columns:
+            value = values.get(name)
+            value = math.nan if value is None else float(value)
+            column = self._data[name]
+            if full and not math.isnan(column[slot]):
+                self._stats[name].evict(column[slot])
+            column[slot] = value
+            if not math.isnan(value):
+                self._stats[name].add(self._count, value)
+        self._count += 1
+        self._downsample(ts, values)
+
+        if self.spill_path and self._count - self._spilled >= self.spill_every:
+            self.spill()
+            return True
+        return False
+
+    def _downsample(self, ts, values):
+        for resolution, tier in self._tiers.items():
+            start = ts - ts % resolution
+            bucket = self._open_buckets.get(resolution)
+            if bucket is None or bucket["ts"] != start:
+                if bucket is not None:
+                    tier.append(self._close_bucket(bucket))
+                bucket = {"ts": start}
+                self._open_buckets[resolution] = bucket
+            for name in self.columns:
+                value = values.get(name)
+                if value is None:
+                    continue
+                agg = bucket.get(name)
+                if agg is None:
+                    bucket[name] = [value, value, value, 1]  # min, max, sum, count
+                else:
+                    agg[0] = min(agg[0], value)
+                    agg[1] = max(agg[1], value)
+                    agg[2] += value
+                    agg[3] += 1
+
+    @staticmethod
+    def _close_bucket(bucket):
+        closed = {"ts": bucket["ts"]}
+        for name, agg in bucket.items():
+            if name != "ts":
+                closed[name] = {"min": agg[0], "max": agg[1], "mean": round(agg[2] / agg[3], 4), "count": agg[3]}
+        return closed
+
+    def spill(self):
+        """把还没落盘的样本一次性追加到文件 (环形缓冲已经覆盖掉的部分会丢，spill_every 要小于 capacity)"""
+        if not self.spill_path or self._spilled >= self._count:
+            return
+        start = max(self._spilled, self._count - self.capacity)
+        rows = array("d")
+        for i in range(start, self._count):
+            slot = i % self.capacity
+            rows.append(self._ts[slot])
+            for name in self.columns:
+                rows.append(self._data[name][slot])
+        with open(self.spill_path, "ab") as f:
+            rows.tofile(f)
+        self._spilled = self._count
+
+    def close(self):
+        self.spill()
+
+    # ================= 查询 =================
+
+    def summary(self):
+        """各列的全程统计 + 最近窗口统计 (窗口 p95 要排序环形缓冲，其余不扫描数据)"""
+        result = {}
+        for name in self.columns:
+            summary = self._stats[name].summary(self._count)
+            if summary and summary["window"]:
+                window = sorted(v for v in self.column(name) if not math.isnan(v))
+                summary["window"]["p95"] = nearest_rank(window, 0.95)
+            result[name] = summary
+        return result
+
+    def column(self, name, last=None):
+        """按时间顺序取出最近 last 个样本 (默认环形缓冲里的全部)"""
+        size = len(self) if last is None else min(last, len(self))
+        data = self._data[name] if name != "ts" else self._ts
+        return [data[i % self.capacity] for i in range(self._count - size, self._count)]
+
+    def to_numpy(self, last=None):
+        """{列名: ndarray} (需要 numpy)"""
+        if numpy is None:
+            raise RuntimeError("to_numpy 需要安装 numpy")
+        return {name: numpy.array(self.column(name, last)) for name in ["ts"] + self.columns}
+
+    def downsampled(self, resolution):
+        """某个分辨率下的聚合桶 (含当前未结束的桶)"""
+        buckets = list(self._tiers[resolution])
+        if resolution in self._open_buckets:
+            buckets.append(self._close_bucket(self._open_buckets[resolution]))
+        return buckets
+
+    @staticmethod
+    def read_spill(path):
+        """读取落盘文件，返回 (列名, 行生成器)"""
+        with open(path, "rb") as f:
+            if f.read(len(_SPILL_MAGIC)) != _SPILL_MAGIC:
+                raise ValueError(f"不是 PerfSeries 落盘文件: {path}")
+            (length,) = struct.unpack("<I", f.read(4))
+            columns = json.loads(f.read(length))["columns"]
+            data = array("d")
+            data.frombytes(f.read())
+
+        width = len(columns)
+        rows = (tuple(data[i:i + width]) for i in range(0, len(data) - len(data) % width, width))
+        return columns, rows
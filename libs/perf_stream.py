@@ -0,0 +1,134 @@
+import contextlib
+from libs.cpu_sampler import parse_stat
+from libs.logger import logger
+
+# 手机端常驻采集脚本：每 interval 秒输出一块样本，主机端边读边解析
+#   @C <核数>             只在开头输出一次
+#   @T <手机端时间戳>      一块样本开始
+#   cpu ...               /proc/stat 总行
+#   @P <pid>              后面是这个进程的 stat / status / fd 数 / PSS
+#   @E                    一块样本结束
+# 主机断开后 echo 写管道会触发 SIGPIPE，脚本自己就退出了，不会在手机上残留
+_COLLECTOR_SCRIPT = """\
+echo "@C $(grep -c '^cpu[0-9]' /proc/stat)"
+while :; do
+  echo "@T ${{EPOCHREALTIME:-$(date +%s.%N)}}" || exit
+  grep '^cpu ' /proc/stat
+  for p in $(pidof {package}); do
+    echo "@P $p"
+    cat /proc/$p/stat
+    grep -E '^(VmRSS|Threads):' /proc/$p/status
+    echo "@F $(ls /proc/$p/fd 2>/dev/null | wc -l)"
+    grep '^Pss:' /proc/$p/smaps_rollup 2>/dev/null
+  done
+  echo "@E"
+  sleep {interval}
+done"""
+
+
+class PerfStream:
+    """
+    手机端常驻的性能采集：只启动一次 adb shell，手机端循环输出样本，
+    主机端增量解析，不再每个周期都 fork dumpsys、走一次 adb 往返
+
+    每个样本包含:
+        ts        手机端时间戳 (不受 adb 传输延迟影响)
+        cpu       整机 CPU 百分比 (jiffies 差值，和 CpuSampler 口径一致)；第一块样本为 None
+        cpu_core  单核口径的 CPU 百分比
+        rss_mb    RSS (所有进程求和)
+        pss_mb    PSS (读 smaps_rollup，无权限时为 None)
+        threads   线程数
+        fds       打开的文件句柄数 (无权限时为 None)
+        pids      进程列表
+
+    用法:
+        stream = PerfStream(env.adb, "com.demo", interval=0.5)
+        with contextlib.closing(stream.samples()) as samples:
+            for sample in samples: ...
+    注意：停止响应的延迟最多是一个 interval (每个周期至少有一行输出)
+    """
+
+    def __init__(self, adb, package, interval=1.0):
+        self.adb = adb
+        self.package = package
+        self.interval = interval
+        self.cores = 1
+        self._prev = {}  # { pid: (starttime, jiffies) }
+        self._prev_total = None
+
+    def script(self):
+        return _COLLECTOR_SCRIPT.format(package=self.package, interval=self.interval)
+
+    def samples(self):
+        """生成器：持续产出样本，adb 断开时结束 (或抛出 RuntimeError)"""
+        logger.info(f"📡 [PerfStream] 手机端采集启动: {self.package} (间隔 {self.interval}s)")
+        block = None
+        with contextlib.closing(self.adb.stream_lines(self.script())) as lines:
+            for line in lines:
+                line = line.rstrip("\r\n")
+                if line.startswith("@T "):
+                    block = {"ts": float(line[3:]), "total": None, "procs": {}}
+                elif line.startswith("@E"):
+                    if block is not None:
+                        sample = self._finish(block)
+                        block = None
+                        if sample is not None:
+                            yield sample
+                elif line.startswith("@C "):
+                    self.cores = int(line[3:] or 1) or 1
+                elif block is not None:
+                    self._feed(block, line)
+
+    def _feed(self, block, line):
+        procs = block["procs"]
+        if line.startswith("cpu "):
+            block["total"] = sum(int(v) for v in line.split()[1:9])
+        elif line.startswith("@P "):
+            block["pid"] = int(line[3:])
+            procs[block["pid"]] = {"stat": None, "rss_kb": 0, "threads": 0, "fds": None, "pss_kb": None}
+        elif "pid" not in block:
+            return
+        elif line.startswith("VmRSS:"):
+            procs[block["pid"]]["rss_kb"] = int(line.split()[1])
+        elif line.startswith("Threads:"):
+            procs[block["pid"]]["threads"] = int(line.split()[1])
+        elif line.startswith("Pss:"):
+            procs[block["pid"]]["pss_kb"] = int(line.split()[1])
+        elif line.startswith("@F "):
+            fds = int(line[3:] or 0)
+            procs[block["pid"]]["fds"] = fds or None  # 0 说明没有权限读
+        else:
+            procs[block["pid"]]["stat"] = parse_stat(line)
+
+    def _finish(self, block):
+        """一块样本读完：和上一块求差值，算出 CPU"""
+        total = block["total"]
+        procs = {pid: p for pid, p in block["procs"].items() if p["stat"]}
+
+        cpu = None
+        if self._prev_total is not None and total is not None and total > self._prev_total:
+            delta = 0
+            for pid, p in procs.items():
+                old = self._prev.get(pid)
+                # 进程重启 (starttime 变了) 的这一块不算
+                if old and old[0] == p["stat"][3]:
+                    delta += max(p["stat"][2] - old[1], 0)
+            cpu = round(delta * 100 / (total - self._prev_total), 2)
+
+        self._prev_total = total
+        self._prev = {pid: (p["stat"][3], p["stat"][2]) for pid, p in procs.items()}
+        if not procs:
+            return None
+
+        pss = [p["pss_kb"] for p in procs.values()]
+        fds = [p["fds"] for p in procs.values()]
+        return {
+            "ts": block["ts"],
+            "cpu": cpu,
+            "cpu_core": round(cpu * self.cores, 2) if cpu is not None else None,
+            "rss_mb": round(sum(p["rss_kb"] for p in procs.values()) / 1024, 2),
+            "pss_mb": round(sum(pss) / 1024, 2) if None not in pss else None,
+            "threads": sum(p["threads"] for p in procs.values()),
+            "fds": sum(fds) if None not in fds else None,
+            "pids": sorted(procs),
+        }
@@ -0,0 +1,157 @@
+import threading
+import time
+import weakref
+from libs.logger import logger
+
+
+class _DeviceState:
+    """单台设备的重连状态 (所有线程共享)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = None  # 正在进行的重连 (threading.Event)
+        self.last_result = False
+        self.failures = 0
+        self.next_allowed = 0.0  # 退避结束时间 (monotonic)
+
+
+class ReconnectCoordinator:
+    """
+    按设备协调 ADB 重连：
+
+    1. 恢复阶梯只作用于出问题的那台设备：
+       reconnect -> disconnect/connect (网络设备) -> usb 复位 (USB 设备)，
+       重启 adb server 是最后手段，且全局限频
+    2. 同一台设备的并发重连请求合并成一次，其他线程等结果
+    3. 失败后的指数退避状态跨线程共享，避免重连风暴
+    """
+
+    def __init__(self, base_backoff=2, max_backoff=60, online_timeout=5,
+                 server_restart_interval=120, waiter_timeout=90):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.online_timeout = online_timeout
+        self.server_restart_interval = server_restart_interval
+        self.waiter_timeout = waiter_timeout
+
+        self._states = {}
+        self._states_lock = threading.Lock()
+
+        # 重启 server 会断掉所有设备，重启后要把登记过的网络设备都连回来
+        self._network_devices = weakref.WeakValueDictionary()
+        self._server_lock = threading.Lock()
+        self._last_server_restart = 0.0
+
+    def register(self, manager):
+        """登记设备 (网络设备在 server 重启后需要重新 connect)"""
+        if manager.is_network_device and manager.device_id:
+            self._network_devices[manager.device_id] = manager
+
+    def _state(self, key):
+        with self._states_lock:
+            return self._states.setdefault(key, _DeviceState())
+
+    def recover(self, manager):
+        """
+        恢复某台设备的连接
+        :return: True 表示恢复成功；处于退避期或失败返回 False
+        """
+        self.register(manager)
+        key = manager.device_id or "<default>"
+        state = self._state(key)
+
+        with state.lock:
+            if state.inflight is not None:
+                event, leader = state.inflight, False
+            else:
+                wait = state.next_allowed - time.monotonic()
+                if wait > 0:
+                    logger.warning(f"⏳ [重连] {key} 处于退避期，{wait:.1f}s 内不再重试")
+                    return False
+                event = state.inflight = threading.Event()
+                leader = True
+
+        if not leader:
+            # 已经有线程在救这台设备了，搭个顺风车
+            logger.info(f"🔗 [重连] {key} 已有重连在进行，等待结果...")
+            event.wait(self.waiter_timeout)
+            return state.last_result
+
+        ok = False
+        try:
+            ok = self._run_ladder(manager, key)
+        except Exception as e:
+            logger.error(f"[重连] {key} 恢复流程异常: {e}")
+        finally:
+            with state.lock:
+                if ok:
+                    state.failures = 0
+                    state.next_allowed = 0.0
+                else:
+                    state.failures += 1
+                    backoff = min(self.max_backoff, self.base_backoff * 2 ** (state.failures - 1))
+                    state.next_allowed = time.monotonic() + backoff
+                state.last_result = ok
+                state.inflight = None
+            event.set()
+        return ok
+
+    def _run_ladder(self, manager, key):
+        logger.info(f"🚑 [重连] 开始恢复设备: {key}")
+        for name, step in self._ladder(manager):
+            logger.info(f"🚑 [重连] {key} -> {name}")
+            step()
+            if self._wait_online(manager):
+                logger.info(f"✅ [重连] {key} 已恢复 (步骤: {name})")
+                return True
+        logger.error(f"❌ [重连] {key} 所有恢复手段均失败")
+        return False
+
+    def _ladder(self, manager):
+        steps = []
+        if manager.device_id:
+            steps.append(("reconnect", lambda: manager._adb_raw(["reconnect"])))
+        if manager.is_network_device and manager.device_id:
+            steps.append(("disconnect/connect", lambda: self._reconnect_network(manager)))
+        elif manager.device_id:
+            steps.append(("usb 复位", lambda: manager._adb_raw(["usb"])))
+        steps.append(("重启 adb server", lambda: self._restart_server(manager)))
+        return steps
+
+    @staticmethod
+    def _reconnect_network(manager):
+        manager._adb_raw(["disconnect", manager.device_id], with_serial=False)
+        manager._adb_raw(["connect", manager.device_id], with_serial=False)
+
+    def _restart_server(self, manager):
+        """全局限频：一个周期内只允许重启一次 server，其他人直接跳过"""
+        with self._server_lock:
+            since = time.monotonic() - self._last_server_restart
+            if self._last_server_restart and since < self.server_restart_interval:
+                logger.warning(f"⚠️ [重连] {since:.0f}s 前刚重启过 adb server，本次跳过")
+                return
+            self._last_server_restart = time.monotonic()
+
+            # ⚠️ 会影响所有设备，所以放在阶梯的最后
+            logger.warning("⚠️ [重连] 重启 adb server (影响所有设备)")
+            manager._adb_raw(["kill-server"], with_serial=False)
+            time.sleep(1)
+            manager._adb_raw(["start-server"], with_serial=False)
+
+            for device_id, other in list(self._network_devices.items()):
+                logger.info(f"正在重新连接网络设备: {device_id}")
+                other._adb_raw(["connect", device_id], with_serial=False)
+
+    def _wait_online(self, manager):
+        deadline = time.monotonic() + self.online_timeout
+        while True:
+            returncode, output = manager._adb_raw(["get-state"], timeout=self.online_timeout)
+            if returncode == 0 and output.strip() == "device":
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.5)
+
+
+# 全局共享：所有 ADBManager 的重连都经过这里
+coordinator = ReconnectCoordinator()
@@ -0,0 +1,219 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from libs.compress import compress_file
+from libs.logger import logger
+
+# 进程内 sink 序号，和 pid 一起拼进文件名，同一秒起的多个 sink 不会撞名
+_SINK_SEQ = itertools.count(1)
+
+
+class RotatingSink:
+    """
+    可复用的日志落盘组件：
+
+    - 带缓冲写入：攒够 flush_bytes 或距上次落盘超过 flush_interval 秒才写一次盘
+    - 按大小 (max_bytes) / 时间 (rotate_interval 秒) / 跨天 切分文件
+    - 切下来的旧分段在后台线程里压缩，不阻塞写入
+    - manifest 文件记录所有分段，停止时可以把整套日志交出去，而不只是最后一个文件
+
+    文件名: {prefix}_{时间}_{pid}-{序号}_{分段号}.log，同一秒起的多个 sink (多只同名前缀的狗、
+    working 快速重启) 也各写各的；分段用独占模式创建，万一重名就换个名字而不是覆盖
+
+    用法:
+        sink = RotatingSink(log_dir, prefix="monitor", max_bytes=100 * 1024 * 1024, compress="gzip")
+        sink.write(line)
+        paths = sink.close()  # [manifest, 分段1, 分段2, ...]
+
+    写入线程里收尾用 close(wait=False)：只落盘、关掉最后一个分段，不等后台压缩；
+    之后在收狗时再 close(timeout=剩余时间) 等压缩完，拿到最终的文件列表
+    """
+
+    def __init__(self, directory, prefix="monitor", suffix=".log", max_bytes=100 * 1024 * 1024,
+                 rotate_interval=None, rotate_daily=True, flush_bytes=64 * 1024,
+                 flush_interval=1.0, compress=None, encoding="utf-8"):
+        self.directory = directory
+        self.prefix = prefix
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.rotate_daily = rotate_daily
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.encoding = encoding
+
+        os.makedirs(directory, exist_ok=True)
+        self.tag = f"{os.getpid()}-{next(_SINK_SEQ)}"
+        self.manifest_path = os.path.join(
+            directory, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{self.tag}.manifest.json"
+        )
+        self.segments = []  # manifest 里的分段信息
+
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._buffered = 0
+        self._file = None
+        self._segment = None
+        self._last_flush = time.monotonic()
+        self._closed = False
+
+        # 后台压缩线程 (只有开启压缩才启动)
+        self._compress_queue = queue.Queue()
+        self._compressor = None
+        if compress:
+            self._compressor = threading.Thread(target=self._compress_worker, daemon=True)
+            self._compressor.start()
+
+        self._open_segment()
+
+    @property
+    def current_path(self):
+        return self._segment["path"] if self._segment else None
+
+    # ================= 写入 =================
+
+    def write(self, text, lines=1):
+        """
+        :param lines: text 里包含几行 (整块写入时传入，只用于 manifest 统计)
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._buffer.append(text)
+            # 按字符数估算，避免每行都 encode 一次
+            self._buffered += len(text)
+            self._segment["lines"] += lines
+
+            now = time.monotonic()
+            if self._buffered >= self.flush_bytes or now - self._last_flush >= self.flush_interval:
+                self._flush(now)
+
+    def flush(self):
+        with self._lock:
+            if not self._closed:
+                self._flush(time.monotonic())
+
+    def _flush(self, now, rotate=True):
+        if self._buffer:
+            data = "".join(self._buffer).encode(self.encoding, errors="ignore")
+            self._file.write(data)
+            self._file.flush()
+            self._segment["bytes"] += len(data)
+            self._buffer.clear()
+            self._buffered = 0
+        self._last_flush = now
+
+        # 切分检查放在落盘时做，不用每行都看时间 (关闭前最后一次落盘不切，否则会多出一个空分段)
+        if rotate and self._should_rotate(now):
+            self._rotate()
+
+    def _should_rotate(self, now):
+        seg = self._segment
+        if self.max_bytes and seg["bytes"] >= self.max_bytes:
+            return True
+        if self.rotate_interval and now - seg["_opened"] >= self.rotate_interval:
+            return True
+        if self.rotate_daily and time.strftime("%Y%m%d") != seg["_date"]:
+            return True
+        return False
+
+    # ================= 分段 =================
+
+    def _open_segment(self):
+        index = len(self.segments) + 1
+        base = os.path.join(
+            self.directory,
+            f"{self.prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{self.tag}_{index:03d}",
+        )
+        path = base + self.suffix
+        for retry in itertools.count(1):
+            try:
+                self._file = open(path, "xb")  # 独占创建，绝不截断别人的文件
+                break
+            except FileExistsError:
+                path = f"{base}-{retry}{self.suffix}"
+        self._segment = {
+            "path": path,
+            "start": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "end": None,
+            "bytes": 0,
+            "lines": 0,
+            "compressed": False,
+            "_opened": time.monotonic(),
+            "_date": time.strftime("%Y%m%d"),
+        }
+        self.segments.append(self._segment)
+        logger.info(f"🔄 [RotatingSink] 新分段 -> {os.path.basename(path)}")
+
+    def _close_segment(self):
+        try:
+            self._file.close()
+        except Exception as e:
+            logger.error(f"关闭日志分段失败: {e}")
+        self._segment["end"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        if self._compressor:
+            self._compress_queue.put(self._segment)
+
+    def _rotate(self):
+        self._close_segment()
+        self._open_segment()
+        self._write_manifest()
+
+    def _compress_worker(self):
+        while True:
+            segment = self._compress_queue.get()
+            if segment is None:
+                self._compress_queue.task_done()
+                return
+            try:
+                path = compress_file(segment["path"], self.compress)
+                with self._lock:
+                    segment["path"] = path
+                    segment["compressed"] = True
+                    self._write_manifest()
+            except Exception as e:
+                logger.error(f"压缩日志分段失败: {segment['path']} - {e}")
+            finally:
+                self._compress_queue.task_done()
+
+    def _write_manifest(self):
+        with self._lock:
+            data = {
+                "prefix": self.prefix,
+                "segments": [
+                    {k: v for k, v in seg.items() if not k.startswith("_")} for seg in self.segments
+                ],
+            }
+            tmp = f"{self.manifest_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.manifest_path)
+
+    # ================= 收尾 =================
+
+    def close(self, timeout=30, wait=True):
+        """
+        落盘、关闭最后一个分段、等后台压缩结束 (可重复调用)
+        :param timeout: 最多等后台压缩多少秒
+        :param wait: False 时不等压缩 (写入线程收尾用，压缩留到收狗时再等)
+        :return: [manifest 路径, 分段路径...]；没等压缩完时是当时的路径
+        """
+        with self._lock:
+            if not self._closed:
+                self._flush(time.monotonic(), rotate=False)
+                self._closed = True
+                self._close_segment()
+                if self._compressor:
+                    self._compress_queue.put(None)  # 压缩线程处理完最后一个分段就退出
+
+        if wait and self._compressor and self._compressor.is_alive():
+            self._compressor.join(timeout)
+            if self._compressor.is_alive():
+                logger.warning("⚠️ [RotatingSink] 后台压缩未在时限内完成，manifest 可能不完整")
+
+        self._write_manifest()
+        return [self.manifest_path] + [seg["path"] for seg in self.segments]
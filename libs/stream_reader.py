@@ -0,0 +1,195 @@
+import os
+import queue
+import selectors
+import threading
+import time
+from libs.logger import logger
+
+
+class StreamReader:
+    """
+    子进程输出的非阻塞读取器 (给 logcat / monkey 这类长时间输出的狗用)
+
+    - 用 selectors 等数据，手机没输出时也不会卡在 readline() 里；
+      stop 时调用 wakeup() 立刻叫醒，poll_interval 只是兜底 (只设了停止信号、没叫醒时最多等这么久)，
+      所以设得很长，空闲时不会每秒空转几十次
+    - 按块 (chunk_size) 读，每块只 decode 一次再切行，比逐行 readline 开销小
+    - wakeup() 可以从别的线程立刻叫醒正在等数据的读取循环
+    - stats() 统计吞吐量 (bytes/s, lines/s)
+    Windows 上管道不支持 select，自动退回 "读线程 + 队列" 的方式
+
+    用法:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE)  # 注意不要 text=True
+        reader = StreamReader(process.stdout, stop_event=self._stop_event)
+        for lines in reader.batches():
+            ...
+    """
+
+    def __init__(self, stream, stop_event=None, chunk_size=64 * 1024, poll_interval=1.0,
+                 encoding="utf-8"):
+        self.stream = stream
+        self.stop_event = stop_event or threading.Event()
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.encoding = encoding
+
+        self.bytes_read = 0
+        self.lines_read = 0
+        self._started_at = None
+        self._wake_r = self._wake_w = None
+        # wakeup() 和关闭唤醒管道互斥：fd 关掉后编号可能被别的文件复用，不能再往里写
+        self._wake_lock = threading.Lock()
+        self._chunks = None  # Windows 读线程的队列
+
+    # ================= 对外接口 =================
+
+    def batches(self):
+        """
+        逐块产出行列表 (每行带 \\n)，流结束或收到停止信号时退出
+        """
+        self._started_at = time.monotonic()
+        if os.name == "nt":
+            yield from self._thread_batches()
+        else:
+            yield from self._select_batches()
+
+    def __iter__(self):
+        for lines in self.batches():
+            yield from lines
+
+    def wakeup(self):
+        """从其他线程唤醒读取循环 (一般在 stop 时调用)"""
+        with self._wake_lock:
+            if self._wake_w is not None:
+                try:
+                    os.write(self._wake_w, b"x")
+                except OSError:
+                    pass
+            elif self._chunks is not None:
+                try:
+                    self._chunks.put_nowait(None)
+                except queue.Full:
+                    pass  # 队列满说明读取循环马上就会醒
+
+    def stats(self):
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        return {
+            "bytes": self.bytes_read,
+            "lines": self.lines_read,
+            "elapsed": round(elapsed, 3),
+            "bytes_per_sec": round(self.bytes_read / elapsed, 1) if elapsed else 0,
+            "lines_per_sec": round(self.lines_read / elapsed, 1) if elapsed else 0,
+        }
+
+    # ================= 切行 =================
+
+    def _split(self, pending, data):
+        """
+        把新读到的数据接到上次剩下的半行后面，切出完整的行
+        :return: (行列表, 剩下的半行)
+        """
+        buf = pending + data if pending else data
+        idx = buf.rfind(b"\n")
+        if idx < 0:
+            return [], buf
+        # 整块只 decode 一次；半个 UTF-8 字符只可能出现在最后一个换行之后
+        text = buf[:idx].decode(self.encoding, errors="ignore")
+        lines = [line + "\n" for line in text.split("\n")]
+        self.lines_read += len(lines)
+        return lines, buf[idx + 1:]
+
+    def _tail(self, pending):
+        """流结束时最后一行可能没有换行符"""
+        if not pending:
+            return []
+        self.lines_read += 1
+        return [pending.decode(self.encoding, errors="ignore")]
+
+    # ================= POSIX: selectors =================
+
+    def _select_batches(self):
+        fd = self.stream.fileno()
+        os.set_blocking(fd, False)
+        wake_r, wake_w = os.pipe()
+        os.set_blocking(wake_r, False)
+        with self._wake_lock:
+            self._wake_r, self._wake_w = wake_r, wake_w
+
+        selector = selectors.DefaultSelector()
+        selector.register(fd, selectors.EVENT_READ)
+        selector.register(wake_r, selectors.EVENT_READ)
+        pending = b""
+        try:
+            while not self.stop_event.is_set():
+                events = selector.select(self.poll_interval)
+                eof = False
+                for key, _ in events:
+                    if key.fd == wake_r:
+                        try:
+                            os.read(wake_r, 1024)
+                        except OSError:
+                            pass
+                        continue
+                    try:
+                        data = os.read(fd, self.chunk_size)
+                    except BlockingIOError:
+                        continue
+                    if not data:
+                        eof = True
+                        continue
+                    self.bytes_read += len(data)
+                    lines, pending = self._split(pending, data)
+                    if lines:
+                        yield lines
+                if eof:
+                    tail = self._tail(pending)
+                    if tail:
+                        yield tail
+                    return
+        finally:
+            selector.close()
+            with self._wake_lock:
+                self._wake_r = self._wake_w = None
+                for pipe_fd in (wake_r, wake_w):
+                    try:
+                        os.close(pipe_fd)
+                    except OSError:
+                        pass
+
+    # ================= Windows: 读线程 + 队列 =================
+
+    def _thread_batches(self):
+        chunks = queue.Queue(maxsize=256)
+        with self._wake_lock:
+            self._chunks = chunks
+
+        def pump():
+            read = getattr(self.stream, "read1", self.stream.read)
+            try:
+                while True:
+                    data = read(self.chunk_size)
+                    chunks.put(data)
+                    if not data:
+                        return
+            except Exception as e:
+                logger.warning(f"StreamReader 读线程退出: {e}")
+                chunks.put(b"")
+
+        threading.Thread(target=pump, daemon=True).start()
+        pending = b""
+        while not self.stop_event.is_set():
+            try:
+                data = chunks.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            if data is None:
+                continue  # wakeup()：回到循环开头看停止信号
+            if not data:
+                tail = self._tail(pending)
+                if tail:
+                    yield tail
+                return
+            self.bytes_read += len(data)
+            lines, pending = self._split(pending, data)
+            if lines:
+                yield lines
@@ -0,0 +1,191 @@
+from collections import deque
+
+
+class SlidingRegression:
+    """
+    滑动时间窗口内的最小二乘直线拟合，增删样本都是 O(1) (维护 Σx Σy Σxy Σx² Σy²)
+    x 用相对第一个样本的秒数，避免大时间戳平方后丢精度
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._points = deque()
+        self._origin = None
+        self.n = 0
+        self.sx = self.sy = self.sxy = self.sxx = self.syy = 0.0
+
+    def add(self, ts, value):
+        if self._origin is None:
+            self._origin = ts
+        x = ts - self._origin
+        self._points.append((x, value))
+        self._update(x, value, 1)
+        while self._points and x - self._points[0][0] > self.window:
+            old_x, old_y = self._points.popleft()
+            self._update(old_x, old_y, -1)
+
+    def _update(self, x, y, sign):
+        self.n += sign
+        self.sx += sign * x
+        self.sy += sign * y
+        self.sxy += sign * x * y
+        self.sxx += sign * x * x
+        self.syy += sign * y * y
+
+    def fit(self):
+        """
+        :return: (斜率 (每秒), 窗口末端的拟合值, r²)；样本不够返回 None
+        """
+        if self.n < 3:
+            return None
+        var_x = self.n * self.sxx - self.sx * self.sx
+        if var_x <= 0:
+            return None
+        cov = self.n * self.sxy - self.sx * self.sy
+        slope = cov / var_x
+        intercept = (self.sy - slope * self.sx) / self.n
+        var_y = self.n * self.syy - self.sy * self.sy
+        r2 = cov * cov / (var_x * var_y) if var_y > 0 else 0.0
+        last_x = self._points[-1][0]
+        return slope, intercept + slope * last_x, r2
+
+
+class PageHinkley:
+    """
+    Page-Hinkley 变点检测：均值突然抬升 (或下降) 时报警，O(1)
+    :param delta: 容忍的波动幅度 (和数据同单位)
+    :param threshold: 累计偏离超过多少算变点
+    """
+
+    def __init__(self, delta, threshold, direction="up"):
+        self.delta = delta
+        self.threshold = threshold
+        self.direction = direction
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.cum = 0.0
+        self.extreme = 0.0
+
+    def add(self, value):
+        """:return: True 表示检测到变点 (检测到后自动重置，以新水平为基线)"""
+        self.n += 1
+        self.mean += (value - self.mean) / self.n
+        if self.direction == "up":
+            self.cum += value - self.mean - self.delta
+            self.extreme = min(self.extreme, self.cum)
+            changed = self.cum - self.extreme > self.threshold
+        else:
+            self.cum += value - self.mean + self.delta
+            self.extreme = max(self.extreme, self.cum)
+            changed = self.extreme - self.cum > self.threshold
+        if changed:
+            self.reset()
+        return changed
+
+
+class TroughBaseline:
+    """
+    锯齿感知的基线：GC 会让内存曲线呈锯齿状，直接拟合会被锯齿带偏，
+    这里把时间切成 period 秒的小段，只取每段的最低点 (GC 后的谷底) 参与拟合，
+    谷底在持续抬升才是真的泄漏
+    """
+
+    def __init__(self, period, window):
+        self.period = period
+        self.regression = SlidingRegression(window)
+        self._bucket_start = None
+        self._bucket_min = None
+
+    def add(self, ts, value):
+        """:return: 这一段结束时返回 (谷底时间, 谷底值)，否则 None"""
+        if self._bucket_start is None:
+            self._bucket_start = ts
+        closed = None
+        if ts - self._bucket_start >= self.period:
+            closed = self._bucket_min
+            self.regression.add(*closed)
+            self._bucket_start = ts
+            self._bucket_min = None
+        if self._bucket_min is None or value <= self._bucket_min[1]:
+            self._bucket_min = (ts, value)
+        return closed
+
+
+class TrendDetector:
+    """
+    单条序列 (例如某个包的内存) 的在线趋势检测，每个样本 O(1)
+
+    - 泄漏: 谷底基线的斜率持续为正、拟合度够高 (r² >= min_r2)，
+            报告斜率和按当前斜率到达 limit 的剩余时间
+    - 突变: Page-Hinkley 检测均值突然抬升
+    同一种事件报过之后 cooldown 秒内不再重复报
+
+    用法:
+        detector = TrendDetector("mem", limit=500, min_slope=0.5 / 60)
+        for event in detector.update(ts, mem):
+            self.alert(event["msg"])
+    """
+
+    def __init__(self, name, limit=None, window=1800, trough_period=30, min_points=6,
+                 min_slope=0.0, min_r2=0.6, shift_delta=None, shift_threshold=None, cooldown=600):
+        self.name = name
+        self.limit = limit
+        self.min_points = min_points
+        self.min_slope = min_slope
+        self.min_r2 = min_r2
+        self.cooldown = cooldown
+        self.baseline = TroughBaseline(trough_period, window)
+        self.shift = PageHinkley(shift_delta, shift_threshold) if shift_threshold else None
+        self._last_event = {}
+
+    def update(self, ts, value):
+        """喂一个样本，返回本次触发的事件列表 (大多数时候是空的)"""
+        events = []
+        if value is None:
+            return events
+
+        if self.baseline.add(ts, value) is not None:
+            event = self._check_leak(ts, value)
+            if event:
+                events.append(event)
+
+        if self.shift and self.shift.add(value) and self._ready("shift", ts):
+            events.append({
+                "kind": "shift", "name": self.name, "value": value,
+                "msg": f"{self.name} 突变: 均值明显抬升，当前 {value:.1f}",
+            })
+        return events
+
+    def _check_leak(self, ts, value):
+        regression = self.baseline.regression
+        if regression.n < self.min_points:
+            return None
+        fit = regression.fit()
+        if fit is None:
+            return None
+        slope, baseline, r2 = fit
+        if slope <= self.min_slope or r2 < self.min_r2 or not self._ready("leak", ts):
+            return None
+
+        eta = None
+        if self.limit is not None and baseline < self.limit:
+            eta = (self.limit - baseline) / slope
+        msg = f"{self.name} 持续上涨: {slope * 60:+.2f}/min (r²={r2:.2f})，谷底基线 {baseline:.1f}"
+        if eta is not None:
+            msg += f"，预计 {eta / 60:.0f} 分钟后达到上限 {self.limit}"
+        return {
+            "kind": "leak", "name": self.name, "value": value,
+            "slope_per_min": round(slope * 60, 4), "baseline": round(baseline, 2),
+            "r2": round(r2, 3), "eta_sec": round(eta) if eta is not None else None,
+            "msg": msg,
+        }
+
+    def _ready(self, kind, ts):
+        last = self._last_event.get(kind)
+        if last is not None and ts - last < self.cooldown:
+            return False
+        self._last_event[kind] = ts
+        return True
@@ -0,0 +1,204 @@
+"""
+测试用的假 adb：不需要手机，用本机 sh 模拟设备端
+"""
+import os
+import socketserver
+import stat
+import struct
+import subprocess
+import sys
+import threading
+
+FAKE_ADB_SOURCE = r'''
+import os
+import subprocess
+import sys
+
+args = sys.argv[1:]
+if args[:1] == ["-s"]:
+    args = args[2:]
+
+if args[:1] == ["shell"]:
+    if len(args) == 1:
+        # 交互式 shell：直接换成本机 sh
+        os.execvp("sh", ["sh"])
+    sys.exit(subprocess.call(" ".join(args[1:]), shell=True))
+elif args[:1] == ["get-state"]:
+    print("device")
+elif args[:1] in (["connect"], ["disconnect"], ["reconnect"]):
+    print(f"{args[0]}ed {' '.join(args[1:])}")
+elif args[:1] in (["kill-server"], ["start-server"]):
+    pass
+else:
+    sys.stderr.write(f"fake adb: unsupported {args}\n")
+    sys.exit(1)
+'''
+
+
+def make_fake_adb(directory):
+    """
+    在 directory 下生成一个可执行的假 adb 脚本
+    :return: 脚本路径
+    """
+    path = os.path.join(str(directory), "adb")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"#!{sys.executable}\n")
+        f.write(FAKE_ADB_SOURCE)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+
+def make_fake_logcat(directory, lines, endless=None):
+    """
+    在 directory 下生成一个假的 logcat 命令 (配合 make_fake_adb，把 directory 加进 PATH)：
+    输出 lines，收到的参数记到 directory/logcat.args
+    :param endless: 输出完 lines 后不停重复这一行 (模拟读不完的缓冲区，用来验证提前退出)
+    :return: 记录参数的文件路径
+    """
+    directory = str(directory)
+    data_path = os.path.join(directory, "logcat.txt")
+    args_path = os.path.join(directory, "logcat.args")
+    with open(data_path, "w", encoding="utf-8") as f:
+        f.writelines(line if line.endswith("\n") else line + "\n" for line in lines)
+    script = f'#!/bin/sh\necho "$@" > "{args_path}"\ncat "{data_path}"\n'
+    if endless:
+        script += f"while true; do echo '{endless}' || exit 0; done\n"
+    path = os.path.join(directory, "logcat")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(script)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return args_path
+
+class FakeAdbServer:
+    """
+    本地假 adb server：在 127.0.0.1 随机端口上说 smart-socket 协议，
+    shell:/exec: 用本机 sh 执行，sync: 的远端路径映射到 root_dir 下面
+    """
+
+    def __init__(self, root_dir, serials=("fake-001",)):
+        self.root_dir = str(root_dir)
+        self.serials = set(serials)
+        self.requests = []
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._handle(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._tcp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._tcp.daemon_threads = True
+        self.port = self._tcp.server_address[1]
+        self._thread = threading.Thread(target=self._tcp.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    # ---------- 协议处理 ----------
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        buf = b""
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise EOFError
+            buf += chunk
+        return buf
+
+    def _read_request(self, sock):
+        length = int(self._recv_exact(sock, 4), 16)
+        request = self._recv_exact(sock, length).decode()
+        self.requests.append(request)
+        return request
+
+    @staticmethod
+    def _reply(sock, payload=None, fail=None):
+        if fail is not None:
+            data = fail.encode()
+            sock.sendall(b"FAIL" + b"%04x" % len(data) + data)
+            return
+        sock.sendall(b"OKAY")
+        if payload is not None:
+            data = payload.encode()
+            sock.sendall(b"%04x" % len(data) + data)
+
+    def _handle(self, sock):
+        try:
+            request = self._read_request(sock)
+            if request.startswith("host-serial:") and request.endswith(":get-state"):
+                serial = request[len("host-serial:"):-len(":get-state")]
+                if serial in self.serials:
+                    self._reply(sock, "device")
+                else:
+                    self._reply(sock, fail=f"device '{serial}' not found")
+                return
+            if request.startswith("host:connect:") or request.startswith("host:disconnect:"):
+                verb, address = request[len("host:"):].split(":", 1)
+                self._reply(sock, f"{verb}ed to {address}")
+                return
+            if request.startswith("host:transport:"):
+                serial = request[len("host:transport:"):]
+                if serial not in self.serials:
+                    self._reply(sock, fail=f"device '{serial}' not found")
+                    return
+                self._reply(sock)
+                service = self._read_request(sock)
+                if service.startswith("shell:") or service.startswith("exec:"):
+                    self._reply(sock)
+                    cmd = service.split(":", 1)[1]
+                    merge = subprocess.STDOUT if service.startswith("shell:") else subprocess.DEVNULL
+                    result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=merge)
+                    sock.sendall(result.stdout)
+                elif service == "sync:":
+                    self._reply(sock)
+                    self._handle_sync(sock)
+                else:
+                    self._reply(sock, fail=f"unknown service {service}")
+                return
+            self._reply(sock, fail=f"unknown request {request}")
+        except EOFError:
+            pass
+        finally:
+            sock.close()
+
+    def _local(self, remote_path):
+        return os.path.join(self.root_dir, remote_path.lstrip("/"))
+
+    def _handle_sync(self, sock):
+        while True:
+            header = self._recv_exact(sock, 8)
+            cmd, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if cmd == b"QUIT":
+                return
+            data = self._recv_exact(sock, length).decode()
+            if cmd == b"SEND":
+                path = self._local(data.rsplit(",", 1)[0])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    while True:
+                        header = self._recv_exact(sock, 8)
+                        kind, size = header[:4], struct.unpack("<I", header[4:])[0]
+                        if kind == b"DONE":
+                            break
+                        f.write(self._recv_exact(sock, size))
+                sock.sendall(b"OKAY" + struct.pack("<I", 0))
+            elif cmd == b"RECV":
+                path = self._local(data)
+                if not os.path.exists(path):
+                    msg = b"No such file or directory"
+                    sock.sendall(b"FAIL" + struct.pack("<I", len(msg)) + msg)
+                    continue
+                with open(path, "rb") as f:
+                    while True:
+                        chunk = f.read(64 * 1024)
+                        if not chunk:
+                            break
+                        sock.sendall(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                sock.sendall(b"DONE" + struct.pack("<I", 0))
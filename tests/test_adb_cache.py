@@ -0,0 +1,74 @@
+import os
+import time
+
+import allure
+import pytest
+
+from libs.adb_cache import TTLCache
+from libs.adb_manager import ADBManager
+from libs.cpu_sampler import CpuSampler
+from tests.fake_adb import make_fake_adb
+
+
+@allure.feature("ADB 结果缓存")
+class TestADBCache:
+
+    def test_ttl_and_lru(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1, ttl=0.05)
+        cache.set("b", 2, ttl=10)
+        assert cache.get("a") == (True, 1)
+
+        cache.set("c", 3, ttl=10)  # 淘汰最久没用的 b
+        assert cache.get("b") == (False, None)
+        time.sleep(0.06)
+        assert cache.get("a") == (False, None)
+        assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 1, "size": 1}
+
+    @pytest.mark.skipif(os.name == "nt", reason="假 adb 依赖本机 sh")
+    def test_manager_cache_and_invalidation(self, tmp_path, monkeypatch):
+        # 本机没有 getprop，造一个
+        getprop = tmp_path / "getprop"
+        getprop.write_text("#!/bin/sh\necho Pixel\n")
+        getprop.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+        adb = ADBManager("fake-001", adb_path=make_fake_adb(tmp_path), cache=True)
+
+        assert adb.get_prop("ro.product.model") == "Pixel"
+        assert adb.get_prop("ro.product.model") == "Pixel"
+        assert adb.cache_stats()["hits"] == 1
+
+        # 不在规则里的命令不缓存
+        adb.shell("echo hi")
+        adb.shell("echo hi")
+        assert adb.cache_stats()["hits"] == 1
+
+        # setprop 会作废 getprop 的缓存
+        adb.shell("setprop debug.x 1 || true")
+        adb.shell("getprop ro.product.model")
+        assert adb.cache_stats()["hits"] == 1
+
+        # 设备状态变化清空全部缓存
+        adb._on_state("device")
+        adb._on_state("offline")
+        assert adb.cache_stats()["size"] == 0
+
+    @pytest.mark.skipif(os.name == "nt", reason="假 adb 依赖本机 sh")
+    def test_pidof_is_not_cached(self, tmp_path, monkeypatch):
+        # pidof 返回文件里的 PID，改文件模拟应用重启
+        pid_file = tmp_path / "pid"
+        pid_file.write_text("1234")
+        pidof = tmp_path / "pidof"
+        pidof.write_text(f"#!/bin/sh\ncat {pid_file}\n")
+        pidof.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+        adb = ADBManager("fake-001", adb_path=make_fake_adb(tmp_path), cache=True)
+        sampler = CpuSampler(adb, "com.demo")
+        assert sampler.resolve() == [1234]
+
+        pid_file.write_text("5678")
+        # 开着缓存，重启后的 PID 也要马上解析到
+        assert sampler.resolve() == [5678]
+        assert adb.cache_stats()["hits"] == 0
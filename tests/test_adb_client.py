@@ -0,0 +1,60 @@
+import os
+
+import allure
+import pytest
+
+from libs.adb_client import ADBProtocolError, AdbClient
+from libs.adb_manager import ADBManager
+from tests.fake_adb import FakeAdbServer
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="假 adb server 依赖本机 sh")
+
+
+@pytest.fixture
+def fake_server(tmp_path):
+    with FakeAdbServer(tmp_path / "device") as server:
+        yield server
+
+
+@allure.feature("ADB 原生协议")
+class TestAdbClient:
+
+    def test_host_queries(self, fake_server):
+        client = AdbClient(port=fake_server.port)
+        assert client.get_state("fake-001") == "device"
+        assert "connected" in client.connect("192.168.1.8:5555")
+        with pytest.raises(ADBProtocolError, match="not found"):
+            client.get_state("ghost")
+
+    def test_shell_exit_code(self, fake_server):
+        client = AdbClient(port=fake_server.port)
+        assert client.shell("fake-001", "echo hi") == (0, "hi\n\n")
+        returncode, _ = client.shell("fake-001", "exit 7")
+        assert returncode == 7
+
+    def test_push_pull_reuses_sync_connection(self, fake_server, tmp_path):
+        client = AdbClient(port=fake_server.port)
+        src = tmp_path / "src.bin"
+        src.write_bytes(os.urandom(200 * 1024))
+
+        client.push("fake-001", str(src), "/sdcard/a.bin")
+        client.pull("fake-001", "/sdcard/a.bin", str(tmp_path / "back.bin"))
+        assert (tmp_path / "back.bin").read_bytes() == src.read_bytes()
+        # 两次传输只建了一次 sync 连接
+        assert fake_server.requests.count("sync:") == 1
+
+        with pytest.raises(ADBProtocolError):
+            client.pull("fake-001", "/sdcard/missing", str(tmp_path / "x"))
+        client.close()
+
+    def test_manager_native_backend(self, fake_server, tmp_path):
+        adb = ADBManager.from_config({
+            "serial": "fake-001", "backend": "native", "server_port": fake_server.port,
+        })
+        assert adb.shell("echo 42") == "42"
+        assert adb.shell("false") is None
+        assert adb.run_cmd("get-state") == "device"
+
+        out = tmp_path / "logcat.txt"
+        assert adb.exec_out("printf png", str(out))
+        assert out.read_bytes() == b"png"
@@ -0,0 +1,62 @@
+import time
+
+import allure
+
+from libs.adb_pool import AdbPool
+
+
+class SlowAdb:
+    def __init__(self, delay=0.2, output="ok"):
+        self.delay = delay
+        self.output = output
+
+    def shell(self, cmd):
+        time.sleep(self.delay)
+        return self.output
+
+
+@allure.feature("设备池并发")
+class TestAdbPool:
+
+    def test_broadcast_runs_concurrently(self):
+        pool = AdbPool({f"phone{i}": SlowAdb() for i in range(6)}, max_workers=8)
+        start = time.perf_counter()
+        result = pool.broadcast("echo ok")
+        elapsed = time.perf_counter() - start
+
+        assert sorted(result.ok) == sorted(pool)
+        assert set(result.data().values()) == {"ok"}
+        assert elapsed < 0.2 * 3  # 串行需要 1.2s
+
+    def test_errors_and_timeouts_are_per_device(self):
+        def boom(adb):
+            raise RuntimeError("boom")
+
+        pool = AdbPool({"fast": SlowAdb(0), "slow": SlowAdb(2), "broken": SlowAdb(0, None)})
+        result = pool.gather({
+            "fast": lambda adb: adb.shell("x"),
+            "slow": lambda adb: adb.shell("x"),
+            "broken": boom,
+            "ghost": lambda adb: adb.shell("x"),
+        }, timeout=0.3)
+
+        assert result.ok == ["fast"]
+        assert "超时" in result["slow"]["msg"]
+        assert result["broken"]["msg"] == "boom"
+        assert "不存在" in result["ghost"]["msg"]
+        pool.shutdown()
+
+    def test_queued_tasks_time_out_when_workers_are_stuck(self):
+        pool = AdbPool({"stuck1": SlowAdb(2), "stuck2": SlowAdb(2), "fast": SlowAdb(0)},
+                       max_workers=2, timeout=0.2, queue_timeout=0.3)
+        # 两台卡住的设备把 2 个 worker 都占着
+        first = pool.map(lambda adb: adb.shell("x"), names=["stuck1", "stuck2"])
+        assert "超时" in first["stuck1"]["msg"] and "超时" in first["stuck2"]["msg"]
+
+        start = time.monotonic()
+        result = pool.map(lambda adb: adb.shell("x"), names=["fast"])
+        # 排不上 worker 的任务按排队超时返回，而不是一直等下去
+        assert time.monotonic() - start < 1
+        assert "排队超时" in result["fast"]["msg"]
+        assert result.failed == ["fast"]
+        pool.shutdown()
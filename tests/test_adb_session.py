@@ -0,0 +1,148 @@
+import os
+import time
+
+import allure
+import pytest
+
+from libs.adb_manager import ADBManager
+from libs.adb_session import ADBSessionTimeout, ADBShellSession
+from libs.logger import logger
+from tests.fake_adb import make_fake_adb
+
+pytestmark = pytest.mark.skipif(
+    os.name == "nt", reason="假 adb 依赖本机 sh"
+)
+
+
+@pytest.fixture
+def fake_adb(tmp_path):
+    return make_fake_adb(tmp_path)
+
+
+@allure.feature("ADB 常驻会话")
+class TestADBSession:
+
+    def test_output_and_exit_code(self, fake_adb):
+        session = ADBShellSession("fake-001", adb_path=fake_adb)
+        try:
+            rc, out, err = session.execute("echo hello")
+            assert rc == 0 and out.strip() == "hello" and err.strip() == ""
+            rc, out, _ = session.execute("printf 'a\\nb'")
+            assert rc == 0 and out.strip() == "a\nb"
+            # 哨兵的换行不混进输出：和命令本身的输出一字不差
+            assert session.execute("printf 'a\\nb'")[1] == "a\nb"
+            assert session.execute("printf 'x\\n\\n'")[1] == "x\n\n"
+            assert session.execute("printf err >&2")[2] == "err"
+
+            rc, _, err = session.execute("echo oops >&2; exit 3")
+            assert rc == 3 and "oops" in err
+
+            # 语法错误不能把会话带走
+            rc, _, _ = session.execute("if then")
+            assert rc != 0
+            assert session.execute("echo still-alive")[1].strip() == "still-alive"
+        finally:
+            session.close()
+
+    def test_restart_after_crash(self, fake_adb):
+        session = ADBShellSession("fake-001", adb_path=fake_adb)
+        try:
+            session.execute("true")
+            session.process.kill()
+            session.process.wait()
+            rc, out, _ = session.execute("echo back")
+            assert rc == 0 and out.strip() == "back"
+        finally:
+            session.close()
+
+    def test_timeout_is_not_retried(self, fake_adb, tmp_path):
+        counter = tmp_path / "runs"
+        session = ADBShellSession("fake-001", adb_path=fake_adb)
+        try:
+            start = time.monotonic()
+            with pytest.raises(ADBSessionTimeout):
+                session.execute(f"echo run >> {counter}; sleep 5", timeout=0.5)
+            # 只等了一个 timeout，命令也只跑了一次
+            assert time.monotonic() - start < 1.5
+            assert counter.read_text().count("run") == 1
+            assert not session.is_alive()
+            # 下一条命令自动重建会话
+            assert session.execute("echo again")[1].strip() == "again"
+        finally:
+            session.close()
+
+        # 默认不限时 (和单次调用一致)，超时由调用方配置
+        assert ADBShellSession("fake-001", adb_path=fake_adb).timeout is None
+        adb = ADBManager("fake-001", session=True, adb_path=fake_adb, session_timeout=0.5)
+        assert adb._get_session().timeout == 0.5
+        try:
+            # 超时后不退回单次调用模式再跑一遍
+            assert adb.shell(f"echo run >> {counter}; sleep 5") is None
+            assert counter.read_text().count("run") == 2
+        finally:
+            adb.close_session()
+
+    def test_manager_session_mode(self, fake_adb):
+        adb = ADBManager("fake-001", session=True, adb_path=fake_adb)
+        try:
+            assert adb.shell("echo 42") == "42"
+            assert adb.shell("false") is None
+            assert adb.run_cmd("get-state") == "device"
+        finally:
+            adb.close_session()
+
+    def test_benchmark_session_vs_subprocess(self, fake_adb):
+        """对比：每次起进程 vs 常驻会话"""
+        rounds = 20
+        plain = ADBManager("fake-001", adb_path=fake_adb)
+        session = ADBManager("fake-001", session=True, adb_path=fake_adb)
+        try:
+            session.shell("true")  # 预热：会话建立的开销只算一次
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                plain.shell("echo ping")
+            plain_ms = (time.perf_counter() - start) / rounds * 1000
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                session.shell("echo ping")
+            session_ms = (time.perf_counter() - start) / rounds * 1000
+        finally:
+            session.close_session()
+
+        logger.info(f"⏱️ shell() 平均耗时: 单次进程 {plain_ms:.2f}ms / 常驻会话 {session_ms:.2f}ms")
+        assert session_ms < plain_ms
+
+
+@allure.feature("ADB 批量执行")
+class TestADBBatch:
+
+    @pytest.mark.parametrize("session", [False, True])
+    def test_batch_frames_each_command(self, fake_adb, session):
+        adb = ADBManager("fake-001", session=session, adb_path=fake_adb)
+        try:
+            results = adb.batch(["echo one", "printf 'two\\nlines'", "exit 4", "echo after"])
+        finally:
+            adb.close_session()
+
+        assert [r["output"] for r in results] == ["one", "two\nlines", "", "after"]
+        assert [r["returncode"] for r in results] == [0, 0, 4, 0]
+        assert all(r["elapsed"] is not None and r["elapsed"] >= 0 for r in results)
+
+    def test_batch_costs_about_one_round_trip(self, fake_adb):
+        adb = ADBManager("fake-001", adb_path=fake_adb)
+        cmds = [f"echo probe{i}" for i in range(10)]
+
+        start = time.perf_counter()
+        for cmd in cmds:
+            adb.shell(cmd)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = adb.batch(cmds)
+        batched = time.perf_counter() - start
+
+        logger.info(f"⏱️ 10 条命令: 逐条 {sequential * 1000:.1f}ms / 批量 {batched * 1000:.1f}ms")
+        assert [r["output"] for r in results] == [f"probe{i}" for i in range(10)]
+        assert batched < sequential / 3
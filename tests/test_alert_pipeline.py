@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+
+import allure
+
+from libs.baseDog import AlertPipeline, BaseDog, fingerprint
+
+
+class _Ctx:
+    def __init__(self):
+        self.data = {}
+
+
+class _IdleDog(BaseDog):
+    def working(self):
+        self.interruptible_sleep(10)
+
+
+@allure.feature("报警去重限流")
+class TestAlertPipeline:
+
+    def test_fingerprint(self):
+        assert fingerprint("ANR in com.demo (pid 1234) at 0x7f00ab") == \
+            fingerprint("ANR in com.demo (pid 99)  at 0xdeadbeef")
+        assert fingerprint("ANR in com.a") != fingerprint("CRASH in com.a")
+
+    def test_coalesce_window(self):
+        pipeline = AlertPipeline(window=0.1)
+        assert pipeline.admit("FATAL pid 1") == "FATAL pid 1"
+        assert pipeline.admit("FATAL pid 2") is None
+        assert pipeline.admit("FATAL pid 3") is None
+        time.sleep(0.12)
+        assert "重复 3 次" in pipeline.admit("FATAL pid 4")
+        assert pipeline.stats["coalesced"] == 2
+
+    def test_storm_does_not_block(self):
+        calls = []
+        release = threading.Event()
+
+        def slow_callback(msg):
+            release.wait(1)  # 模拟很慢的飞书推送
+            calls.append(msg)
+
+        dog = _IdleDog(_Ctx(), on_alert=slow_callback, hook_strategy="mark",
+                       alert_rates={"on_alert": (0, 3)})
+        start = time.perf_counter()
+        for i in range(2000):
+            dog.alert(f"FATAL EXCEPTION pid {i}")       # 同一种，只放行一次
+            dog.alert(f"crash #{i % 10} in module_{chr(97 + i % 10)}")  # 10 种不同的
+        elapsed = time.perf_counter() - start
+        release.set()
+        dog.alerts.close()
+
+        assert elapsed < 0.5
+        assert dog.context.data["has_failure"] is True
+        assert dog.alerts.stats["coalesced"] == 4000 - 11
+        # 令牌桶容量 3、不补充: 回调最多执行 3 次
+        assert len(calls) == 3
+        assert dog.alerts.stats["rate_limited"] == 8
+
+    def test_counters_are_thread_safe(self):
+        # 切换间隔调到最小，放大计数器 "读-改-写" 被打断的概率
+        old = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            pipeline = AlertPipeline(rates={"limited": (0, 0)})
+
+            def worker():
+                for _ in range(5000):
+                    pipeline.run("free", lambda msg: None, "x")
+                    pipeline.run("limited", lambda msg: None, "x")
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setswitchinterval(old)
+
+        assert pipeline.snapshot()["executed"] == 40000
+        assert pipeline.snapshot()["rate_limited"] == 40000
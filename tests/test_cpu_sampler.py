@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import time
+
+import allure
+import pytest
+
+from libs.adb_manager import ADBManager
+from libs.cpu_sampler import CpuSampler, parse_stat
+from tests.fake_adb import make_fake_adb
+
+
+@allure.feature("CPU 采样")
+class TestCpuSampler:
+
+    def test_parse_stat_with_odd_name(self):
+        line = "1234 (Render (x) 1) S 1 1 0 0 -1 4194624 10 0 0 0 150 50 0 0 20 0 12 0 98765 0 0"
+        assert parse_stat(line) == (1234, "Render (x) 1", 200, 98765)
+        assert parse_stat("garbage") is None
+
+    @pytest.mark.skipif(not os.path.exists("/proc/stat"), reason="需要 Linux /proc")
+    def test_busy_process(self, tmp_path, monkeypatch):
+        # 本机起一个死循环进程，假 adb 的 shell 直接在本机执行，读的就是本机 /proc
+        busy = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+        try:
+            adb = ADBManager("fake-001", adb_path=make_fake_adb(tmp_path))
+            monkeypatch.setattr(adb, "get_pid", lambda package: [busy.pid])
+            sampler = CpuSampler(adb, "com.busy")
+
+            assert sampler.sample() is None  # 第一次只建立基线
+            time.sleep(0.5)
+            result = sampler.sample()
+        finally:
+            busy.kill()
+            busy.wait()
+
+        # 占满一个核，按单核算接近 100%
+        assert 60 < result["cpu_core"] < 130
+        assert result["pids"].keys() == {busy.pid}
+        assert result["threads"][0]["tid"] == busy.pid
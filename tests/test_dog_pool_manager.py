@@ -0,0 +1,135 @@
+import os
+import time
+from types import SimpleNamespace
+
+import allure
+
+from core.dogPool_manager import DogPoolManager
+
+# 收到停止信号后还要磨蹭 linger 秒才退出的狗
+SLOW_DOG = '''
+import time
+from libs.baseDog import BaseDog
+
+
+class Dog(BaseDog):
+    def working(self):
+        self._stop_event.wait()
+        time.sleep(self.kwargs.get("linger", 0))
+
+    def collect(self, timeout=None):
+        super().collect(timeout)
+        if self.kwargs.get("broken"):
+            raise RuntimeError("disk full")
+        return self.kwargs.get("artifact")
+'''
+
+
+def make_manager(tmp_path):
+    dogs_dir = tmp_path / "actions" / "dogs"
+    dogs_dir.mkdir(parents=True)
+    for name in ("dog_a", "dog_b", "dog_c", "dog_stuck"):
+        (dogs_dir / f"{name}.py").write_text(SLOW_DOG, encoding="utf-8")
+    context = SimpleNamespace(root_dir=str(tmp_path), data={}, config={})
+    return DogPoolManager(context)
+
+
+@allure.feature("狗池管理")
+class TestStopAll:
+
+    def test_dogs_stop_in_parallel(self, tmp_path, monkeypatch):
+        attached = []
+        monkeypatch.setattr(allure, "attach", lambda body, **kw: attached.append(kw["name"]))
+        manager = make_manager(tmp_path)
+        note = tmp_path / "big.log"
+        note.write_text("x")
+        for name in ("dog_a", "dog_b", "dog_c"):
+            manager.start(name, linger=1, artifact=str(note))
+
+        report = manager.stop_all(timeout=5)
+
+        # 三只狗各磨蹭 1 秒，并发收狗总共也就 1 秒多
+        assert report["elapsed"] < 2
+        assert sorted(report["stopped"]) == ["dog_a", "dog_b", "dog_c"]
+        assert report["stuck"] == []
+        assert report["failed"] == []
+        assert manager.active_dog == {}
+        assert attached.count("🔗 路径_dog_a") == 1
+
+    def test_collect_error_is_reported(self, tmp_path, monkeypatch):
+        attached = {}
+        monkeypatch.setattr(allure, "attach", lambda body, **kw: attached.__setitem__(kw["name"], body))
+        manager = make_manager(tmp_path)
+        manager.start("dog_a")
+        manager.start("dog_b", broken=True)
+
+        report = manager.stop_all(timeout=5)
+
+        # 收尾出错不能算成正常收回：记在 failed 里，报告里有错误和运行统计
+        assert report["stopped"] == ["dog_a"]
+        assert report["failed"] == ["dog_b"]
+        assert manager.active_dog == {}
+        assert "disk full" in attached["❌ dog_b_收狗失败"]
+        assert "📊 dog_b_运行统计" in attached
+
+        # 单只收狗同样处理
+        manager.start("dog_c", broken=True)
+        manager.stop("dog_c")
+        assert "disk full" in attached["❌ dog_c_收狗失败"]
+        assert "📊 dog_c_运行统计" in attached
+        assert manager.active_dog == {}
+
+    def test_stuck_dog_is_reported_and_kept(self, tmp_path, monkeypatch):
+        attached = []
+        monkeypatch.setattr(allure, "attach", lambda body, **kw: attached.append(kw["name"]))
+        manager = make_manager(tmp_path)
+        manager.start("dog_a")
+        manager.start("dog_stuck", linger=2)
+
+        started = time.monotonic()
+        report = manager.stop_all(timeout=0.5)
+        assert time.monotonic() - started < 1
+
+        assert report["stopped"] == ["dog_a"]
+        assert report["stuck"] == ["dog_stuck"]
+        assert list(manager.active_dog) == ["dog_stuck"]
+        assert "🚨 未停止的狗" in attached
+
+        # 下一次 stop_all 再收
+        assert manager.stop_all(timeout=5)["stopped"] == ["dog_stuck"]
+
+
+@allure.feature("狗池管理")
+class TestDogRegistry:
+
+    def test_class_cached_until_file_changes(self, tmp_path):
+        manager = make_manager(tmp_path)
+        registry = manager.registry
+        first = registry.get("dog_a")
+        assert registry.get("dog_a") is first
+
+        # 改文件 (mtime 变化) 后重新加载
+        path = tmp_path / "actions" / "dogs" / "dog_a.py"
+        path.write_text(SLOW_DOG + "\nVERSION = 2\n", encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert registry.get("dog_a") is not first
+
+        # 后来新加的狗也能找到
+        (tmp_path / "actions" / "dogs" / "dog_new.py").write_text(SLOW_DOG, encoding="utf-8")
+        assert registry.get("dog_new") is not None
+        assert registry.get("no_such_dog") is None
+
+    def test_keyed_instances(self, tmp_path):
+        manager = make_manager(tmp_path)
+        manager.start("dog_a", key="a_phone1")
+        manager.start("dog_a", key="a_phone2")
+        manager.start("dog_a", key="a_phone2")  # 同一个 key 不会重复放
+        assert sorted(manager.active_dog) == ["a_phone1", "a_phone2"]
+        assert manager.active_dog["a_phone1"].key == "a_phone1"
+        assert type(manager.active_dog["a_phone1"]) is type(manager.active_dog["a_phone2"])
+
+        manager.stop("a_phone1")
+        assert list(manager.active_dog) == ["a_phone2"]
+        manager.stop_all()
+        assert manager.active_dog == {}
@@ -0,0 +1,107 @@
+import os
+import time
+from types import SimpleNamespace
+
+import allure
+
+from core.dogPool_manager import DogPoolManager
+from core.dog_process import ProcessDog
+from libs.event_bus import CRASH, EventBus
+
+# 在子进程里"解析日志"的狗：报一次警，把自己的 pid 写进产物
+PARSE_DOG = '''
+import os
+from libs.baseDog import BaseDog
+
+
+class Dog(BaseDog):
+    def working(self):
+        if not self.output_file:
+            self.output_file = os.path.join(self.context.root_dir, "parse.log")
+            with open(self.output_file, "w") as f:
+                f.write(str(os.getpid()))
+            self.alert("Fatal: boom")
+        self.stats.count("lines", 100)
+        self.interruptible_sleep(0.05)
+'''
+
+
+def make_manager(tmp_path):
+    dogs_dir = tmp_path / "actions" / "dogs"
+    dogs_dir.mkdir(parents=True)
+    (dogs_dir / "parse_dog.py").write_text(PARSE_DOG, encoding="utf-8")
+    shots = []
+    context = SimpleNamespace(root_dir=str(tmp_path), data={}, config={},
+                              run=lambda keyword, **kw: shots.append(keyword))
+    return DogPoolManager(context), shots
+
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@allure.feature("进程隔离的狗")
+class TestProcessDog:
+
+    def test_runs_in_child_and_forwards_alerts(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(allure, "attach", lambda body, **kw: None)
+        manager, shots = make_manager(tmp_path)
+        alerts = []
+        manager.start("parse_dog", isolated=True, hook_strategy=["mark", "screenshot"], on_alert=alerts.append)
+
+        # 标记、回调、截图都回到父进程执行
+        assert wait_for(lambda: manager.context.data.get("has_failure") and alerts and shots)
+        assert alerts == ["Fatal: boom"]
+        assert shots == ["screenshot"]
+
+        dog = manager.active_dog["parse_dog"]
+        live = manager.stats()["parse_dog"]
+        assert live["process"]["pid"] == dog.process.pid
+        assert live["counters"]["lines"] >= 100
+
+        report = manager.stop_all(timeout=10)
+        assert report["stopped"] == ["parse_dog"]
+        # 产物按路径带回来，确实是子进程写的
+        with open(dog.output_file) as f:
+            child_pid = int(f.read())
+        assert child_pid == dog.process.pid != os.getpid()
+        assert dog.process.exitcode == 0
+        assert dog.snapshot()["counters"]["lines"] >= 100
+
+    def test_child_killed_is_detected(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(allure, "attach", lambda body, **kw: None)
+        manager, _ = make_manager(tmp_path)
+        manager.start("parse_dog", isolated=True)
+        dog = manager.active_dog["parse_dog"]
+        assert wait_for(lambda: dog._ask_stats() is not None)
+
+        dog.process.kill()
+        # 代理线程发现子进程没了就结束，收狗不会卡住
+        assert wait_for(lambda: not dog.is_alive())
+        assert manager.stop_all(timeout=2)["stopped"] == ["parse_dog"]
+
+    def test_forwarded_events_are_not_deduplicated_again(self, tmp_path):
+        # 子进程已经去重过，父进程不能再按 alert_window 合并一次 (否则合并计数丢失、报警被吞)
+        bus = EventBus()
+        published = []
+        bus.subscribe(published.append, topics=[CRASH])
+        alerts = []
+        context = SimpleNamespace(root_dir=str(tmp_path), data={}, config={})
+        dog = ProcessDog(context, "parse_dog", str(tmp_path / "parse_dog.py"), bus=bus,
+                         hook_strategy="mark", on_alert=alerts.append)
+
+        dog._handle(("event", CRASH, "Fatal: boom pid 1", {"device": "phone1"}))
+        dog._handle(("event", CRASH, "Fatal: boom pid 2", {"device": "phone1"}))
+        dog.alerts.close()
+        bus.close()
+
+        assert alerts == ["Fatal: boom pid 1", "Fatal: boom pid 2"]
+        assert [e.msg for e in published] == alerts
+        assert published[0].data == {"device": "phone1"}
+        assert context.data["has_failure"] is True
+        assert dog.alerts.stats["received"] == 0 and dog.alerts.stats["coalesced"] == 0
@@ -0,0 +1,127 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import allure
+
+from libs import baseDog
+from libs.baseDog import DogScheduler, ScheduledDog
+
+
+class CountingDog(ScheduledDog):
+    interval = 0.05
+
+    def __init__(self, context, cost=0.0, **kwargs):
+        super().__init__(context, **kwargs)
+        self.cost = cost
+        self.events = []
+        self.threads = set()
+
+    def setup(self):
+        self.events.append("setup")
+
+    def tick(self):
+        self.events.append("tick")
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.cost)
+
+    def teardown(self):
+        self.events.append("teardown")
+
+
+def make_context():
+    return SimpleNamespace(data={}, root_dir=".")
+
+
+@allure.feature("狗调度器")
+class TestDogScheduler:
+
+    def test_many_dogs_share_bounded_pool(self):
+        scheduler = DogScheduler(max_workers=2, jitter=0.5)
+        dogs = [CountingDog(make_context()) for _ in range(20)]
+        for dog in dogs:
+            dog.scheduler = scheduler
+            dog.start()
+        time.sleep(0.4)
+        for dog in dogs:
+            dog.stop()
+
+        for dog in dogs:
+            assert dog.events[0] == "setup"
+            assert dog.events[-1] == "teardown"
+            assert dog.events.count("teardown") == 1
+            assert dog.tick_stats["ticks"] >= 3
+        # 20 只狗一共只用了 2 个 worker 线程
+        assert len(set().union(*(dog.threads for dog in dogs))) <= 2
+        assert scheduler.stats() == {}
+
+    def test_overrun_skips_instead_of_overlapping(self):
+        scheduler = DogScheduler(max_workers=4, jitter=0)
+        dog = CountingDog(make_context(), cost=0.12)
+        dog.scheduler = scheduler
+        dog.start()
+        time.sleep(0.5)
+        dog.stop()
+
+        stats = dog.tick_stats
+        assert stats["overruns"] >= 2
+        assert stats["skipped"] >= 2
+        # 同一只狗不会并发执行: 0.5s 里最多跑 5 次 0.12s 的 tick
+        assert stats["ticks"] <= 5
+
+    def test_stop_during_tick_tears_down_after_tick(self):
+        scheduler = DogScheduler(jitter=0)
+        dog = CountingDog(make_context(), cost=0.3)
+        dog.scheduler = scheduler
+        dog.start()
+        time.sleep(0.1)  # 第一次 tick 正在跑
+        dog.stop()
+        assert dog.events == ["setup", "tick", "teardown"]
+
+    def test_thread_mode_fallback(self):
+        class ThreadDog(CountingDog):
+            @property
+            def scheduled(self):
+                return False
+
+        dog = ThreadDog(make_context())
+        dog.start()
+        time.sleep(0.2)
+        dog.stop()
+        assert dog.events[0] == "setup" and dog.events[-1] == "teardown"
+        assert dog.tick_stats["ticks"] >= 2
+        assert dog.threads == {dog.name}
+
+    def test_tick_errors_are_counted(self):
+        class BrokenDog(CountingDog):
+            def tick(self):
+                raise RuntimeError("boom")
+
+        scheduler = DogScheduler(jitter=0)
+        dog = BrokenDog(make_context())
+        dog.scheduler = scheduler
+        dog.start()
+        time.sleep(0.2)
+        dog.stop()
+        assert dog.tick_stats["errors"] >= 2
+        assert dog.tick_stats["ticks"] == 0
+
+    def test_first_tick_jitter_is_capped(self, monkeypatch):
+        bounds = []
+        monkeypatch.setattr(baseDog.random, "uniform", lambda low, high: bounds.append(high) or 0)
+        scheduler = DogScheduler(jitter=0.1, max_jitter=1.0)
+        slow = CountingDog(make_context(), interval=300)
+        slow.scheduler = scheduler
+        slow.start()
+        # interval 300s 也最多错开 1s，而不是 30s
+        assert bounds == [1.0]
+
+        # 声明马上出样本的狗不参与错开
+        eager = CountingDog(make_context(), interval=300, run_immediately=True)
+        eager.scheduler = scheduler
+        eager.start()
+        time.sleep(0.2)
+        slow.stop()
+        eager.stop()
+        assert bounds == [1.0]
+        assert eager.events == ["setup", "tick", "teardown"]
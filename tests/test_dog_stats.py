@@ -0,0 +1,59 @@
+import time
+from types import SimpleNamespace
+
+import allure
+
+from libs.baseDog import BaseDog
+from libs.dog_stats import COUNT_BOUNDS, DogStats, Histogram
+
+
+class FlakyDog(BaseDog):
+    """第一次 working 抛异常，之后每次处理 10 行，跑够 3 次就停"""
+
+    def working(self):
+        if self.stats.counters.get("iterations", 0) == 0:
+            raise RuntimeError("boom")
+        self.stats.count("lines", 10)
+        if self.stats.counters.get("lines", 0) >= 30:
+            self._stop_event.set()
+
+
+@allure.feature("狗的运行统计")
+class TestDogStats:
+
+    def test_histogram_quantiles(self):
+        hist = Histogram(COUNT_BOUNDS)
+        for v in range(1, 101):
+            hist.observe(v)
+        summary = hist.summary()
+        assert summary["count"] == 100
+        assert summary["min"] == 1 and summary["max"] == 100
+        assert summary["mean"] == 50.5
+        assert summary["p50"] == 50  # 桶上界
+        assert summary["p99"] == 100
+        # 超过最大边界的值，分位数不会超过实际最大值
+        big = Histogram((1, 2))
+        big.observe(7)
+        assert big.quantile(0.99) == 7
+        assert Histogram().summary() == {"count": 0}
+
+    def test_snapshot_counters_and_rates(self):
+        stats = DogStats()
+        stats.started -= 2  # 假装跑了 2 秒
+        stats.count("lines", 100)
+        stats.observe("tick", 0.02)
+        snap = stats.snapshot()
+        assert snap["counters"] == {"lines": 100}
+        assert 45 < snap["rates"]["lines"] <= 50
+        assert snap["histograms"]["tick"]["count"] == 1
+
+    def test_run_records_iterations_errors_and_backoff(self, monkeypatch):
+        dog = FlakyDog(SimpleNamespace(data={}, config={}))
+        monkeypatch.setattr(dog, "interruptible_sleep", lambda s: time.sleep(0.01))  # 退避缩短
+        dog.run()
+
+        snap = dog.snapshot()
+        assert snap["counters"]["errors"] == 1
+        assert snap["counters"]["backoff_sec"] > 0
+        assert snap["counters"]["lines"] == 30
+        assert snap["histograms"]["working"]["count"] == snap["counters"]["iterations"]
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import allure
+
+from libs.baseDog import BaseDog
+from libs.event_bus import ANR, COALESCE, CRASH, DROP, DROP_OLDEST, PERF, EventBus, classify
+
+
+class _Ctx:
+    def __init__(self):
+        self.data = {}
+        self.shots = []
+
+    def run(self, keyword, **kwargs):
+        self.shots.append(keyword)
+
+
+class _IdleDog(BaseDog):
+    def working(self):
+        self.interruptible_sleep(10)
+
+
+def blocked_handler():
+    """第一条事件卡住，直到 release.set()"""
+    seen, started, release = [], threading.Event(), threading.Event()
+
+    def handler(event):
+        started.set()
+        release.wait(2)
+        seen.append(event)
+
+    return handler, seen, started, release
+
+
+@allure.feature("事件总线")
+class TestEventBus:
+
+    def test_topics_and_classify(self):
+        bus = EventBus()
+        crashes, everything = [], []
+        crash_sub = bus.subscribe(crashes.append, topics=[CRASH, ANR])
+        all_sub = bus.subscribe(everything.append)
+
+        bus.publish(classify("FATAL EXCEPTION: main"), "boom", source="logcat")
+        bus.publish(classify("ANR in com.demo"), "anr", source="logcat")
+        bus.publish(PERF, "Memory Leak: 900MB", source="perf", mem=900)
+        bus.close()
+
+        assert [e.topic for e in crashes] == [CRASH, ANR]
+        assert [e.topic for e in everything] == [CRASH, ANR, PERF]
+        assert everything[2].data == {"mem": 900}
+        assert crash_sub.stats["handled"] == 2 and all_sub.stats["handled"] == 3
+
+    def test_slow_subscriber_never_blocks_publisher(self):
+        bus = EventBus()
+        handler, seen, started, release = blocked_handler()
+        slow = bus.subscribe(handler, policy=DROP, maxsize=5)
+        fast_seen = []
+        bus.subscribe(fast_seen.append, maxsize=10000)
+
+        bus.publish(CRASH, "first")
+        assert started.wait(1)
+        begin = time.perf_counter()
+        for i in range(5000):
+            bus.publish(CRASH, f"crash {i}")
+        assert time.perf_counter() - begin < 1
+        release.set()
+        bus.close()
+
+        # 慢的只收了 1 + 5 条，其余丢掉；快的一条不少
+        assert len(seen) == 6
+        assert slow.stats["dropped"] == 4995
+        assert len(fast_seen) == 5001
+
+    def test_coalesce_and_drop_oldest(self):
+        bus = EventBus()
+        handler, seen, started, release = blocked_handler()
+        bus.subscribe(handler, policy=COALESCE, maxsize=4)
+        latest = []
+        handler2, _, started2, release2 = blocked_handler()
+        bus.subscribe(lambda e: (handler2(e), latest.append(e.msg)), policy=DROP_OLDEST, maxsize=2)
+
+        bus.publish(CRASH, "warmup")
+        assert started.wait(1) and started2.wait(1)
+        for i in range(100):
+            bus.publish(CRASH, f"FATAL pid {i}")  # 指纹相同，合并成一条
+        bus.publish(ANR, "ANR in com.demo")
+        release.set()
+        release2.set()
+        bus.close()
+
+        assert [e.msg for e in seen] == ["warmup", "FATAL pid 0", "ANR in com.demo"]
+        assert seen[1].count == 100
+        assert "排队时合并 100 条" in seen[1].merged_msg()
+        # 只保留最新的两条
+        assert latest == ["warmup", "FATAL pid 99", "ANR in com.demo"]
+
+    def test_dog_alert_goes_through_bus(self):
+        bus = EventBus()
+        feishu = []
+        bus.subscribe(lambda e: feishu.append(e.text()), topics=[CRASH], name="feishu")
+        calls = []
+        dog = _IdleDog(_Ctx(), bus=bus, on_alert=calls.append, hook_strategy=["stop", "screenshot"])
+        dog.key = "logcat_phone1"
+
+        dog.alert("FATAL EXCEPTION: main", topic=CRASH, device="phone1")
+        # 标记同步生效，回调 / 截图在订阅者线程里执行
+        assert dog.context.data["has_crash"] is True
+        dog.alerts.close()
+
+        assert calls == ["FATAL EXCEPTION: main"]
+        assert dog.context.shots == ["screenshot"]
+        assert dog.snapshot()["alerts"]["executed"] == 2
+        bus.close()
+        assert feishu == ["[crash] logcat_phone1: FATAL EXCEPTION: main"]
@@ -0,0 +1,98 @@
+import allure
+import pytest
+
+from libs import framestats
+from libs.framestats import FrameStatsParser, frame_window, parse_refresh_rate, percentile
+
+HEADER = ("Flags,FrameTimelineVsyncId,IntendedVsync,Vsync,HandleInputStart,AnimationStart,"
+          "PerformTraversalsStart,DrawStart,SyncQueued,SyncStart,IssueDrawCommandsStart,SwapBuffers,"
+          "FrameCompleted,DequeueBufferDuration,QueueBufferDuration,GpuCompleted,")
+
+
+def dump(frames, flags=None, window=None):
+    """frames: [(IntendedVsync ns, 耗时 ms)]，拼成 gfxinfo framestats 的输出 (window: 窗口名那一行)"""
+    flags = flags or {}
+    rows = []
+    for i, (vsync, ms) in enumerate(frames):
+        end = vsync + int(ms * 1e6)
+        rows.append(",".join(str(v) for v in (
+            flags.get(i, 0), i, vsync, vsync, vsync, vsync, vsync, vsync, vsync, vsync, vsync, end - 1, end, 0, 0, end,
+        )) + ",")
+    head = [f"\tcom.demo/com.demo.{window}/android.view.ViewRootImpl@1a2b (visibility=0)"] if window else []
+    return "\n".join([*head, "Stats since: 123ns", "---PROFILEDATA---", HEADER, *rows, "---PROFILEDATA---", "View hierarchy:"])
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(framestats, "numpy", None)
+    else:
+        pytest.importorskip("numpy")
+    return request.param
+
+
+@allure.feature("帧率统计")
+class TestFrameStats:
+
+    def test_incremental_only_new_frames(self, backend):
+        parser = FrameStatsParser()
+        period = 16_666_667
+        frames = [(i * period, 10.0) for i in range(1, 11)]
+
+        first = parser.feed(dump(frames[:6], flags={0: 1}))
+        assert list(first) == [10.0] * 5  # Flags != 0 的帧不算
+
+        # 下一次 dump 和上次有重叠，只返回新的 4 帧
+        second = parser.feed(dump(frames[2:]))
+        assert len(second) == 4
+        assert parser.last_vsync == frames[-1][0]
+        assert parser.overflows == 0
+
+        # 缓冲区里已经看不到上次的最后一帧 -> 记一次溢出
+        parser.feed(dump([(20 * period, 10.0)]))
+        assert parser.overflows == 1
+
+    def test_window_switch_is_not_overflow(self, backend):
+        parser = FrameStatsParser()
+        period = 16_666_667
+        main = [(i * period, 10.0) for i in range(1, 11)]
+        detail = [(i * period, 20.0) for i in range(30, 36)]
+
+        parser.feed(dump(main, window="Main"))
+        # 切到新 Activity：旧窗口没了，新窗口的帧全是新的，不算溢出
+        assert list(parser.feed(dump(detail, window="Detail"))) == [20.0] * 6
+        assert parser.overflows == 0
+
+        # 两个窗口同时在：Main 的帧没变 (旧帧不会重复算)，Detail 自己的缓冲区溢出了要记下来，
+        # 不能被 Main 里更老的帧盖住
+        later = [(i * period, 30.0) for i in range(50, 53)]
+        both = dump(main, window="Main") + "\n" + dump(later, window="Detail")
+        assert list(parser.feed(both)) == [30.0] * 3
+        assert parser.overflows == 1
+        assert parser.last_vsync == later[-1][0]
+
+    def test_empty_and_truncated_output(self, backend):
+        parser = FrameStatsParser()
+        assert len(parser.feed(None)) == 0
+        text = dump([(100, 5.0), (200, 6.0)])
+        truncated = text.replace(text.splitlines()[4], text.splitlines()[4][:20])
+        assert len(parser.feed(truncated)) == 1
+
+    def test_frame_window(self, backend):
+        durations = [8.0] * 90 + [40.0] * 10
+        stats = frame_window(durations, 2.0, refresh_rate=60)
+        assert stats["frames"] == 100
+        assert stats["fps"] == 50.0
+        assert stats["jank"] == 10
+        assert stats["jank_pct"] == 10.0
+        assert stats["p50"] == 8.0
+        assert stats["p99"] == 40.0
+        assert frame_window([], 1.0)["p90"] is None
+
+    def test_percentile_matches_linear_interpolation(self):
+        assert percentile([1, 2, 3, 4], 50) == 2.5
+        assert percentile([5], 99) == 5
+
+    def test_parse_refresh_rate(self):
+        assert parse_refresh_rate("refresh-rate              : 120.000000 fps") == 120.0
+        assert parse_refresh_rate(None) == 60.0
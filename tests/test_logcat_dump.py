@@ -0,0 +1,55 @@
+import gzip
+import os
+
+import allure
+import pytest
+
+from libs.adb_manager import ADBManager
+from tests.fake_adb import make_fake_adb, make_fake_logcat
+
+LINES = [f"11-27 12:00:{i % 60:02d}.000   100   100 I Demo: line {i:04d} 中文\n" for i in range(2000)]
+
+
+@pytest.fixture
+def adb(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    make_fake_logcat(tmp_path, LINES)
+    (tmp_path / "out").mkdir()
+    return ADBManager("fake-001", adb_path=make_fake_adb(tmp_path))
+
+
+@pytest.mark.skipif(os.name == "nt", reason="假 adb 依赖本机 sh")
+@allure.feature("Logcat 落盘")
+class TestGetLogcat:
+
+    def test_plain(self, adb, tmp_path):
+        path = adb.get_logcat(str(tmp_path / "out" / "logcat.txt"))
+        with open(path, encoding="utf-8") as f:
+            assert f.readlines() == LINES
+
+    def test_gzip(self, adb, tmp_path):
+        # compress 会自动补后缀
+        path = adb.get_logcat(str(tmp_path / "out" / "logcat.txt"), compress="gzip")
+        assert path == str(tmp_path / "out" / "logcat.txt.gz")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            assert f.readlines() == LINES
+
+        # 按后缀推断
+        path = adb.get_logcat(str(tmp_path / "out" / "by_ext.gz"))
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            assert f.readlines() == LINES
+
+    def test_max_bytes_truncates_on_line_boundary(self, adb, tmp_path):
+        line_size = len(LINES[0].encode("utf-8"))
+        path = adb.get_logcat(str(tmp_path / "out" / "logcat.txt.gz"), max_bytes=line_size * 10 + 5)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            assert f.readlines() == LINES[:10]
+
+    def test_grep(self, adb, tmp_path):
+        path = adb.get_logcat(str(tmp_path / "out" / "logcat.txt"), grep="line 00")
+        with open(path, encoding="utf-8") as f:
+            assert f.readlines() == LINES[:100]
+
+    def test_failure_returns_false(self, tmp_path):
+        adb = ADBManager("fake-001", adb_path=str(tmp_path / "no-such-adb"))
+        assert adb.get_logcat(str(tmp_path / "out" / "logcat.txt")) is False
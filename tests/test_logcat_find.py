@@ -0,0 +1,83 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import allure
+import pytest
+
+from actions.common import logcat_ops
+from libs.adb_manager import ADBManager
+from libs.logger import logger
+from libs.pattern_matcher import MultiPatternMatcher
+from tests.fake_adb import make_fake_adb, make_fake_logcat
+
+LINES = [
+    "--------- beginning of main",
+    "11-27 12:00:00.000   100   100 I ActivityManager: Start proc com.demo",
+    "11-27 12:00:01.000   100   100 E AndroidRuntime: FATAL EXCEPTION: main",
+    "11-27 12:00:02.000   100   100 W Unity   : FATAL EXCEPTION in script",
+    "11-27 12:00:03.000   100   100 E AndroidRuntime: FATAL EXCEPTION: worker",
+    "11-27 12:00:05.000   100   100 E AndroidRuntime: FATAL EXCEPTION: late",
+]
+# 截止时间之后还在源源不断地输出
+LATE_LINE = "11-27 23:59:59.000   100   100 E AndroidRuntime: FATAL EXCEPTION: never"
+
+
+@pytest.fixture
+def adb(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return ADBManager("fake-001", adb_path=make_fake_adb(tmp_path))
+
+
+def find(adb, **kwargs):
+    return logcat_ops._find(adb, MultiPatternMatcher(keywords=["FATAL EXCEPTION"]), **kwargs)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="假 adb 依赖本机 sh")
+@allure.feature("Logcat 查找")
+class TestLogcatFind:
+
+    def test_keyword(self, adb, tmp_path):
+        make_fake_logcat(tmp_path, LINES)
+        matches = find(adb)
+        assert [m["time"] for m in matches] == [
+            "11-27 12:00:01.000", "11-27 12:00:02.000", "11-27 12:00:03.000", "11-27 12:00:05.000"]
+        assert matches[0] == {"time": "11-27 12:00:01.000", "line": LINES[2], "pattern": "FATAL EXCEPTION"}
+
+    def test_tag_and_priority(self, adb, tmp_path):
+        args = make_fake_logcat(tmp_path, LINES)
+        # 假 logcat 不认过滤参数，本地还要再筛一遍
+        matches = find(adb, tag="AndroidRuntime", priority="E")
+        assert [m["line"] for m in matches] == [LINES[2], LINES[4], LINES[5]]
+        with open(args) as f:
+            assert f.read().split() == ["-d", "-v", "threadtime", "AndroidRuntime:E", "*:S"]
+
+        assert [m["line"] for m in find(adb, priority="W")] == LINES[2:]
+        assert [m["line"] for m in find(adb, tag=["Unity"])] == [LINES[3]]
+
+    def test_since_and_until(self, adb, tmp_path):
+        args = make_fake_logcat(tmp_path, LINES)
+        matches = find(adb, since="11-27 12:00:01.500", until="11-27 12:00:04.000")
+        assert [m["line"] for m in matches] == [LINES[3], LINES[4]]
+        with open(args) as f:
+            assert "-T 11-27 12:00:01.500" in f.read()
+
+    def test_until_stops_reading(self, adb, tmp_path):
+        make_fake_logcat(tmp_path, LINES, endless=LATE_LINE)
+        result = {}
+        t = threading.Thread(target=lambda: result.update(matches=find(adb, until="11-27 12:00:04.000")))
+        t.start()
+        t.join(10)
+        # 过了截止时间就不再读，不会等手机把缓冲区吐完
+        assert not t.is_alive()
+        assert [m["time"] for m in result["matches"]] == [
+            "11-27 12:00:01.000", "11-27 12:00:02.000", "11-27 12:00:03.000"]
+
+    def test_first_only_and_max_matches(self, adb, tmp_path):
+        make_fake_logcat(tmp_path, LINES, endless=LATE_LINE)
+        context = SimpleNamespace(adb=adb, logger=logger)
+        result = logcat_ops.run(context, action="find", keyword="FATAL EXCEPTION", first_only=True)
+        assert result["status"] is True
+        assert [m["line"] for m in result["data"]] == [LINES[2]]
+
+        assert len(find(adb, max_matches=3)) == 3
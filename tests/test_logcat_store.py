@@ -0,0 +1,53 @@
+import struct
+
+import allure
+
+from libs.logcat_parser import parse_binary, to_epoch
+from libs.logcat_store import LogcatStore
+
+
+def _lines():
+    for i in range(1000):
+        sec = i // 10
+        priority = "E" if i % 100 == 0 else "I"
+        tag = "Crash" if i % 100 == 0 else f"Tag{i % 5}"
+        yield f"11-27 12:{sec // 60:02d}:{sec % 60:02d}.{i % 10}00  100  {i % 7} {priority} {tag}: msg {i}\n"
+
+
+@allure.feature("logcat 结构化归档")
+class TestLogcatStore:
+
+    def test_query_by_time_tag_priority(self, tmp_path):
+        store = LogcatStore(str(tmp_path), block_records=64, year=2023)
+        for line in _lines():
+            store.append_line(line)
+        assert not store.append_line("\tat com.foo.Bar(Bar.java:1)\n")  # 堆栈续行不认识
+        store.close()
+
+        # 12:00:50 前后 1 秒 (49.000 ~ 51.000): 第 490 ~ 510 条
+        hits = list(store.around("11-27 12:00:50", seconds=1))
+        assert [r["msg"] for r in hits] == [f"msg {i}" for i in range(490, 511)]
+        # 时间索引只会挑出少数几个块
+        assert len(store.candidate_blocks(to_epoch("11-27 12:00:49", 2023),
+                                          to_epoch("11-27 12:00:51", 2023))) <= 2
+
+        crashes = list(store.query(tag="Crash"))
+        assert [r["msg"] for r in crashes] == [f"msg {i}" for i in range(0, 1000, 100)]
+        assert len(list(store.query(priority="E"))) == 10
+        assert list(store.query(keyword="msg 999"))[0]["tag"] == "Tag4"
+
+        # 重新打开只靠磁盘上的索引
+        reopened = LogcatStore(str(tmp_path), year=2023)
+        assert reopened.count == 1000
+        assert len(list(reopened.query(start="11-27 12:01:00", end="11-27 12:01:00.9"))) == 10
+
+    def test_parse_binary(self):
+        payload = bytes([6]) + b"ActivityManager\0ANR in com.demo\n\0"
+        entry = struct.pack("<HHiIIIII", len(payload), 28, 1234, 5678, 1700000000, 123000000, 0, 1000) + payload
+
+        records, rest = parse_binary(entry * 2 + entry[:5])
+        assert len(records) == 2 and rest == entry[:5]
+        assert records[0]["priority"] == "E"
+        assert records[0]["tag"] == "ActivityManager"
+        assert records[0]["msg"] == "ANR in com.demo"
+        assert records[0]["ts"] == 1700000000.123
@@ -0,0 +1,74 @@
+import os
+import random
+import time
+
+import allure
+import pytest
+
+from libs.logger import logger
+from libs.pattern_matcher import MultiPatternMatcher
+
+
+def _fake_logcat(n, seed=7):
+    rnd = random.Random(seed)
+    tags = ["ActivityManager", "WindowManager", "chatty", "Unity", "libc", "art"]
+    words = ["onResume", "binder", "surface", "GC freed", "input", "texture", "frame"]
+    lines = []
+    for i in range(n):
+        msg = " ".join(rnd.choice(words) for _ in range(8))
+        lines.append(f"11-27 12:00:{i % 60:02d}.{i % 1000:03d}  1234  5678 I {rnd.choice(tags)}: {msg} #{i}\n")
+    return lines
+
+
+def _many_patterns():
+    """122 个关键字 + 30 个正则，2 万行日志里埋两条命中"""
+    keywords = [f"CrashSignature_{i:03d}" for i in range(120)] + ["FATAL EXCEPTION", "ANR in"]
+    regexes = [rf"Error code {i}\d+" for i in range(30)]
+    lines = _fake_logcat(20000)
+    lines[5000] = "11-27 12:00:00.000  1  1 E AndroidRuntime: FATAL EXCEPTION: main\n"
+    lines[15000] = "11-27 12:00:00.000  1  1 E Game: CrashSignature_077 hit\n"
+    return MultiPatternMatcher(keywords, regexes), lines
+
+
+@allure.feature("多模式匹配")
+class TestMultiPatternMatcher:
+
+    def test_reports_which_pattern_matched(self):
+        matcher = MultiPatternMatcher(
+            keywords=["ANR", "ANR in", "FATAL EXCEPTION"],
+            regexes=[r"signal \d+ \(SIG\w+\)", r"Force finishing activity \S+"],
+        )
+        assert matcher.search("E ActivityManager: ANR in com.demo") == "ANR in"
+        assert matcher.search("F libc: Fatal signal 11 (SIGSEGV), code 1") == r"signal \d+ \(SIG\w+\)"
+        assert matcher.search("I chatty: nothing here") is None
+        assert matcher.findall("FATAL EXCEPTION then ANR") == ["FATAL EXCEPTION", "ANR"]
+
+        ci = MultiPatternMatcher(keywords=["fatal exception"], ignore_case=True)
+        assert ci.search("E AndroidRuntime: FATAL EXCEPTION: main") == "fatal exception"
+
+    def test_many_patterns(self):
+        matcher, lines = _many_patterns()
+        assert [h for h in map(matcher.search, lines) if h] == ["FATAL EXCEPTION", "CrashSignature_077"]
+
+    @pytest.mark.skipif(not os.environ.get("DOGNOISE_BENCH"), reason="性能基准，设置 DOGNOISE_BENCH=1 时才跑")
+    def test_benchmark_many_patterns(self):
+        """100+ 模式下的吞吐量，需要明显高于 10k 行/秒 (和机器负载有关，不放进日常用例)"""
+        matcher, lines = _many_patterns()
+        keywords = matcher.keywords
+
+        start = time.perf_counter()
+        for line in lines:
+            matcher.search(line)
+        elapsed = time.perf_counter() - start
+
+        naive_start = time.perf_counter()
+        for line in lines:
+            for kw in keywords:
+                if kw in line:
+                    break
+        naive = time.perf_counter() - naive_start
+
+        rate = len(lines) / elapsed
+        logger.info(f"⏱️ {len(matcher.patterns)} 个模式: {rate:,.0f} 行/秒 "
+                    f"(逐个关键字循环: {len(lines) / naive:,.0f} 行/秒)")
+        assert rate > 10000
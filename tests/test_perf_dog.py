@@ -0,0 +1,125 @@
+import os
+from types import SimpleNamespace
+
+import allure
+
+from core.dog_registry import DogRegistry
+from libs.adb_pool import AdbPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stat_line(pid, jiffies, starttime=1000):
+    """拼一行 /proc/<pid>/stat (")" 之后第 11/12 个字段是 utime/stime，第 19 个是 starttime)"""
+    fields = ["S"] + ["0"] * 21
+    fields[11], fields[19] = str(jiffies), str(starttime)
+    return f"{pid} (app) " + " ".join(fields)
+
+
+class FakeDevice:
+    """
+    假设备：每次 batch 整机 jiffies +1000，每个进程 +100 (整机 10%)；
+    meminfo 按包名返回，没配置的包返回空 (模拟 dumpsys 失败)
+    """
+
+    def __init__(self, pids, mem_kb):
+        self.pids = pids
+        self.mem_kb = mem_kb
+        self.ticks = 0
+        self.batches = []
+        self.pidof_calls = 0  # 单独的 pidof 往返
+
+    def get_pid(self, package):
+        self.pidof_calls += 1
+        return [self.pids[package]] if package in self.pids else []
+
+    def batch(self, cmds, timing=True):
+        self.ticks += 1
+        self.batches.append(cmds)
+        results = []
+        for cmd in cmds:
+            if cmd.startswith("dumpsys meminfo"):
+                kb = self.mem_kb.get(cmd.split()[2])
+                output = f"  TOTAL    {kb}    0    0" if kb else ""
+            elif cmd.startswith("grep '^cpu'"):
+                lines = [f"cpu {self.ticks * 1000} 0 0 0 0 0 0 0", "cpu0 0 0 0 0"]
+                if "pidof " in cmd:
+                    # 脚本里顺带解析 PID
+                    pid = self.pids.get(cmd.split("pidof ")[1].split(")")[0])
+                    lines.append(f"@R {pid or ''}")
+                else:
+                    pid = int(cmd.split("@P ")[1].split("'")[0])
+                if pid:
+                    lines += [f"@P {pid}", stat_line(pid, self.ticks * 100)]
+                output = "\n".join(lines)
+            else:
+                output = ""
+            results.append({"cmd": cmd, "output": output, "code": 0})
+        return results
+
+
+@allure.feature("性能监控狗")
+class TestPerfDog:
+
+    def test_probe_many_devices_and_packages(self, tmp_path):
+        phone1 = FakeDevice({"com.a": 11, "com.b": 12}, {"com.a": 204800, "com.b": 102400})
+        # phone2 上 com.b 的 dumpsys meminfo 失败
+        phone2 = FakeDevice({"com.a": 21, "com.b": 22}, {"com.a": 307200})
+        context = SimpleNamespace(root_dir=str(tmp_path), data={}, config={},
+                                  adb_pool=AdbPool({"phone1": phone1, "phone2": phone2}))
+        dog_cls = DogRegistry(os.path.join(ROOT, "actions", "dogs")).get("Perf_dog")
+        dog = dog_cls(context, devices=["phone1", "phone2"], packages=["com.a", "com.b"], trend=False)
+
+        dog.setup()
+        try:
+            for _ in range(3):
+                dog.tick()
+        finally:
+            dog.teardown()
+
+        # 每台设备每个周期只有一次 batch，两个包的命令 (包括 pidof) 都在里面
+        assert phone1.ticks == phone2.ticks == 3
+        assert phone1.pidof_calls == phone2.pidof_calls == 0
+        assert len(phone1.batches[0]) == 4
+        assert len(dog.output_file) == 4
+
+        # 第一次只建 CPU 基线，之后每次一个样本
+        assert dog.series[("phone1", "com.a")].column("mem") == [200.0, 200.0]
+        assert dog.series[("phone1", "com.b")].column("cpu") == [10.0, 10.0]
+        assert dog.series[("phone2", "com.a")].column("mem") == [300.0, 300.0]
+        # 内存没拿到的样本整条跳过，不会记成 0MB
+        assert len(dog.series[("phone2", "com.b")]) == 0
+        csv_b = [p for p in dog.output_file if "phone2_com.b" in p][0]
+        assert open(csv_b, encoding="utf-8").read().count("\n") == 1  # 只有表头
+
+    def test_absent_package_does_not_add_adb_calls(self, tmp_path):
+        # com.b 没在运行：每个周期照样只有一次 batch，pidof 在 batch 里重试
+        phone = FakeDevice({"com.a": 11}, {"com.a": 204800, "com.b": 102400})
+        context = SimpleNamespace(root_dir=str(tmp_path), data={}, config={}, adb=phone)
+        dog_cls = DogRegistry(os.path.join(ROOT, "actions", "dogs")).get("Perf_dog")
+        dog = dog_cls(context, packages=["com.a", "com.b"], trend=False)
+
+        dog.setup()
+        try:
+            for _ in range(3):
+                dog.tick()
+            assert phone.ticks == 3 and phone.pidof_calls == 0
+            assert all("pidof com.b" in batch[3] for batch in phone.batches)
+
+            # com.b 启动了：下一次 batch 解析到 PID 并建立基线，再下一次出数据
+            phone.pids["com.b"] = 12
+            dog.tick()
+            dog.tick()
+        finally:
+            dog.teardown()
+
+        assert phone.pidof_calls == 0
+        assert len(dog.series[(None, "com.a")]) == 4
+        assert dog.series[(None, "com.b")].column("cpu") == [10.0]
+
+    def test_parse_mem(self):
+        parse = DogRegistry(os.path.join(ROOT, "actions", "dogs")).get("Perf_dog")._parse_mem
+        assert parse(None, "   TOTAL    204800    1000") == 200.0
+        assert parse(None, "") is None
+        assert parse(None, None) is None
+        assert parse(None, "No process found for: com.demo") is None
@@ -0,0 +1,54 @@
+import math
+import random
+
+import allure
+
+from libs.perf_series import P2Quantile, PerfSeries
+
+
+@allure.feature("性能序列")
+class TestPerfSeries:
+
+    def test_p2_quantile(self):
+        rng = random.Random(1)
+        values = [rng.gauss(100, 15) for _ in range(20000)]
+        q = P2Quantile(0.95)
+        for v in values:
+            q.add(v)
+        exact = sorted(values)[int(len(values) * 0.95)]
+        assert abs(q.value - exact) < 1
+
+    def test_rolling_window_matches_brute_force(self):
+        series = PerfSeries(["mem"], capacity=50)
+        rng = random.Random(2)
+        for i in range(500):
+            series.append(i, mem=None if i % 9 == 0 else rng.uniform(0, 100))
+
+        window = [v for v in series.column("mem") if not math.isnan(v)]
+        summary = series.summary()["mem"]
+        assert summary["window"]["size"] == len(window)
+        assert summary["window"]["min"] == min(window)
+        assert summary["window"]["max"] == max(window)
+        assert abs(summary["window"]["mean"] - sum(window) / len(window)) < 1e-3
+        # 窗口 p95 (最近秩)
+        assert summary["window"]["p95"] == sorted(window)[math.ceil(0.95 * len(window)) - 1]
+        assert summary["count"] == 500 - len(range(0, 500, 9))
+
+    def test_spill_and_downsample(self, tmp_path):
+        path = str(tmp_path / "perf.bin")
+        series = PerfSeries(["cpu", "mem"], capacity=100, spill_path=path, spill_every=30,
+                            resolutions=(60,), max_buckets=5)
+        flushed = sum(series.append(1000 + i, cpu=i % 10, mem=i) for i in range(1000))
+        series.close()
+
+        assert flushed == 1000 // 30
+        columns, rows = PerfSeries.read_spill(path)
+        rows = list(rows)
+        assert columns == ["ts", "cpu", "mem"]
+        assert len(rows) == 1000 and rows[-1] == (1999.0, 9.0, 999.0)
+
+        # 只保留最近 5 个整分钟桶 + 当前桶
+        buckets = series.downsampled(60)
+        assert len(buckets) == 6
+        assert buckets[-2]["mem"]["count"] == 60
+        assert buckets[-1]["ts"] == 1980
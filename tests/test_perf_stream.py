@@ -0,0 +1,69 @@
+import contextlib
+import os
+import subprocess
+import sys
+import threading
+
+import allure
+import pytest
+
+from libs.adb_manager import ADBManager
+from libs.perf_stream import PerfStream
+from tests.fake_adb import make_fake_adb
+
+
+@allure.feature("手机端常驻性能采集")
+@pytest.mark.skipif(not os.path.exists("/proc/stat"), reason="需要 Linux /proc")
+class TestPerfStream:
+
+    def test_stream_samples(self, tmp_path, monkeypatch):
+        busy = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+        # 假 adb 的 shell 在本机执行；造一个 pidof，让包名解析到这个死循环进程
+        pidof = tmp_path / "pidof"
+        pidof.write_text(f"#!/bin/sh\necho {busy.pid}\n")
+        pidof.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+        try:
+            adb = ADBManager("fake-001", adb_path=make_fake_adb(tmp_path))
+            stream = PerfStream(adb, "com.busy", interval=0.2)
+            collected = []
+            with contextlib.closing(stream.samples()) as samples:
+                for sample in samples:
+                    collected.append(sample)
+                    if len(collected) == 4:
+                        break
+        finally:
+            busy.kill()
+            busy.wait()
+
+        assert collected[0]["cpu"] is None  # 第一块只是基线
+        last = collected[-1]
+        assert last["pids"] == [busy.pid]
+        assert 50 < last["cpu_core"] < 130
+        assert last["rss_mb"] > 1 and last["threads"] >= 1
+        assert collected[-1]["ts"] > collected[0]["ts"]
+
+    def test_noisy_stderr_does_not_block(self, tmp_path):
+        # 设备端往 stderr 写的量远超管道缓冲区，stdout 照样能读完
+        adb = ADBManager("fake-001", adb_path=make_fake_adb(tmp_path))
+        cmd = "yes noise | head -c 2000000 >&2; echo done; echo last-words >&2; exit 3"
+        result = {}
+
+        def consume():
+            lines = []
+            try:
+                with contextlib.closing(adb.stream_lines(cmd)) as stream:
+                    for line in stream:
+                        lines.append(line)
+            except RuntimeError as e:
+                result["error"] = str(e)
+            result["lines"] = lines
+
+        worker = threading.Thread(target=consume, daemon=True)
+        worker.start()
+        worker.join(timeout=15)
+        assert not worker.is_alive(), "stderr 没被读走，子进程卡死"
+        assert result["lines"] == ["done\n"]
+        # 报错里带着 stderr 的最后一段
+        assert "(3)" in result["error"] and "last-words" in result["error"]
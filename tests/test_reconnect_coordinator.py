@@ -0,0 +1,69 @@
+import threading
+import time
+
+import allure
+
+from libs.reconnect_coordinator import ReconnectCoordinator
+
+
+class StubManager:
+    """模拟 ADBManager：记录调用过的 adb 命令，online 决定 get-state 结果"""
+
+    def __init__(self, device_id, online_after=None):
+        self.device_id = device_id
+        self.is_network_device = "." in device_id
+        self.online_after = online_after  # 执行到哪条命令之后设备恢复
+        self.online = False
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _adb_raw(self, args, timeout=15, with_serial=True):
+        if args == ["get-state"]:
+            return (0, "device") if self.online else (1, "error: device offline")
+        with self._lock:
+            self.calls.append(args[0])
+        time.sleep(0.05)
+        if args[0] == self.online_after:
+            self.online = True
+        return 0, ""
+
+
+@allure.feature("ADB 重连协调")
+class TestReconnectCoordinator:
+
+    def test_concurrent_callers_share_one_attempt(self):
+        coordinator = ReconnectCoordinator(online_timeout=0.1)
+        manager = StubManager("emulator-5554", online_after="reconnect")
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(coordinator.recover(manager)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == [True] * 8
+        assert manager.calls == ["reconnect"]
+
+    def test_ladder_escalates_without_touching_server(self):
+        coordinator = ReconnectCoordinator(online_timeout=0.1)
+        manager = StubManager("192.168.1.8:5555", online_after="connect")
+
+        assert coordinator.recover(manager)
+        assert manager.calls == ["reconnect", "disconnect", "connect"]
+        assert "kill-server" not in manager.calls
+
+    def test_backoff_after_failure(self):
+        coordinator = ReconnectCoordinator(online_timeout=0.1, base_backoff=30)
+        manager = StubManager("emulator-5554")
+
+        assert not coordinator.recover(manager)
+        assert "kill-server" in manager.calls
+        calls = len(manager.calls)
+
+        # 退避期内直接返回，不再打扰 adb
+        assert not coordinator.recover(manager)
+        assert len(manager.calls) == calls
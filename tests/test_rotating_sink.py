@@ -0,0 +1,101 @@
+import gzip
+import itertools
+import json
+import os
+import time
+
+import allure
+
+from libs import rotating_sink
+from libs.rotating_sink import RotatingSink
+
+
+@allure.feature("日志切分落盘")
+class TestRotatingSink:
+
+    def test_size_rotation_and_manifest(self, tmp_path):
+        sink = RotatingSink(str(tmp_path), prefix="t", max_bytes=1000, flush_bytes=100)
+        for i in range(100):
+            sink.write(f"line {i:04d} " + "x" * 40 + "\n")
+        paths = sink.close()
+
+        manifest, segments = paths[0], paths[1:]
+        assert len(segments) > 1
+        content = "".join(open(p, encoding="utf-8").read() for p in segments)
+        assert content.count("\n") == 100
+        assert content.startswith("line 0000") and "line 0099" in content
+
+        data = json.load(open(manifest, encoding="utf-8"))
+        assert [s["path"] for s in data["segments"]] == segments
+        assert sum(s["lines"] for s in data["segments"]) == 100
+        assert sink.close() == paths  # 重复 close 不出错
+
+    def test_background_compress(self, tmp_path):
+        sink = RotatingSink(str(tmp_path), prefix="t", max_bytes=500, flush_bytes=50, compress="gzip")
+        for i in range(50):
+            sink.write(f"{i}\n" + "y" * 30 + "\n")
+        paths = sink.close()
+
+        segments = paths[1:]
+        assert all(p.endswith(".log.gz") for p in segments)
+        assert not [f for f in os.listdir(tmp_path) if f.endswith(".log")]
+        text = b"".join(gzip.open(p).read() for p in segments).decode()
+        assert text.count("y" * 30) == 50
+
+    def test_same_prefix_same_second_do_not_collide(self, tmp_path):
+        a = RotatingSink(str(tmp_path), prefix="monitor")
+        b = RotatingSink(str(tmp_path), prefix="monitor")
+        a.write("from A\n")
+        b.write("from B\n")
+        paths_a, paths_b = a.close(), b.close()
+
+        assert not set(paths_a) & set(paths_b)
+        assert open(paths_a[1], encoding="utf-8").read() == "from A\n"
+        assert open(paths_b[1], encoding="utf-8").read() == "from B\n"
+
+    def test_existing_segment_is_not_truncated(self, tmp_path, monkeypatch):
+        # 时间和序号都固定住，让两个 sink 算出完全一样的文件名
+        real_strftime = time.strftime
+        monkeypatch.setattr(time, "strftime",
+                            lambda fmt, *a: "20260101_000000" if fmt == "%Y%m%d_%H%M%S" else real_strftime(fmt, *a))
+        monkeypatch.setattr(rotating_sink, "_SINK_SEQ", itertools.repeat(7))
+        first = RotatingSink(str(tmp_path), prefix="t")
+        first.write("keep me\n")
+        first_paths = first.close()
+        second = RotatingSink(str(tmp_path), prefix="t")
+        second.write("new\n")
+        second_paths = second.close()
+
+        assert second_paths[1] != first_paths[1]
+        assert open(first_paths[1], encoding="utf-8").read() == "keep me\n"
+        assert open(second_paths[1], encoding="utf-8").read() == "new\n"
+
+    def test_final_flush_does_not_open_empty_segment(self, tmp_path):
+        # 缓冲里的数据刚好够触发切分，关闭时也不能再切出一个空分段
+        sink = RotatingSink(str(tmp_path), prefix="t", max_bytes=10, flush_bytes=1000)
+        sink.write("x" * 20 + "\n")
+        paths = sink.close()
+
+        assert len(paths) == 2
+        assert len(os.listdir(tmp_path)) == 2
+
+    def test_close_without_waiting_for_compression(self, tmp_path, monkeypatch):
+        real_compress = rotating_sink.compress_file
+
+        def slow_compress(path, compress):
+            time.sleep(0.5)
+            return real_compress(path, compress)
+
+        monkeypatch.setattr(rotating_sink, "compress_file", slow_compress)
+        sink = RotatingSink(str(tmp_path), prefix="t", compress="gzip")
+        sink.write("hello\n")
+
+        # 写入线程收尾：不等压缩
+        started = time.monotonic()
+        assert sink.close(wait=False)[1].endswith(".log")
+        assert time.monotonic() - started < 0.3
+
+        # 收狗时再等压缩完
+        paths = sink.close(timeout=5)
+        assert paths[1].endswith(".log.gz")
+        assert gzip.open(paths[1]).read() == b"hello\n"
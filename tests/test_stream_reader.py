@@ -0,0 +1,88 @@
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+
+import allure
+import pytest
+
+from libs.stream_reader import StreamReader
+
+
+@allure.feature("非阻塞流读取")
+class TestStreamReader:
+
+    def test_lines_and_tail(self):
+        code = "import sys; sys.stdout.write('a\\n' * 5000 + '中文\\nlast'); sys.stdout.flush()"
+        process = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE)
+        reader = StreamReader(process.stdout, chunk_size=1000)
+        lines = list(reader)
+        process.wait()
+
+        assert lines[:2] == ["a\n", "a\n"]
+        assert lines[-2:] == ["中文\n", "last"]
+        assert len(lines) == 5002
+        assert reader.stats()["lines"] == 5002
+
+    @pytest.mark.skipif(os.name == "nt", reason="依赖 POSIX 管道")
+    def test_stop_on_quiet_stream(self):
+        # 子进程一直不输出，读取循环也要在 50ms 内响应停止
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"],
+                                   stdout=subprocess.PIPE)
+        stop = threading.Event()
+        reader = StreamReader(process.stdout, stop_event=stop)
+        t = threading.Thread(target=lambda: list(reader.batches()))
+        t.start()
+        time.sleep(0.1)
+
+        start = time.perf_counter()
+        stop.set()
+        reader.wakeup()
+        t.join(1)
+        latency = time.perf_counter() - start
+        process.kill()
+        process.wait()
+
+        assert not t.is_alive()
+        assert latency < 0.05
+
+    @pytest.mark.skipif(os.name == "nt", reason="依赖 POSIX 管道")
+    def test_wakeup_after_close_does_not_touch_reused_fd(self, tmp_path):
+        process = subprocess.Popen([sys.executable, "-c", "print('done')"], stdout=subprocess.PIPE)
+        reader = StreamReader(process.stdout)
+        assert list(reader) == ["done\n"]
+        process.wait()
+
+        # 唤醒管道已经关掉，编号被别的文件复用了也不能往里写
+        path = tmp_path / "reused.txt"
+        with open(path, "wb") as f:
+            reader.wakeup()
+            f.write(b"ok")
+        assert path.read_bytes() == b"ok"
+        assert reader._wake_w is None
+
+    @pytest.mark.skipif(os.name == "nt", reason="依赖 POSIX 管道")
+    def test_idle_loop_does_not_spin(self, monkeypatch):
+        # 默认超时很长：空闲时 select 不会每秒醒几十次，停止全靠 wakeup()
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"],
+                                   stdout=subprocess.PIPE)
+        stop = threading.Event()
+        reader = StreamReader(process.stdout, stop_event=stop)
+        assert reader.poll_interval >= 1
+        selects = []
+        real_select = selectors.DefaultSelector.select
+        monkeypatch.setattr(selectors.DefaultSelector, "select",
+                            lambda self, timeout=None: selects.append(timeout) or real_select(self, timeout))
+        t = threading.Thread(target=lambda: list(reader.batches()))
+        t.start()
+        time.sleep(0.3)
+        stop.set()
+        reader.wakeup()
+        t.join(1)
+        process.kill()
+        process.wait()
+
+        assert not t.is_alive()
+        assert len(selects) <= 2
@@ -0,0 +1,43 @@
+import random
+
+import allure
+
+from libs.trend import SlidingRegression, TrendDetector
+
+
+def _sawtooth(leak_per_min, seconds=7200, seed=0):
+    # GC 锯齿: 每 20 秒涨 50MB 再回落，叠加噪声
+    rng = random.Random(seed)
+    for t in range(seconds):
+        yield 1e9 + t, 200 + leak_per_min * t / 60 + (t % 20) * 2.5 + rng.gauss(0, 2)
+
+
+@allure.feature("趋势检测")
+class TestTrend:
+
+    def test_sliding_regression(self):
+        reg = SlidingRegression(window=100)
+        for t in range(300):
+            reg.add(t, 1000 if t < 150 else 3 * t + 7)  # 前半段是干扰，会滑出窗口
+        slope, last, r2 = reg.fit()
+        assert abs(slope - 3) < 1e-6 and abs(last - 904) < 1e-6 and r2 > 0.999
+
+    def test_leak_under_sawtooth(self):
+        detector = TrendDetector("mem", limit=500, min_slope=0.2 / 60)
+        events = [(ts, e) for ts, v in _sawtooth(1.0) for e in detector.update(ts, v)]
+        first_ts, event = events[0]
+        assert event["kind"] == "leak"
+        assert first_ts - 1e9 < 900  # 15 分钟内发现
+        assert 0.7 < event["slope_per_min"] < 1.5
+        assert event["eta_sec"] > 0
+
+    def test_flat_sawtooth_is_quiet(self):
+        detector = TrendDetector("mem", limit=500, min_slope=0.2 / 60)
+        assert not [e for ts, v in _sawtooth(0.0) for e in detector.update(ts, v)]
+
+    def test_shift(self):
+        rng = random.Random(1)
+        detector = TrendDetector("cpu", shift_delta=2, shift_threshold=50)
+        hits = [t for t in range(2000)
+                for e in detector.update(t, (10 if t < 1000 else 30) + rng.gauss(0, 3)) if e["kind"] == "shift"]
+        assert hits and 1000 <= hits[0] < 1020